@@ -0,0 +1,118 @@
+"""Shared fixtures for the benchmark suite.
+
+Everything runs offline against audio generated on the fly. Long inputs are
+written once per session into a temporary directory.
+"""
+
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from streamlit_wavesurfer.cache import audio_cache
+from streamlit_wavesurfer.media import MEDIA_SERVER_ENV
+
+SAMPLE_RATE = 16000
+# Seconds of audio per size label; "hours" only runs with --bench-long.
+DURATIONS = {"seconds": 10, "minutes": 10 * 60, "hours": 60 * 60}
+REGION_COUNTS = [100, 10_000, 1_000_000]
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-long",
+        action="store_true",
+        default=False,
+        help="Include hour-long audio and million-region cases.",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--bench-long"):
+        return
+    skip = pytest.mark.skip(reason="needs --bench-long")
+    for item in items:
+        if "long" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "long: hour-long or million-row cases")
+
+
+def sizes(values):
+    """Parametrize over `values`, marking the largest one as long."""
+    return [
+        pytest.param(value, marks=pytest.mark.long) if value == values[-1] else value
+        for value in values
+    ]
+
+
+def tone(seconds: float, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """A quiet sine sweep; compresses like speech rather than like silence."""
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * (220 + 40 * t % 600) * t)).astype(np.float32)
+
+
+def region_dicts(count: int):
+    """`count` non-overlapping regions, as most apps pass them."""
+    starts = np.linspace(0, count * 2.0, count, endpoint=False)
+    return [
+        {"start": float(start), "end": float(start) + 1.5, "content": f"r{i}"}
+        for i, start in enumerate(starts)
+    ]
+
+
+@pytest.fixture(scope="session")
+def audio_files(tmp_path_factory):
+    """PCM_16 WAV files keyed by size label, generated lazily."""
+    directory = tmp_path_factory.mktemp("audio")
+    files = {}
+
+    def get(size: str) -> str:
+        if size not in files:
+            path = directory / f"{size}.wav"
+            sf.write(path, tone(DURATIONS[size]), SAMPLE_RATE, subtype="PCM_16")
+            files[size] = str(path)
+        return files[size]
+
+    return get
+
+
+@pytest.fixture(scope="session")
+def audio_inputs(audio_files):
+    """Build each supported `AudioData` type for a size label. File objects
+    and buffers are consumed by encoding, so a fresh one is made per call."""
+
+    def get(kind: str, size: str):
+        path = audio_files(size)
+        if kind == "path":
+            return path
+        if kind == "bytes":
+            with open(path, "rb") as f:
+                return f.read()
+        if kind == "bytesio":
+            with open(path, "rb") as f:
+                return io.BytesIO(f.read())
+        if kind == "ndarray":
+            return tone(DURATIONS[size])
+        if kind == "file":
+            return open(path, "rb")
+        raise ValueError(kind)
+
+    return get
+
+
+@pytest.fixture(autouse=True)
+def cold_audio_cache():
+    """Start every benchmark without encodings left over from the last one."""
+    audio_cache.clear()
+    yield
+    audio_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def media_server(monkeypatch):
+    """Measure serving by URL itself rather than its inline fallback."""
+    monkeypatch.setenv(MEDIA_SERVER_ENV, "1")
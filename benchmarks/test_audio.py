@@ -0,0 +1,75 @@
+"""`audio_to_base64` and `audio_to_bytes` for every `AudioData` type, cold
+and on a rerun, and preview proxies."""
+
+import tracemalloc
+
+import pytest
+from conftest import DURATIONS, sizes
+
+from streamlit_wavesurfer.cache import audio_cache
+from streamlit_wavesurfer.proxy import audio_to_proxy
+from streamlit_wavesurfer.utils import audio_to_base64, audio_to_bytes
+
+KINDS = ["path", "bytes", "bytesio", "ndarray", "file"]
+CONVERTERS = {"base64": audio_to_base64, "bytes": audio_to_bytes}
+
+
+def peak_bytes(convert, audio) -> int:
+    """Peak memory Python allocates while converting `audio` once."""
+    audio_cache.clear()
+    tracemalloc.start()
+    try:
+        convert(audio)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("size", sizes(list(DURATIONS)))
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("transport", list(CONVERTERS))
+def test_audio_encode_cold(benchmark, audio_inputs, transport, kind, size):
+    """First run: the audio is read and encoded. The peak memory of one
+    conversion is saved as `peak_bytes`."""
+    convert = CONVERTERS[transport]
+    opened = []
+
+    def setup():
+        audio_cache.clear()
+        audio = audio_inputs(kind, size)
+        if kind == "file":
+            opened.append(audio)
+        return (audio,), {}
+
+    payload = benchmark.pedantic(convert, setup=setup, rounds=5)
+    args, _ = setup()
+    benchmark.extra_info["peak_bytes"] = peak_bytes(convert, *args)
+    for f in opened:
+        f.close()
+    benchmark.extra_info["payload_bytes"] = len(payload)
+
+
+@pytest.mark.parametrize("size", sizes(list(DURATIONS)))
+@pytest.mark.parametrize("kind", KINDS)
+def test_audio_to_base64_rerun(benchmark, audio_inputs, kind, size):
+    """Later reruns with the same audio: only the cache key is computed."""
+    audio = audio_inputs(kind, size)
+    audio_to_base64(audio)
+    try:
+        benchmark(audio_to_base64, audio)
+    finally:
+        if kind == "file":
+            audio.close()
+
+
+@pytest.mark.parametrize("size", sizes(list(DURATIONS)))
+def test_audio_to_proxy_cold(benchmark, audio_files, size):
+    """Reading, downmixing, resampling and encoding a preview of a file."""
+    path = audio_files(size)
+
+    def setup():
+        audio_cache.clear()
+        return (path,), {}
+
+    preview = benchmark.pedantic(audio_to_proxy, setup=setup, rounds=3)
+    benchmark.extra_info["payload_bytes"] = len(preview)
@@ -0,0 +1,51 @@
+"""Cold-start cost of `import streamlit_wavesurfer`, measured in fresh
+interpreters with Streamlit (which every app imports first) and its component
+API already loaded."""
+
+import json
+import subprocess
+import sys
+
+# Loaded only on the code paths that need them, never by the import itself.
+DEFERRED_MODULES = [
+    "numpy",
+    "soundfile",
+    "requests",
+    "pandas",
+    "dataclasses_json",
+    "dotenv",
+]
+
+PROBE = """
+import json, sys, time
+import streamlit
+import streamlit.components.v1
+before = set(sys.modules)
+started = time.perf_counter()
+import streamlit_wavesurfer
+elapsed = time.perf_counter() - started
+print(json.dumps({"ms": elapsed * 1000, "loaded": sorted(set(sys.modules) - before)}))
+"""
+
+
+def probe() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_time(benchmark):
+    result = benchmark.pedantic(probe, rounds=5)
+    benchmark.extra_info["import_ms"] = round(result["ms"], 1)
+    benchmark.extra_info["modules_loaded"] = len(result["loaded"])
+
+
+def test_import_defers_heavy_dependencies():
+    loaded = probe()["loaded"]
+    eager = [
+        name
+        for name in DEFERRED_MODULES
+        if any(module == name or module.startswith(f"{name}.") for module in loaded)
+    ]
+    assert not eager, f"imported eagerly: {', '.join(eager)}"
@@ -0,0 +1,46 @@
+"""A full `wavesurfer()` rerun and the size of the component arguments it
+produces. Sizes are stored in each benchmark's `extra_info`, so they are saved
+and compared along with the timings."""
+
+import pytest
+from conftest import DURATIONS, REGION_COUNTS, region_dicts, sizes
+
+import streamlit_wavesurfer
+from streamlit_wavesurfer import RegionList, wavesurfer
+from streamlit_wavesurfer.metrics import payload_bytes
+
+
+@pytest.fixture
+def component_args(monkeypatch):
+    """Capture the arguments instead of rendering, which needs a session."""
+    captured = {}
+
+    def component_func(**kwargs):
+        captured.clear()
+        captured.update(kwargs)
+        return kwargs.get("default")
+
+    monkeypatch.setattr(streamlit_wavesurfer, "_component_func", component_func)
+    return captured
+
+
+@pytest.mark.parametrize("size", sizes(list(DURATIONS)))
+@pytest.mark.parametrize(
+    "transport,peaks",
+    [("bytes", False), ("base64", False), ("url", False), ("url", True)],
+)
+def test_audio_payload(benchmark, component_args, audio_files, size, transport, peaks):
+    path = audio_files(size)
+    wavesurfer(path, transport=transport, peaks=peaks)
+    benchmark(wavesurfer, path, transport=transport, peaks=peaks)
+    benchmark.extra_info["payload_bytes"] = payload_bytes(component_args)
+
+
+@pytest.mark.parametrize("count", sizes(REGION_COUNTS))
+def test_regions_payload(benchmark, component_args, audio_files, count):
+    path = audio_files("seconds")
+    regions = RegionList(region_dicts(count))
+    wavesurfer(path, regions=regions, transport="url")
+    benchmark(wavesurfer, path, regions=regions, transport="url")
+    benchmark.extra_info["payload_bytes"] = payload_bytes(component_args)
+    benchmark.extra_info["regions_bytes"] = payload_bytes(component_args["regions"])
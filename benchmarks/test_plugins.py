@@ -0,0 +1,22 @@
+"""Plugin configuration, rebuilt by `wavesurfer()` on every rerun."""
+
+import pytest
+
+from streamlit_wavesurfer.utils import PLUGIN_NAMES, WaveSurferPluginConfigurationList
+
+NAME_LISTS = {
+    "default": ["regions", "timeline", "zoom"],
+    # Overlay needs an image, so it has no defaults to build from a name.
+    "all": [name for name in PLUGIN_NAMES if name != "overlay"],
+}
+
+
+@pytest.mark.parametrize("names", list(NAME_LISTS))
+def test_from_name_list(benchmark, names):
+    benchmark(WaveSurferPluginConfigurationList.from_name_list, NAME_LISTS[names])
+
+
+@pytest.mark.parametrize("names", list(NAME_LISTS))
+def test_to_dict(benchmark, names):
+    plugins = WaveSurferPluginConfigurationList.from_name_list(NAME_LISTS[names])
+    benchmark(plugins.to_dict)
@@ -0,0 +1,56 @@
+"""Region normalization and serialization as done by `wavesurfer()`."""
+
+import pytest
+from conftest import REGION_COUNTS, region_dicts, sizes
+
+from streamlit_wavesurfer.region_store import RegionStore, as_region_list, sync_regions
+from streamlit_wavesurfer.regions import RegionList
+
+
+@pytest.mark.parametrize("count", sizes(REGION_COUNTS))
+def test_normalize_dicts(benchmark, count):
+    """A list of dicts, as most apps pass them, into a `RegionList`."""
+    regions = region_dicts(count)
+    benchmark(as_region_list, regions)
+
+
+@pytest.mark.parametrize("count", sizes(REGION_COUNTS))
+def test_normalize_dataframe(benchmark, count):
+    pd = pytest.importorskip("pandas")
+    regions = pd.DataFrame(region_dicts(count))
+    benchmark(as_region_list, regions)
+
+
+@pytest.mark.parametrize("count", sizes(REGION_COUNTS))
+def test_snapshot_unkeyed(benchmark, count):
+    """Without a key the full column-wise snapshot is built every run."""
+    regions = RegionList(region_dicts(count))
+    payload = benchmark(sync_regions, None, regions)
+    assert len(payload["regions"]["start"]) == count
+
+
+@pytest.mark.parametrize("count", sizes(REGION_COUNTS))
+def test_rerun_unchanged(benchmark, count):
+    """A keyed rerun with the same, unmodified list."""
+    regions = RegionList(region_dicts(count))
+    store = RegionStore()
+    store.update(regions)
+    benchmark(store.update, regions)
+
+
+@pytest.mark.parametrize("count", sizes(REGION_COUNTS))
+def test_rerun_one_edit(benchmark, count):
+    """A keyed rerun after one region moved: diffed into a patch."""
+    regions = RegionList(region_dicts(count))
+
+    def setup():
+        store = RegionStore()
+        store.update(regions)
+        edited = regions.copy()
+        edited[count // 2].end += 0.25
+        return (store, edited), {}
+
+    payload = benchmark.pedantic(
+        lambda store, edited: store.update(edited), setup=setup, rounds=10
+    )
+    assert len(payload["changed"]["start"]) == 1
@@ -1,64 +1,125 @@
+from __future__ import annotations
+
 __all__ = [
     "wavesurfer",
+    "wavesurfer_gallery",
+    "Clip",
     "Region",
     "RegionColormap",
     "WaveSurferOptions",
     "RegionList",
     "WaveSurferPluginConfigurationList",
     "TimelinePluginOptions",
+    "Peaks",
+    "PeakPyramid",
+    "compute_peaks",
+    "configure_cache",
+    "cache_stats",
+    "prefetch",
+    "cancel_prefetch",
+    "configure_prefetch",
 ]
 
 
+import importlib
+import time
 from os import getenv
 from pathlib import Path
-from typing import List, Literal, Optional
-
-import streamlit as st
-import streamlit.components.v1 as components
-from dotenv import load_dotenv
-
-from streamlit_wavesurfer.utils import (
-    DEFAULT_PLUGINS,
-    AudioData,
-    Colormap,
-    ImageData,
-    OverlayPluginOptions,
-    Region,
-    RegionList,
-    RegionsPluginOptions,
-    SelectPluginOptions,
-    TimelinePluginOptions,
-    WaveSurferOptions,
-    WaveSurferPluginConfiguration,
-    WaveSurferPluginConfigurationList,
-    ZoomPluginOptions,
-    audio_to_base64,
-    image_to_base64,
-)
-
-load_dotenv()
-
-# When False => run: npm start
-# When True => run: npm run build
-_RELEASE = True if getenv("RELEASE", "True") == "True" else False
-if not _RELEASE:
-    _component_func = components.declare_component(
-        "wavesurfer",
-        url="http://localhost:5432",
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Literal, Optional
+
+if TYPE_CHECKING:
+    from streamlit_wavesurfer.cache import cache_stats, configure_cache
+    from streamlit_wavesurfer.gallery import Clip
+    from streamlit_wavesurfer.peaks import PeakPyramid, Peaks, compute_peaks
+    from streamlit_wavesurfer.prefetch import (
+        cancel_prefetch,
+        configure_prefetch,
+        prefetch,
+    )
+    from streamlit_wavesurfer.regions import Region, RegionList
+    from streamlit_wavesurfer.utils import (
+        AudioData,
+        AudioEncoding,
+        Colormap,
+        TimelinePluginOptions,
+        WaveSurferOptions,
+        WaveSurferPluginConfigurationList,
     )
-else:
-    parent_dir = Path(__file__).parent
-    build_dir = parent_dir / "frontend" / "dist"
-    build_dir = build_dir.absolute()
-    if not build_dir.exists():
-        raise FileNotFoundError(f"Build directory {build_dir} does not exist")
 
-    _component_func = components.declare_component("wavesurfer", path=build_dir)
+# Public names resolved on first use, so that importing the package does not
+# load numpy, soundfile, dataclasses_json and the encoders; `wavesurfer()`
+# imports what it needs when it is first called.
+_LAZY_ATTRIBUTES = {
+    "Clip": ("streamlit_wavesurfer.gallery", "Clip"),
+    "Region": ("streamlit_wavesurfer.regions", "Region"),
+    "RegionList": ("streamlit_wavesurfer.regions", "RegionList"),
+    "RegionColormap": ("streamlit_wavesurfer.utils", "Colormap"),
+    "WaveSurferOptions": ("streamlit_wavesurfer.utils", "WaveSurferOptions"),
+    "WaveSurferPluginConfigurationList": (
+        "streamlit_wavesurfer.utils",
+        "WaveSurferPluginConfigurationList",
+    ),
+    "TimelinePluginOptions": ("streamlit_wavesurfer.utils", "TimelinePluginOptions"),
+    "Peaks": ("streamlit_wavesurfer.peaks", "Peaks"),
+    "PeakPyramid": ("streamlit_wavesurfer.peaks", "PeakPyramid"),
+    "compute_peaks": ("streamlit_wavesurfer.peaks", "compute_peaks"),
+    "configure_cache": ("streamlit_wavesurfer.cache", "configure_cache"),
+    "cache_stats": ("streamlit_wavesurfer.cache", "cache_stats"),
+    "prefetch": ("streamlit_wavesurfer.prefetch", "prefetch"),
+    "cancel_prefetch": ("streamlit_wavesurfer.prefetch", "cancel_prefetch"),
+    "configure_prefetch": ("streamlit_wavesurfer.prefetch", "configure_prefetch"),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name == "_component_func":
+        return _get_component_func()
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attribute = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+def _release() -> bool:
+    """Whether to serve the built frontend, read from the environment and
+    `.env`. When False => run: npm start; when True => run: npm run build."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return getenv("RELEASE", "True") == "True"
+
+
+def _get_component_func():
+    """Declare the component on first use, reading `.env` and checking for the
+    frontend build only then."""
+    component_func = globals().get("_component_func")
+    if component_func is not None:
+        return component_func
+    import streamlit.components.v1 as components
+
+    if not _release():
+        component_func = components.declare_component(
+            "wavesurfer",
+            url="http://localhost:5432",
+        )
+    else:
+        build_dir = (Path(__file__).parent / "frontend" / "dist").absolute()
+        if not build_dir.exists():
+            raise FileNotFoundError(f"Build directory {build_dir} does not exist")
+        component_func = components.declare_component("wavesurfer", path=build_dir)
+    globals()["_component_func"] = component_func
+    return component_func
 
 
 def wavesurfer(
     audio_src: str,
-    regions: Optional[RegionList] | List[Region] | List[dict] = None,
+    regions: Optional[RegionList] | List[Region] | List[dict] | Any = None,
     key: Optional[str] = None,
     wave_options: WaveSurferOptions = None,
     region_colormap: Optional[Colormap] = None,
@@ -76,16 +137,60 @@ def wavesurfer(
             ]
         ]
     ] = None,
+    transport: Literal["bytes", "base64", "url"] = "bytes",
+    peaks: bool | Literal["pyramid"] | Peaks = False,
+    cache_key: Optional[Hashable] = None,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+    segment_duration: Optional[float] = None,
+    proxy: bool = False,
+    metrics: bool = False,
 ) -> bool:
     """A waveform viewer that supports wavesurfer plugins
     @param audio_src: The source of the audio file.
-    @param regions: The regions to display on the waveform.
+    @param regions: The regions to display on the waveform: a `RegionList`, a
+        list of `Region`s or dicts, or a pandas DataFrame / pyarrow Table with
+        `start` and `end` columns (plus optional `content`, `color`, `drag`,
+        `resize` and `id`).
     @param key: The key of the wavesurfer component.
     @param wave_options: The options for the waveform.
     @param region_colormap: The colormap for the regions.
     @param show_controls: Whether to show the controls.
     @param plugins: The plugins to use.
-
+    @param transport: How the audio reaches the browser. "bytes" sends the
+        encoded file as a binary component argument, "base64" inlines it into
+        the JSON arguments as a data URI, "url" registers it with a local media
+        server and only passes a short, content-addressed URL. The media server
+        is opt-in (`WAVESURFER_MEDIA_SERVER=1` or `WAVESURFER_MEDIA_URL`);
+        without it "url" falls back to "bytes".
+    @param peaks: Precomputed waveform peaks. True computes min/max peaks per
+        channel in Python so the browser draws immediately without decoding the
+        audio. A `Peaks` instance from `compute_peaks` is passed through as is.
+        "pyramid" builds (once) a memory-mapped multi-resolution peak cache for
+        a file path and lets the frontend fetch the level matching the current
+        zoom from the media server, which must be enabled.
+    @param cache_key: Identity of the audio used to cache encodings across
+        reruns. Paths are keyed by path, mtime and size and arrays/buffers by a
+        sampled fingerprint when omitted; pass e.g. a row id for arrays that are
+        modified in place.
+    @param sample_rate: Sample rate of a numpy array `audio_src` (default 16000).
+    @param encoding: How a numpy array `audio_src` is encoded: "pcm16" or
+        "float32" WAV, "flac", "ogg" (Vorbis) or "opus". 16-bit encodings
+        scale float arrays beyond [-1, 1] down to fit, with a warning.
+    @param segment_duration: Windowed mode for multi-hour files. The waveform
+        is drawn from a peak pyramid and only the `segment_duration`-second
+        segments around the playhead are fetched and decoded, with the
+        neighbouring segments prefetched. Requires a local file path and the
+        media server.
+    @param proxy: Send a low-bitrate mono preview (16 kHz Opus) instead of the
+        audio itself; the waveform is drawn and played from it. The original is
+        registered with the media server, when it is enabled, and only fetched
+        when the "full quality" toggle is switched on or a region is looped.
+    @param metrics: Return a timing breakdown as `metrics`: `python` holds
+        this run's encode, peaks and regions times, whether the audio came
+        from the cache and the size of the component arguments; `frontend`
+        holds the browser's latest fetch, decode, load, first paint and region
+        mount times in milliseconds.
 
     @example
     # Use a list of regions to display on the waveform
@@ -104,11 +209,61 @@ def wavesurfer(
         plugins=["regions", "spectrogram", "timeline", "zoom", "hover", "minimap"],
     )
     ```
+
+    @example
+    # Display a 44.1 kHz stereo model output as FLAC
+    ```python
+    wavesurfer(audio_src=output, sample_rate=44100, encoding="flac")
+    ```
+
+    @example
+    # Browse 48 kHz masters from small previews
+    ```python
+    wavesurfer(audio_src="masters/take_12.wav", proxy=True)
+    ```
+
+    @example
+    # Review an eight hour recording, loading 30 s around the playhead
+    ```python
+    wavesurfer(audio_src="recordings/shift.flac", segment_duration=30)
+    ```
+
+    @example
+    # Serve a long recording by URL instead of inlining it
+    ```python
+    wavesurfer(audio_src="recordings/meeting.wav", transport="url", peaks=True)
+    ```
     Returns:
         The state of the wavesurfer component.
         regions: The regions currently displayed on the waveform.
         ts: The timestamp of the last region change.
+        metrics: The timing breakdown, with `metrics=True`.
     """
+    from streamlit_wavesurfer.audio_store import sync_audio
+    from streamlit_wavesurfer.cache import audio_cache
+    from streamlit_wavesurfer.media import MEDIA_SERVER_ENV, media_server_enabled
+    from streamlit_wavesurfer.metrics import elapsed_ms, payload_bytes
+    from streamlit_wavesurfer.peaks import PeakPyramid, Peaks, compute_peaks
+    from streamlit_wavesurfer.proxy import audio_to_proxy, proxy_cache_key
+    from streamlit_wavesurfer.region_store import (
+        as_region_list,
+        current_regions,
+        sync_regions,
+    )
+    from streamlit_wavesurfer.spectrogram import spectrogram_plugin_options
+    from streamlit_wavesurfer.utils import (
+        DEFAULT_PLUGINS,
+        WaveSurferOptions,
+        WaveSurferPluginConfigurationList,
+        audio_content_hash,
+        audio_mime_type,
+        audio_to_base64,
+        audio_to_bytes,
+        audio_to_segments,
+        audio_to_url,
+        is_local_file,
+    )
+
     if plugins is None:
         plugins = DEFAULT_PLUGINS
     # plugin config
@@ -121,37 +276,229 @@ def wavesurfer(
         plugin_configurations = plugins.to_dict()
     if isinstance(wave_options, WaveSurferOptions):
         wave_options = wave_options.to_dict()
-    audio_url: AudioData = audio_to_base64(audio_src)
-
-    if isinstance(regions, list) and all(
-        isinstance(region, dict) for region in regions
-    ):
-        regions = regions
-    elif isinstance(regions, RegionList):
-        regions = list(regions.to_dict())
-    elif all(isinstance(region, Region) for region in regions):
-        regions = [region.to_dict() for region in regions]
-
-    component_value = _component_func(
+    if proxy and segment_duration is not None:
+        raise ValueError("proxy and segment_duration cannot be combined")
+    # The browser may not reach the media server unless it is enabled.
+    serve_by_url = media_server_enabled()
+    if transport == "url" and not serve_by_url:
+        transport = "bytes"
+    if peaks == "pyramid":
+        if not isinstance(audio_src, (str, Path)) or not is_local_file(str(audio_src)):
+            raise ValueError("Peak pyramids need the path of a local audio file")
+        if not serve_by_url:
+            # Inlining every level would send more than the audio itself.
+            raise ValueError(
+                f"Peak pyramids need the media server, set {MEDIA_SERVER_ENV}=1"
+            )
+    started = time.perf_counter()
+    audio_segments = None
+    audio_bytes = None
+    full_audio_url = None
+    # The audio that is sent, and its identity: the preview in proxy mode.
+    sent_src, sent_key = audio_src, cache_key
+    if proxy:
+        sent_src = audio_to_proxy(audio_src, sample_rate=sample_rate, cache_key=cache_key)
+        sent_key = proxy_cache_key(audio_src, cache_key)
+        if serve_by_url:
+            full_audio_url = audio_to_url(
+                audio_src, cache_key=cache_key, sample_rate=sample_rate, encoding=encoding
+            )
+    if segment_duration is not None:
+        # The overview comes from the pyramid; audio is fetched per segment.
+        audio_segments = audio_to_segments(audio_src, segment_duration)
+        audio_url = None
+        peaks = "pyramid"
+    elif transport == "url":
+        audio_url: AudioData = audio_to_url(
+            sent_src, cache_key=sent_key, sample_rate=sample_rate, encoding=encoding
+        )
+    elif transport == "bytes":
+        audio_url = None
+        # The preview already is an encoded file.
+        audio_bytes = sent_src if proxy else audio_to_bytes(
+            sent_src, cache_key=sent_key, sample_rate=sample_rate, encoding=encoding
+        )
+    else:
+        audio_url: AudioData = audio_to_base64(
+            sent_src, cache_key=sent_key, sample_rate=sample_rate, encoding=encoding
+        )
+
+    audio_cache_hit = audio_cache.last_hit() if segment_duration is None else None
+    encode_ms = elapsed_ms(started)
+
+    # `plugin_configurations` is the `{"plugins": [...]}` the frontend reads.
+    configured_plugins = (
+        plugin_configurations["plugins"] if plugin_configurations else []
+    )
+    # Compute spectrograms here rather than with an FFT in the browser.
+    for plugin in configured_plugins:
+        if plugin["name"] == "spectrogram":
+            plugin["options"] = spectrogram_plugin_options(
+                audio_src,
+                plugin["options"],
+                sample_rate=sample_rate,
+                cache_key=cache_key,
+            )
+
+    started = time.perf_counter()
+    peak_pyramid = None
+    if peaks == "pyramid":
+        pyramid = PeakPyramid.open(audio_src)
+        peak_pyramid = pyramid.to_dict()
+        # Let the zoom plugin reach the finest level of the pyramid.
+        for plugin in configured_plugins:
+            options = plugin["options"]
+            if plugin["name"] == "zoom" and isinstance(options, dict):
+                plugin["options"] = {
+                    "maxZoom": pyramid.sample_rate / min(pyramid.levels),
+                    **options,
+                }
+        peaks = None
+    elif peaks is True:
+        peaks = compute_peaks(audio_src, sample_rate=sample_rate, cache_key=cache_key)
+    peaks_data = peaks.to_dict() if isinstance(peaks, Peaks) else None
+    peaks_ms = elapsed_ms(started)
+
+    # Inlined audio that the browser decodes itself is cached there under its
+    # content hash; once cached, only the hash is sent. Bytes are always sent
+    # with their hash, which the browser also uses as their identity.
+    audio_hash = None
+    decoded_in_browser = peaks_data is None and peak_pyramid is None
+    inlined = isinstance(audio_url, str) and audio_url.startswith("data:")
+    if audio_bytes is not None or (inlined and decoded_in_browser):
+        audio_hash = audio_content_hash(
+            sent_src,
+            audio_bytes if audio_bytes is not None else audio_url,
+            cache_key=sent_key,
+            sample_rate=sample_rate,
+            encoding=encoding,
+        )
+    if audio_hash is not None and decoded_in_browser:
+        if audio_bytes is not None:
+            audio_bytes = sync_audio(key, audio_bytes, audio_hash)
+        else:
+            audio_url = sync_audio(key, audio_url, audio_hash)
+
+    # Only regions added, changed or removed since the last run are sent.
+    started = time.perf_counter()
+    regions_payload = sync_regions(key, regions)
+    regions_ms = elapsed_ms(started)
+
+    args = dict(
         audio_src=audio_url,
-        regions=regions if regions else None,
-        key=key,
-        default=0,
+        audio_bytes=audio_bytes,
+        audio_mime=audio_mime_type(sent_src, encoding) if audio_bytes else None,
+        full_audio_url=full_audio_url,
+        audio_hash=audio_hash,
+        audio_segments=audio_segments,
+        regions=regions_payload,
         wave_options=wave_options,
         region_colormap=region_colormap,
         controls=show_controls,
         plugin_configurations=plugin_configurations,
+        peaks=peaks_data,
+        peak_pyramid=peak_pyramid,
+        metrics=metrics,
     )
+    component_value = _get_component_func()(key=key, default=0, **args)
+    if isinstance(component_value, dict):
+        # The component reports the version it holds rather than echoing every
+        # region back.
+        component_value = {
+            **component_value,
+            "regions": current_regions(key) if key else as_region_list(regions),
+        }
+        if metrics:
+            component_value["metrics"] = {
+                "python": {
+                    "encodeMs": encode_ms,
+                    "audioCacheHit": audio_cache_hit,
+                    "peaksMs": peaks_ms,
+                    "regionsMs": regions_ms,
+                    "payloadBytes": payload_bytes(args),
+                },
+                "frontend": component_value.get("metrics") or {},
+            }
     return component_value
 
 
-if not _RELEASE:
+def wavesurfer_gallery(
+    clips: List[Clip] | List[dict] | List[AudioData],
+    key: Optional[str] = None,
+    wave_options: WaveSurferOptions = None,
+    region_colormap: Optional[Colormap] = None,
+    peaks: bool = True,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+) -> Dict[str, Any]:
+    """Many small waveforms in a single component, e.g. for reviewing hundreds
+    of clips on one page.
+
+    Waveforms are only mounted while they are scrolled into view, clips are
+    served by URL from the media server rather than inlined, and one clip
+    plays at a time. Clips other than URLs need the media server.
+    @param clips: `Clip`s, dicts of `Clip` fields, or bare audio sources.
+    @param key: The key of the component.
+    @param wave_options: The options for every waveform.
+    @param region_colormap: The colormap for the regions.
+    @param peaks: Precompute each clip's peaks in Python so the browser does
+        not decode the audio to draw it.
+    @param sample_rate: Sample rate of numpy array clips (default 16000).
+    @param encoding: How numpy array clips are encoded, see `wavesurfer`.
+
+    @example
+    ```python
+    state = wavesurfer_gallery(
+        [Clip(path, regions=regions, id=path) for path, regions in rows],
+        key="qa",
+    )
+    state["selected"]        # id of the clip last clicked or played
+    state["regions"][clip_id]  # its regions, with edits applied
+    ```
+    Returns:
+        selected: The id of the selected clip, or None.
+        regions: The regions of every clip by id, as `RegionList`s.
+    """
+    from streamlit_wavesurfer.gallery import as_clip, gallery_payload, gallery_value
+    from streamlit_wavesurfer.utils import WaveSurferOptions
+
+    clips = [as_clip(clip) for clip in clips]
+    if isinstance(wave_options, WaveSurferOptions):
+        wave_options = wave_options.to_dict()
+    component_value = _get_component_func()(
+        gallery=gallery_payload(
+            clips, peaks=peaks, sample_rate=sample_rate, encoding=encoding
+        ),
+        key=key,
+        default=None,
+        wave_options=wave_options,
+        region_colormap=region_colormap,
+    )
+    return gallery_value(clips, component_value)
+
+
+# The demo app only runs under `streamlit run streamlit_wavesurfer/__init__.py`,
+# never on import.
+if __name__ == "__main__" and not _release():
     import json
-    from pathlib import Path
 
     import pandas as pd
     import streamlit as st
 
+    from streamlit_wavesurfer.regions import Region, RegionList
+    from streamlit_wavesurfer.utils import (
+        Colormap,
+        ImageData,
+        OverlayPluginOptions,
+        RegionsPluginOptions,
+        SelectPluginOptions,
+        TimelinePluginOptions,
+        WaveSurferOptions,
+        WaveSurferPluginConfiguration,
+        ZoomPluginOptions,
+        image_to_base64,
+    )
+
     @st.cache_data
     def _dev_regions() -> List[Region]:
         """Sample regions from the audio file."""
@@ -0,0 +1,30 @@
+from typing import Optional, Union
+
+import streamlit as st
+
+# Session state key prefix of the hashes each component has cached.
+CACHED_PREFIX = "_wavesurfer_audio_"
+
+
+def sync_audio(
+    key: Optional[str],
+    audio_src: Optional[Union[str, bytes]],
+    audio_hash: Optional[str],
+) -> Optional[Union[str, bytes]]:
+    """Return the audio to send to the keyed component, or None when its
+    browser cache already holds `audio_hash`.
+
+    The component reports each hash it has stored as `audioCached`. When it is
+    sent only a hash that is no longer in its cache it reports `audioResync`
+    with that hash, and the audio is sent again on the rerun that triggers.
+    """
+    if key is None or audio_hash is None:
+        return audio_src
+    cached = st.session_state.setdefault(f"{CACHED_PREFIX}{key}", set())
+    value = st.session_state.get(key)
+    if isinstance(value, dict):
+        if value.get("audioCached"):
+            cached.add(value["audioCached"])
+        if value.get("audioResync"):
+            cached.discard(value["audioResync"])
+    return None if audio_hash in cached else audio_src
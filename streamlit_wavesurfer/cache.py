@@ -0,0 +1,453 @@
+import atexit
+import dataclasses
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+
+import numpy as np
+
+# Root directory for on-disk caches (peak pyramids, downloads, ...).
+CACHE_DIR_ENV = "WAVESURFER_CACHE_DIR"
+
+
+def get_cache_dir(name: str) -> Path:
+    """Return (and create) a named subdirectory of the on-disk cache."""
+    root = os.getenv(CACHE_DIR_ENV) or Path.home() / ".cache" / "streamlit_wavesurfer"
+    cache_dir = Path(root) / name
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+# Number of evenly spaced samples taken from large buffers and arrays.
+FINGERPRINT_SAMPLES = 64
+FINGERPRINT_CHUNK = 4096
+
+
+def fingerprint_buffer(data: Union[bytes, bytearray, memoryview]) -> str:
+    """Hash the length plus the head, tail and evenly spaced chunks of a buffer.
+
+    The cost is independent of the buffer size. Edits that only touch unsampled
+    bytes are not detected; pass an explicit cache key in that case.
+    """
+    view = memoryview(data).cast("B")
+    size = len(view)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    if size <= FINGERPRINT_SAMPLES * FINGERPRINT_CHUNK:
+        digest.update(view)
+        return digest.hexdigest()
+    step = (size - FINGERPRINT_CHUNK) // (FINGERPRINT_SAMPLES - 1)
+    for i in range(FINGERPRINT_SAMPLES):
+        offset = i * step
+        digest.update(view[offset : offset + FINGERPRINT_CHUNK])
+    return digest.hexdigest()
+
+
+def fingerprint_reader(reader: Any) -> Optional[str]:
+    """Like `fingerprint_buffer` for the rest of a seekable reader, reading only
+    the sampled chunks. The position is restored afterwards.
+
+    Returns None when the reader does not yield bytes.
+    """
+    position = reader.tell()
+    try:
+        size = reader.seek(0, io.SEEK_END) - position
+        digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+        if size <= FINGERPRINT_SAMPLES * FINGERPRINT_CHUNK:
+            offsets, length = [0], size
+        else:
+            step = (size - FINGERPRINT_CHUNK) // (FINGERPRINT_SAMPLES - 1)
+            offsets = [i * step for i in range(FINGERPRINT_SAMPLES)]
+            length = FINGERPRINT_CHUNK
+        for offset in offsets:
+            reader.seek(position + offset)
+            chunk = _read_exactly(reader, length)
+            if chunk is None:
+                return None
+            digest.update(chunk)
+        return digest.hexdigest()
+    finally:
+        reader.seek(position)
+
+
+def _read_exactly(reader: Any, size: int) -> Optional[bytes]:
+    """Read `size` bytes, looping over short reads, or up to the end."""
+    chunks = []
+    while size > 0:
+        chunk = reader.read(size)
+        if not isinstance(chunk, (bytes, bytearray)):
+            return None
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def fingerprint_array(array: np.ndarray) -> str:
+    """Hash the shape, dtype and evenly spaced elements of an array without
+    copying it, whatever its memory layout."""
+    digest = hashlib.blake2b(
+        f"{array.shape}:{array.dtype.str}".encode(), digest_size=16
+    )
+    if array.size:
+        limit = FINGERPRINT_SAMPLES * FINGERPRINT_CHUNK
+        index = np.linspace(0, array.size - 1, min(array.size, limit), dtype=np.int64)
+        digest.update(np.ascontiguousarray(array.flat[index]).tobytes())
+    return digest.hexdigest()
+
+
+class _Unkeyed:
+    """Identity of an input that has no stable one, see `audio_cache_key`."""
+
+    def __repr__(self) -> str:
+        return "UNKEYED"
+
+
+UNKEYED = _Unkeyed()
+
+
+def is_cacheable(key: Hashable) -> bool:
+    """Whether `key` identifies its input, i.e. does not contain `UNKEYED`."""
+    if isinstance(key, tuple):
+        return all(is_cacheable(part) for part in key)
+    return key is not UNKEYED
+
+
+def audio_cache_key(audio_data: Any, cache_key: Optional[Hashable] = None) -> Hashable:
+    """Return a small, cheap-to-hash key identifying an audio input.
+
+    - An explicit `cache_key` always wins, e.g. a row id or a model output id.
+    - Paths are keyed by (path, mtime, size), so edited files are picked up
+      without reading them.
+    - Arrays and buffers are keyed by a sampled fingerprint whose cost does not
+      grow with the size of the audio.
+    - URLs and data URIs are keyed by the string itself.
+    - Other seekable readers are keyed by the same sampled fingerprint of their
+      content from the current position, read chunk by chunk.
+      Anything else is `UNKEYED` and not cached, as object ids are reused.
+    """
+    if cache_key is not None:
+        return ("key", cache_key)
+    if isinstance(audio_data, (str, Path)):
+        path = Path(audio_data)
+        try:
+            stat = path.stat()
+        except (OSError, ValueError):
+            return ("str", str(audio_data))
+        return ("path", str(path.absolute()), stat.st_mtime_ns, stat.st_size)
+    if isinstance(audio_data, np.ndarray):
+        return ("array", fingerprint_array(audio_data))
+    if isinstance(audio_data, (bytes, bytearray, memoryview)):
+        return ("bytes", fingerprint_buffer(audio_data))
+    if isinstance(audio_data, io.BytesIO):
+        return ("bytes", fingerprint_buffer(audio_data.getbuffer()))
+    name = getattr(audio_data, "name", None)
+    if isinstance(name, (str, Path)) and Path(name).exists():
+        return ("file",) + audio_cache_key(name)[1:]
+    seekable = getattr(audio_data, "seekable", None)
+    if callable(getattr(audio_data, "read", None)) and callable(seekable) and seekable():
+        fingerprint = fingerprint_reader(audio_data)
+        if fingerprint is not None:
+            return ("stream", fingerprint)
+    return UNKEYED
+
+
+# Byte budgets of the in-memory caches, and of the optional on-disk tier that
+# evicted encodings spill to (0 disables it).
+CACHE_MAX_BYTES_ENV = "WAVESURFER_CACHE_MAX_BYTES"
+CACHE_SPILL_BYTES_ENV = "WAVESURFER_CACHE_SPILL_BYTES"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_IMAGE_MAX_BYTES = 64 * 1024 * 1024
+# Charged per entry on top of its value, so tiny values are bounded too.
+ENTRY_OVERHEAD = 256
+# Approximate size of a float or int inside a Python list.
+BOXED_NUMBER_SIZE = 32
+
+
+def value_size(value: Any) -> int:
+    """Approximate memory held by a cached value, in bytes."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (int, float)):
+            return sys.getsizeof(value) + len(value) * BOXED_NUMBER_SIZE
+        return sys.getsizeof(value) + sum(value_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_size(item) for item in value.values())
+    if dataclasses.is_dataclass(value):
+        return value_size(vars(value))
+    return sys.getsizeof(value)
+
+
+class _SpillTier:
+    """Evicted str/bytes values kept as files, least recently used removed
+    first once they exceed `max_bytes`.
+
+    Keys such as explicit cache keys only hold within one process, so the
+    files live in a directory of their own that is removed on exit.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._files: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._directory: Optional[Path] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: Hashable, suffix: str) -> Path:
+        if self._directory is None:
+            self._directory = Path(tempfile.mkdtemp(dir=get_cache_dir("spill")))
+            atexit.register(shutil.rmtree, self._directory, True)
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return self._directory / f"{name}{suffix}"
+
+    def put(self, key: Hashable, value: Any, size: int) -> bool:
+        if size > self.max_bytes or not isinstance(value, (str, bytes, bytearray)):
+            return False
+        text = isinstance(value, str)
+        with self._lock:
+            path = self._path(key, ".txt" if text else ".bin")
+            self._discard(key)
+        try:
+            path.write_bytes(value.encode() if text else value)
+        except OSError:
+            return False
+        with self._lock:
+            # A concurrent put of the same key wrote the same file.
+            previous = self._files.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._files[key] = (path, size, text)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._discard(next(iter(self._files)))
+        return True
+
+    def take(self, key: Hashable) -> Optional[tuple]:
+        """Remove `key` from the tier, returning its (path, size, text). The
+        caller reads and then deletes the file."""
+        with self._lock:
+            entry = self._files.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+            return entry
+
+    def _discard(self, key: Hashable):
+        entry = self._files.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+            entry[0].unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._files):
+                self._discard(key)
+
+
+class MemoryCache:
+    """Thread-safe LRU cache of encoded audio keyed by `audio_cache_key`.
+
+    Unlike `st.cache_data`, values are returned as stored rather than copied
+    through pickle, so a hit costs the same regardless of the value's size.
+    The cache is bounded by the approximate bytes its values hold rather than
+    by their number; with `spill_bytes`, evicted strings and bytes move to an
+    on-disk tier and are promoted back on their next hit.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, spill_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._spill = _SpillTier(spill_bytes) if spill_bytes > 0 else None
+        # Keys being computed, set once their value is stored (or not).
+        self._computing: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        # Each Streamlit session runs its script on its own thread.
+        self._local = threading.local()
+        self.hits = self.misses = self.evictions = 0
+        self.spills = self.spill_hits = 0
+
+    def configure(self, max_bytes: Optional[int] = None, spill_bytes: Optional[int] = None):
+        """Change the byte budgets, evicting (or dropping spilled) entries that
+        no longer fit."""
+        with self._lock:
+            if spill_bytes is not None:
+                if self._spill is not None:
+                    self._spill.clear()
+                self._spill = _SpillTier(spill_bytes) if spill_bytes > 0 else None
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            evicted = self._evict()
+        self._spill_all(evicted)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for `key`, computing it on a miss. A caller
+        that finds `key` being computed on another thread (e.g. by `prefetch`)
+        waits for that result instead of computing it again. Keys that are not
+        `is_cacheable` are computed every time."""
+        if not is_cacheable(key):
+            self._local.hit = False
+            with self._lock:
+                self.misses += 1
+            return compute()
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self._local.hit = True
+                    self.hits += 1
+                    return self._entries[key][0]
+                computing = self._computing.get(key)
+                if computing is None:
+                    computing = self._computing[key] = threading.Event()
+                    break
+            # Retried afterwards: a value that was not stored is computed here.
+            computing.wait()
+        try:
+            return self._load_or_compute(key, compute)
+        finally:
+            with self._lock:
+                del self._computing[key]
+            computing.set()
+
+    def _load_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            spilled = self._spill.take(key) if self._spill is not None else None
+        if spilled is not None:
+            path, size, text = spilled
+            try:
+                value = path.read_text() if text else path.read_bytes()
+            except OSError:
+                value = None
+            path.unlink(missing_ok=True)
+            if value is not None:
+                with self._lock:
+                    self._local.hit = True
+                    self.hits += 1
+                    self.spill_hits += 1
+                    evicted = self._store(key, value, size)
+                self._spill_all(evicted)
+                return value
+        self._local.hit = False
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        if value is None:
+            return value
+        size = value_size(value) + ENTRY_OVERHEAD
+        with self._lock:
+            evicted = self._store(key, value, size)
+        self._spill_all(evicted)
+        return value
+
+    def _store(self, key: Hashable, value: Any, size: int) -> list:
+        """Insert an entry and return the (key, value, size) entries evicted
+        to make room. Called with the lock held."""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[1]
+        if size > self.max_bytes:
+            # Never held in memory; still worth keeping on disk.
+            return [(key, value, size)]
+        self._entries[key] = (value, size)
+        self.bytes += size
+        return self._evict()
+
+    def _evict(self) -> list:
+        evicted = []
+        while self.bytes > self.max_bytes and self._entries:
+            key, (value, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            evicted.append((key, value, size))
+        return evicted
+
+    def _spill_all(self, evicted: list):
+        """Write evicted entries to the disk tier, outside the lock."""
+        spill = self._spill
+        if spill is None:
+            return
+        spilled = sum(spill.put(key, value, size) for key, value, size in evicted)
+        if spilled:
+            with self._lock:
+                self.spills += spilled
+
+    def last_hit(self) -> Optional[bool]:
+        """Whether the last lookup on this thread was a hit, None before any."""
+        return getattr(self._local, "hit", None)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters and sizes for monitoring."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "spills": self.spills,
+                "spill_hits": self.spill_hits,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "spill_bytes": self._spill.bytes if self._spill is not None else 0,
+                "spill_max_bytes": self._spill.max_bytes if self._spill is not None else 0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            if self._spill is not None:
+                self._spill.clear()
+
+
+def _env_bytes(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# Shared by every audio encoder (base64, media URLs, peaks).
+audio_cache = MemoryCache(
+    max_bytes=_env_bytes(CACHE_MAX_BYTES_ENV, DEFAULT_MAX_BYTES),
+    spill_bytes=_env_bytes(CACHE_SPILL_BYTES_ENV, 0),
+)
+# Overlay images encoded by `image_to_base64`.
+image_cache = MemoryCache(max_bytes=DEFAULT_IMAGE_MAX_BYTES)
+
+
+def configure_cache(
+    max_bytes: Optional[int] = None,
+    spill_bytes: Optional[int] = None,
+    image_max_bytes: Optional[int] = None,
+):
+    """Set the byte budgets of the encoding caches.
+
+    Parameters:
+    ----------
+    max_bytes : Optional[int]
+        Memory held by encoded audio, peaks and spectrogram URLs. Defaults to
+        `WAVESURFER_CACHE_MAX_BYTES` or 512 MiB.
+    spill_bytes : Optional[int]
+        Disk space for encoded audio evicted from memory, 0 to disable the disk
+        tier. Defaults to `WAVESURFER_CACHE_SPILL_BYTES` or 0.
+    image_max_bytes : Optional[int]
+        Memory held by encoded overlay images. Defaults to 64 MiB.
+    """
+    audio_cache.configure(max_bytes=max_bytes, spill_bytes=spill_bytes)
+    image_cache.configure(max_bytes=image_max_bytes)
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit, miss, eviction and spill counters plus sizes of the encoding
+    caches, e.g. to export to a monitoring system."""
+    return {"audio": audio_cache.stats(), "image": image_cache.stats()}
@@ -0,0 +1,229 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple, Union
+
+from streamlit_wavesurfer.cache import _env_bytes, get_cache_dir
+from streamlit_wavesurfer.media import hash_bytes
+
+if TYPE_CHECKING:
+    import requests
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT: Tuple[float, float] = (5.0, 30.0)
+# Largest download accepted, override with WAVESURFER_MAX_DOWNLOAD_BYTES.
+MAX_DOWNLOAD_BYTES_ENV = "WAVESURFER_MAX_DOWNLOAD_BYTES"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Disk space for cached downloads; the least recently used are removed first.
+DOWNLOAD_CACHE_BYTES_ENV = "WAVESURFER_DOWNLOAD_CACHE_BYTES"
+DEFAULT_DOWNLOAD_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+# Partial downloads older than this were left behind by a crashed process.
+STALE_PART_SECONDS = 24 * 60 * 60
+CHUNK_SIZE = 256 * 1024
+POOL_SIZE = 32
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+
+@dataclass
+class CachedDownload:
+    """A remote file mirrored in the on-disk download cache."""
+
+    url: str
+    path: Path
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # False when the server answered 304 Not Modified.
+    downloaded: bool = True
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+
+def get_session() -> "requests.Session":
+    """Return the process-wide pooled session used for all downloads."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retries = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retries
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def _max_bytes() -> int:
+    return int(os.getenv(MAX_DOWNLOAD_BYTES_ENV, DEFAULT_MAX_BYTES))
+
+
+def fetch_url(
+    url: str,
+    timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+    max_bytes: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+) -> CachedDownload:
+    """Download `url` into the on-disk cache, revalidating any cached copy.
+
+    The body is streamed to disk in chunks, so it is never held in memory as a
+    whole. A cached copy is revalidated with If-None-Match/If-Modified-Since and
+    reused on 304 Not Modified, so unchanged files are not downloaded again
+    across cache misses or worker restarts.
+
+    Parameters:
+    ----------
+    url : str
+        http(s) URL of the file.
+    timeout : float | Tuple[float, float]
+        Connect and read timeout in seconds.
+    max_bytes : Optional[int]
+        Size cap for the download, defaults to WAVESURFER_MAX_DOWNLOAD_BYTES or
+        512 MiB.
+    cache_dir : Optional[Path]
+        Where downloads are stored, defaults to the "downloads" cache directory.
+
+    Returns:
+    -------
+    CachedDownload
+        The cached file and its validators.
+
+    Raises:
+    ------
+    requests.HTTPError
+        If the server does not answer with 200 or 304.
+    ValueError
+        If the file is larger than `max_bytes`.
+    """
+    if max_bytes is None:
+        max_bytes = _max_bytes()
+    cache_dir = Path(cache_dir or get_cache_dir("downloads"))
+    key = hash_bytes(url.encode())
+    body_path = cache_dir / key
+    meta_path = cache_dir / f"{key}.json"
+
+    cached = None
+    if body_path.exists() and meta_path.exists():
+        try:
+            with open(meta_path) as f:
+                cached = CachedDownload(path=body_path, **json.load(f))
+        except (OSError, ValueError, TypeError):
+            cached = None
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    with get_session().get(
+        url, headers=headers, stream=True, timeout=timeout
+    ) as response:
+        if response.status_code == 304 and cached is not None:
+            cached.downloaded = False
+            # The modification time orders downloads for `sweep_downloads`.
+            os.utime(body_path)
+            return cached
+        if response.status_code != 200:
+            import requests
+
+            raise requests.HTTPError(
+                f"Failed to download audio from URL: {url}", response=response
+            )
+        content_length = int(response.headers.get("Content-Length") or 0)
+        if max_bytes and content_length > max_bytes:
+            raise ValueError(
+                f"Audio at {url} is {content_length} bytes, above the {max_bytes} byte limit"
+            )
+        fd, tmp_name = tempfile.mkstemp(dir=cache_dir, prefix=f"{key}.", suffix=".part")
+        try:
+            size = 0
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes:
+                        raise ValueError(
+                            f"Audio at {url} exceeds the {max_bytes} byte limit"
+                        )
+                    f.write(chunk)
+            # A body is only used along with its metadata: drop the old
+            # metadata first, so the new body is never paired with it.
+            meta_path.unlink(missing_ok=True)
+            os.replace(tmp_name, body_path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        download = CachedDownload(
+            url=url,
+            path=body_path,
+            content_type=response.headers.get("Content-Type"),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    fd, tmp_name = tempfile.mkstemp(dir=cache_dir, prefix=f"{key}.", suffix=".part")
+    with os.fdopen(fd, "w") as f:
+        json.dump(
+            {
+                "url": download.url,
+                "content_type": download.content_type,
+                "etag": download.etag,
+                "last_modified": download.last_modified,
+            },
+            f,
+        )
+    os.replace(tmp_name, meta_path)
+    sweep_downloads(cache_dir, keep=body_path)
+    return download
+
+
+def sweep_downloads(
+    cache_dir: Optional[Path] = None,
+    max_bytes: Optional[int] = None,
+    keep: Optional[Path] = None,
+):
+    """Remove the least recently used downloads until the cache fits in
+    `max_bytes`, defaulting to WAVESURFER_DOWNLOAD_CACHE_BYTES or 2 GiB, along
+    with partial downloads abandoned by crashed processes. `keep` is never
+    removed."""
+    if max_bytes is None:
+        max_bytes = _env_bytes(DOWNLOAD_CACHE_BYTES_ENV, DEFAULT_DOWNLOAD_CACHE_BYTES)
+    cache_dir = Path(cache_dir or get_cache_dir("downloads"))
+    bodies = []
+    now = time.time()
+    for path in cache_dir.iterdir():
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if path.suffix == ".part":
+            if now - stat.st_mtime > STALE_PART_SECONDS:
+                path.unlink(missing_ok=True)
+        elif not path.suffix:
+            bodies.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in bodies)
+    for _, size, path in sorted(bodies):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        path.with_suffix(".json").unlink(missing_ok=True)
+        path.unlink(missing_ok=True)
+        total -= size
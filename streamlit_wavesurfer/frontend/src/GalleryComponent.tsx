@@ -0,0 +1,64 @@
+import { Streamlit } from "streamlit-component-lib"
+import { useCallback, useEffect, useRef, useState } from "react"
+import WaveSurfer from "wavesurfer.js"
+import { GalleryClip } from "@waveformviewer/GalleryClip"
+import { GalleryClipData, RegionColumns, WaveSurferUserOptions } from "@waveformviewer/types"
+
+export interface GalleryComponentProps {
+    args: {
+        gallery: GalleryClipData[];
+        wave_options: WaveSurferUserOptions;
+        region_colormap: string | null;
+    };
+}
+
+/**
+ * Many clips in one component: one iframe and React root for the whole page,
+ * waveforms mounted only near the viewport, and a single clip playing at a
+ * time. Reports the selected clip and the regions of every edited clip.
+ */
+const GalleryComponent = ({ args }: GalleryComponentProps) => {
+    const clips = args.gallery;
+    const [selected, setSelected] = useState<string | null>(null);
+    const [edits, setEdits] = useState<Record<string, RegionColumns>>({});
+    const playing = useRef<WaveSurfer | null>(null);
+
+    useEffect(() => {
+        Streamlit.setFrameHeight();
+    }, [clips.length]);
+
+    useEffect(() => {
+        // Nothing to report until a clip is selected or edited.
+        if (selected === null && Object.keys(edits).length === 0) return;
+        Streamlit.setComponentValue({ selected, edits });
+    }, [selected, edits]);
+
+    const handleSelect = useCallback((id: string) => setSelected(id), []);
+    const handleEdit = useCallback((id: string, regions: RegionColumns) => {
+        setEdits((current) => ({ ...current, [id]: regions }));
+    }, []);
+    const handlePlay = useCallback((ws: WaveSurfer) => {
+        if (playing.current && playing.current !== ws) playing.current.pause();
+        playing.current = ws;
+    }, []);
+
+    return (
+        <div className="flex flex-col gap-2 p-4 w-full box-border">
+            {clips.map((clip) => (
+                <GalleryClip
+                    key={clip.id}
+                    clip={clip}
+                    regions={edits[clip.id] ?? clip.regions}
+                    waveOptions={args.wave_options}
+                    colormapName={args.region_colormap ?? "magma"}
+                    selected={selected === clip.id}
+                    onSelect={handleSelect}
+                    onPlay={handlePlay}
+                    onEdit={handleEdit}
+                />
+            ))}
+        </div>
+    );
+};
+
+export default GalleryComponent;
@@ -1,68 +1,119 @@
-import {
-    Streamlit,
-    withStreamlitConnection,
-} from "streamlit-component-lib"
-import { useEffect } from "react"
+import { Streamlit } from "streamlit-component-lib"
+import { useEffect, useRef } from "react"
 import { WavesurferViewer } from "@/components/waveformviewer/WaveformViewer"
-import { Region } from "@/components/waveformviewer/types"
+import { Peaks, PeakPyramid, AudioSegments, RegionsPayload, isRegionPatch, regionsFromColumns } from "@/components/waveformviewer/types"
 import { WaveSurferUserOptions } from "@/components/waveformviewer/types"
 import { Suspense } from "react"
 import { useAtom, useAtomValue, useSetAtom } from "jotai"
-import { regionsAtom, setRegionsAtom, instantRegionHighlightAtom } from "@waveformviewer/atoms/regions"
+import {
+    setRegionsAtom,
+    applyRegionPatchAtom,
+    recolorRegionsAtom,
+    instantRegionHighlightAtom,
+    virtualizeRegionsAtom,
+} from "@waveformviewer/atoms/regions"
 import { WaveSurferPluginConfigurationNested } from "@waveformviewer/atoms/plugins"
 import { pluginsAtom } from "@waveformviewer/atoms/plugins"
 import { waveSurferAtom } from "./components/waveformviewer/atoms/wavesurfer"
 import { keyAtom } from "./components/waveformviewer/atoms/key"
+import { getMetrics, onMetrics } from "@waveformviewer/metrics"
 
 export interface WavesurferComponentProps {
     args: {
-        regions: Array<{
-            id: string;
-            start: number;
-            end: number;
-            content: string;
-            color?: string;
-            drag?: boolean;
-            resize?: boolean;
-        }>;
-        audio_src: string;
+        regions: RegionsPayload | null;
+        audio_src: string | null;
+        // Sent by Streamlit as binary, not inside the JSON arguments.
+        audio_bytes: Uint8Array | null;
+        audio_mime: string | null;
+        audio_hash: string | null;
+        // Proxy mode: the original, fetched only when full quality is needed.
+        full_audio_url: string | null;
+        audio_segments: AudioSegments | null;
+        peaks: Peaks | null;
+        peak_pyramid: PeakPyramid | null;
         wave_options: WaveSurferUserOptions;
         plugin_configurations: WaveSurferPluginConfigurationNested;
         region_colormap: string;
         key: string;
         controls: boolean;
+        metrics: boolean;
     };
 }
 
 const WavesurferComponent = ({ args }: WavesurferComponentProps) => {
     const [key, setKey] = useAtom(keyAtom);
-    const [regions] = useAtom(regionsAtom);
     const setRegions = useSetAtom(setRegionsAtom);
+    const applyRegionPatch = useSetAtom(applyRegionPatchAtom);
+    const recolorRegions = useSetAtom(recolorRegionsAtom);
     const setInstantRegionHighlight = useSetAtom(instantRegionHighlightAtom);
+    const setVirtualizeRegions = useSetAtom(virtualizeRegionsAtom);
     const { ready: waveformReady } = useAtomValue(waveSurferAtom);
+    // Region version currently displayed, reported back to Python.
+    const regionsVersion = useRef<number | null>(null);
+    const resyncRequested = useRef(false);
+    const regionColors = useRef<string | null>(null);
+    // Audio hashes stored in the browser cache, or missing from it, for Python.
+    const audioCached = useRef<string | null>(null);
+    const audioResync = useRef<string | null>(null);
+
+    const reportValue = (extra: Record<string, unknown> = {}) => {
+        Streamlit.setComponentValue({
+            ready: waveformReady,
+            key: key,
+            syncChannelId: `streamlit-wavesurfer-sync-${key}`,
+            regionsVersion: regionsVersion.current,
+            audioCached: audioCached.current,
+            audioResync: audioResync.current,
+            ...(args.metrics ? { metrics: getMetrics() } : {}),
+            ...extra,
+        });
+    };
+    const reportValueRef = useRef(reportValue);
+    reportValueRef.current = reportValue;
+
+    // Send new timings once they settle; each report triggers a rerun.
     useEffect(() => {
+        if (!args.metrics) return;
+        return onMetrics(() => reportValueRef.current());
+    }, [args.metrics]);
 
-        if (!args.regions || args.regions.length === 0 || !args.region_colormap) return;
+    useEffect(() => {
+        const payload = args.regions;
+        if (!payload || !args.region_colormap) return;
+        if (payload.version !== null && payload.version === regionsVersion.current) return;
         const regionOpacity = args.wave_options?.regionOpacity ?? 0.2;
         const regionLightening = args.wave_options?.regionLightening ?? 50;
-        if (args.regions.length !== regions.length) {
-            setRegions({ regions: args.regions as Region[], colormapName: args.region_colormap, regionOpacity, regionLightening });
+        if (isRegionPatch(payload)) {
+            if (payload.baseVersion !== regionsVersion.current) {
+                // A version was missed (e.g. after a remount), ask for a snapshot.
+                if (!resyncRequested.current) {
+                    resyncRequested.current = true;
+                    reportValue({ regionsResync: true });
+                }
+                return;
+            }
+            applyRegionPatch({ patch: payload, regionLightening });
+            regionsVersion.current = payload.version;
             return;
         }
-        const isSame = args.regions.every((region, index) => {
-            const current = regions[index];
-            return (
-                region.id === current.id &&
-                region.start === current.start &&
-                region.end === current.end &&
-                region.content === current.content &&
-                region.color === current.color
-            );
-        });
-        if (!isSame) {
-            setRegions({ regions: args.regions as Region[], colormapName: args.region_colormap, regionOpacity, regionLightening });
+        setRegions({ regions: regionsFromColumns(payload.regions), colormapName: args.region_colormap, regionOpacity, regionLightening });
+        regionsVersion.current = payload.version;
+        if (resyncRequested.current) {
+            resyncRequested.current = false;
+            reportValue({ regionsResync: false });
+        }
+    }, [args.regions]);
+
+    useEffect(() => {
+        if (!args.region_colormap) return;
+        const regionOpacity = args.wave_options?.regionOpacity ?? 0.2;
+        const regionLightening = args.wave_options?.regionLightening ?? 50;
+        const colors = `${args.region_colormap}:${regionOpacity}:${regionLightening}`;
+        if (regionColors.current !== null && regionColors.current !== colors) {
+            recolorRegions({ colormapName: args.region_colormap, regionOpacity, regionLightening });
         }
-    }, [args.regions, args.region_colormap, args.wave_options?.regionOpacity, args.wave_options?.regionLightening]);
+        regionColors.current = colors;
+    }, [args.region_colormap, args.wave_options?.regionOpacity, args.wave_options?.regionLightening]);
 
     useEffect(() => {
         setKey(args.key);
@@ -72,15 +123,14 @@ const WavesurferComponent = ({ args }: WavesurferComponentProps) => {
         setInstantRegionHighlight(args.wave_options?.instantRegionHighlight ?? false);
     }, [args.wave_options?.instantRegionHighlight, setInstantRegionHighlight]);
 
+    useEffect(() => {
+        setVirtualizeRegions(args.wave_options?.virtualizeRegions ?? false);
+    }, [args.wave_options?.virtualizeRegions, setVirtualizeRegions]);
+
     useEffect(() => {
         if (!waveformReady) return;
         Streamlit.setFrameHeight();
-        Streamlit.setComponentValue({
-            ready: true,
-            regions: args.regions,
-            key: key,
-            syncChannelId: `streamlit-wavesurfer-sync-${key}`
-        });
+        reportValue();
     }, [waveformReady]);
 
 
@@ -107,10 +157,28 @@ const WavesurferComponent = ({ args }: WavesurferComponentProps) => {
         <Suspense fallback={<div>Loading...</div>}>
             <WavesurferViewer
                 audioSrc={audioSrc}
+                audioBytes={args.audio_bytes}
+                audioMime={args.audio_mime}
+                fullAudioUrl={args.full_audio_url}
+                peaks={args.peaks}
+                peakPyramid={args.peak_pyramid}
+                audioSegments={args.audio_segments}
                 waveOptions={waveOptions}
+                audioHash={args.audio_hash}
                 onReady={() => {
                     console.log("onReady")
                 }}
+                onAudioCached={(hash) => {
+                    if (audioCached.current === hash && !audioResync.current) return;
+                    audioCached.current = hash;
+                    audioResync.current = null;
+                    reportValue();
+                }}
+                onAudioMissing={(hash) => {
+                    if (audioResync.current === hash) return;
+                    audioResync.current = hash;
+                    reportValue();
+                }}
                 regionColormap={args.region_colormap}
                 showControls={args.controls}
             />
@@ -126,4 +194,4 @@ const WavesurferComponent = ({ args }: WavesurferComponentProps) => {
     );
 };
 
-export default withStreamlitConnection(WavesurferComponent);
+export default WavesurferComponent;
@@ -8,9 +8,12 @@ export interface AudioControlsProps {
     skipForward: () => void;
     currentTime: number;
     duration: number;
+    // Shown for preview proxies only; null hides the toggle.
+    fullQuality?: boolean | null;
+    onFullQualityChange?: (fullQuality: boolean) => void;
 }
 
-export const AudioControls = ({ skipBackward, isPlaying, pause, play, skipForward, currentTime, duration }: AudioControlsProps) => {
+export const AudioControls = ({ skipBackward, isPlaying, pause, play, skipForward, currentTime, duration, fullQuality, onFullQualityChange }: AudioControlsProps) => {
     const formatTime = useTimeFormatter();
     return (
         <div className="flex justify-center items-center gap-2">
@@ -41,6 +44,15 @@ export const AudioControls = ({ skipBackward, isPlaying, pause, play, skipForwar
                     <span>/</span>
                     <span>{formatTime(duration)}</span>
                 </div>
+
+                {fullQuality != null && <label className="flex items-center gap-2 text-white text-sm cursor-pointer">
+                    <input
+                        type="checkbox"
+                        checked={fullQuality}
+                        onChange={(event) => onFullQualityChange?.(event.target.checked)}
+                    />
+                    Full quality
+                </label>}
             </div>
 
         </div>
@@ -0,0 +1,141 @@
+import { memo, useEffect, useRef, useState } from "react";
+import { Play, Pause } from "lucide-react";
+import WaveSurfer from "wavesurfer.js";
+import RegionsPlugin from "wavesurfer.js/dist/plugins/regions.js";
+import { GalleryClipData, Region, WaveSurferUserOptions, regionsFromColumns, regionsToColumns, RegionColumns } from "@waveformviewer/types";
+import { getRegionColors } from "@waveformviewer/atoms/regions";
+import { loadAudioInWorker } from "@waveformviewer/workerAudio";
+
+// Waveforms are mounted this far before they scroll into view.
+const MOUNT_MARGIN = "400px";
+const DEFAULT_HEIGHT = 64;
+
+export interface GalleryClipProps {
+    clip: GalleryClipData;
+    regions: RegionColumns;
+    waveOptions: WaveSurferUserOptions;
+    colormapName: string;
+    selected: boolean;
+    onSelect: (id: string) => void;
+    onPlay: (ws: WaveSurfer) => void;
+    onEdit: (id: string, regions: RegionColumns) => void;
+}
+
+/**
+ * One clip of the gallery. A fixed-height placeholder keeps the page layout
+ * stable; the WaveSurfer instance only exists while the clip is near the
+ * viewport, and is destroyed again when it scrolls away.
+ */
+const GalleryClipComponent = ({ clip, regions, waveOptions, colormapName, selected, onSelect, onPlay, onEdit }: GalleryClipProps) => {
+    const placeholderRef = useRef<HTMLDivElement>(null);
+    const containerRef = useRef<HTMLDivElement>(null);
+    const [visible, setVisible] = useState(false);
+    const [ws, setWs] = useState<WaveSurfer | null>(null);
+    const [playing, setPlaying] = useState(false);
+    const height = typeof waveOptions?.height === "number" ? waveOptions.height : DEFAULT_HEIGHT;
+
+    useEffect(() => {
+        const placeholder = placeholderRef.current;
+        if (!placeholder) return;
+        const observer = new IntersectionObserver(
+            ([entry]) => setVisible(entry.isIntersecting),
+            { rootMargin: MOUNT_MARGIN },
+        );
+        observer.observe(placeholder);
+        return () => observer.disconnect();
+    }, []);
+
+    // Python sends fresh objects on every rerun, so the instance is keyed on
+    // what the clip shows rather than on object identity. Local edits (in
+    // `regions`) are picked up on the next mount without forcing one.
+    const regionsKey = JSON.stringify(clip.regions);
+    const optionsKey = JSON.stringify(waveOptions ?? {});
+    // Latest values for the effect below, which only reruns on those keys.
+    const latest = useRef({ clip, regions, waveOptions, onSelect, onPlay, onEdit });
+    latest.current = { clip, regions, waveOptions, onSelect, onPlay, onEdit };
+
+    useEffect(() => {
+        if (!visible || !containerRef.current) return;
+        const { clip, regions, waveOptions } = latest.current;
+        let cancelled = false;
+        const regionsPlugin = RegionsPlugin.create();
+        const ws = WaveSurfer.create({
+            container: containerRef.current,
+            normalize: true,
+            ...waveOptions,
+            height,
+            plugins: [regionsPlugin],
+        });
+        const clipRegions = regionsFromColumns(regions);
+        const contents = new Map(clipRegions.map((region) => [region.id, region.content]));
+        const colors = getRegionColors(clipRegions, colormapName, waveOptions?.regionOpacity ?? 0.2);
+        ws.on("decode", () => {
+            clipRegions.forEach((region: Region, index) => {
+                regionsPlugin.addRegion({
+                    id: region.id,
+                    start: region.start,
+                    end: region.end,
+                    content: region.content,
+                    color: region.color ?? colors[index % colors.length],
+                    drag: region.drag,
+                    resize: region.resize,
+                });
+            });
+        });
+        regionsPlugin.on("region-updated", () => {
+            const edited = regionsPlugin.getRegions().map((region) => ({
+                id: region.id,
+                start: region.start,
+                end: region.end,
+                content: contents.get(region.id) ?? "",
+                drag: region.drag,
+                resize: region.resize,
+            }));
+            latest.current.onEdit(clip.id, regionsToColumns(edited));
+        });
+        ws.on("interaction", () => latest.current.onSelect(clip.id));
+        ws.on("play", () => {
+            setPlaying(true);
+            latest.current.onSelect(clip.id);
+            latest.current.onPlay(ws);
+        });
+        ws.on("pause", () => setPlaying(false));
+        setWs(ws);
+        if (clip.peaks) {
+            ws.load(clip.audioSrc, clip.peaks.data, clip.peaks.duration);
+        } else {
+            // Decoded through the shared decode context, off the main thread.
+            loadAudioInWorker(clip.audioSrc).then((audio) => {
+                if (!cancelled) ws.loadBlob(audio.blob, audio.peaks, audio.duration);
+            });
+        }
+        return () => {
+            cancelled = true;
+            setWs(null);
+            setPlaying(false);
+            ws.destroy();
+        };
+    }, [visible, clip.id, clip.audioSrc, regionsKey, optionsKey, colormapName, height]);
+
+    return (
+        <div
+            ref={placeholderRef}
+            onClick={() => onSelect(clip.id)}
+            className={`w-full p-2 rounded ${selected ? "outline outline-2 outline-white" : ""}`}
+        >
+            <div className="flex items-center gap-2 mb-1 text-sm text-white">
+                <button
+                    onClick={() => ws?.playPause()}
+                    disabled={!ws}
+                    className="bg-transparent border-none cursor-pointer p-1 flex items-center text-white"
+                >
+                    {playing ? <Pause size={16} /> : <Play size={16} />}
+                </button>
+                {clip.label && <span className="text-left">{clip.label}</span>}
+            </div>
+            <div ref={containerRef} style={{ height }} />
+        </div>
+    );
+};
+
+export const GalleryClip = memo(GalleryClipComponent);
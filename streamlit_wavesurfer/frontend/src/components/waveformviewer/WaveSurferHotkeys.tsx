@@ -0,0 +1,12 @@
+import { useWaveSurferHotkeys } from "@waveformviewer/hooks/useWaveSurferHotkeys";
+
+/**
+ * Binds the keyboard shortcuts. A component of its own so that it, and
+ * react-hotkeys-hook, can be split out of the main chunk.
+ */
+const WaveSurferHotkeys = () => {
+    useWaveSurferHotkeys();
+    return null;
+};
+
+export default WaveSurferHotkeys;
@@ -1,11 +1,23 @@
-import React, { useRef, memo } from 'react';
+import React, { useRef, memo, lazy, Suspense } from 'react';
 import { WavesurferViewerProps } from "@waveformviewer/types";
-import { useRegions, useWaveSurfer, useWaveSurferHotkeys } from "@waveformviewer/hooks";
+import { useRegions, useWaveSurfer } from "@waveformviewer/hooks";
 import { AudioControls } from "@waveformviewer/AudioControls";
 
+// Keyboard shortcuts (and react-hotkeys-hook) load after the waveform.
+const WaveSurferHotkeys = lazy(() => import("@waveformviewer/WaveSurferHotkeys"));
+
 const WaveformViewerComponent: React.FC<WavesurferViewerProps> = ({
     audioSrc,
+    audioBytes,
+    audioMime,
+    audioHash,
+    fullAudioUrl,
+    peaks,
+    peakPyramid,
+    audioSegments,
     onReady,
+    onAudioCached,
+    onAudioMissing,
     waveOptions,
     showControls
 }) => {
@@ -17,14 +29,25 @@ const WaveformViewerComponent: React.FC<WavesurferViewerProps> = ({
         play,
         pause,
         skipForward,
-        skipBackward } = useWaveSurfer({
+        skipBackward,
+        isLoading,
+        loadProgress,
+        fullQuality,
+        setFullQuality } = useWaveSurfer({
             containerRef: waveformRef as React.RefObject<HTMLDivElement>,
             audioSrc,
+            audioBytes,
+            audioMime,
+            audioHash,
+            fullAudioUrl,
+            peaks,
+            peakPyramid,
+            audioSegments,
             waveOptions,
-            onReady
+            onReady,
+            onAudioCached,
+            onAudioMissing,
         });
-    //  setup hotkeys
-    useWaveSurferHotkeys();
     // setup regions
     useRegions();
     return (
@@ -32,6 +55,14 @@ const WaveformViewerComponent: React.FC<WavesurferViewerProps> = ({
             <div ref={waveformRef}
                 id="waveform"
                 className="w-full min-h-[200px]" />
+            <Suspense fallback={null}>
+                <WaveSurferHotkeys />
+            </Suspense>
+            {isLoading && <div className="w-full h-1 bg-gray-700">
+                <div
+                    className="h-full bg-white"
+                    style={{ width: `${Math.round((loadProgress ?? 0) * 100)}%` }} />
+            </div>}
             {/* audio controls */}
             {showControls && <AudioControls
                 currentTime={currentTime}
@@ -41,6 +72,8 @@ const WaveformViewerComponent: React.FC<WavesurferViewerProps> = ({
                 play={play}
                 skipForward={skipForward}
                 skipBackward={skipBackward}
+                fullQuality={fullAudioUrl ? fullQuality : null}
+                onFullQualityChange={setFullQuality}
             />
             }
         </div>
@@ -1,12 +1,22 @@
-import RegionsPlugin, { RegionsPluginOptions } from "wavesurfer.js/dist/plugins/regions.js";
-import SpectrogramPlugin, { SpectrogramPluginOptions } from "wavesurfer.js/dist/plugins/spectrogram.js";
-import TimelinePlugin, { TimelinePluginOptions } from "wavesurfer.js/dist/plugins/timeline.js";
-import ZoomPlugin, { ZoomPluginOptions } from "wavesurfer.js/dist/plugins/zoom.js";
-import HoverPlugin, { HoverPluginOptions } from "wavesurfer.js/dist/plugins/hover.js";
-import MinimapPlugin, { MinimapPluginOptions } from "wavesurfer.js/dist/plugins/minimap.js";
+// Plugin modules are only imported for their types here; the code of each
+// plugin is a separate chunk, fetched the first time it is requested.
+import type RegionsPlugin from "wavesurfer.js/dist/plugins/regions.js";
+import type { RegionsPluginOptions } from "wavesurfer.js/dist/plugins/regions.js";
+import type SpectrogramPlugin from "wavesurfer.js/dist/plugins/spectrogram.js";
+import type { SpectrogramPluginOptions } from "wavesurfer.js/dist/plugins/spectrogram.js";
+import type TimelinePlugin from "wavesurfer.js/dist/plugins/timeline.js";
+import type { TimelinePluginOptions } from "wavesurfer.js/dist/plugins/timeline.js";
+import type ZoomPlugin from "wavesurfer.js/dist/plugins/zoom.js";
+import type { ZoomPluginOptions } from "wavesurfer.js/dist/plugins/zoom.js";
+import type HoverPlugin from "wavesurfer.js/dist/plugins/hover.js";
+import type { HoverPluginOptions } from "wavesurfer.js/dist/plugins/hover.js";
+import type MinimapPlugin from "wavesurfer.js/dist/plugins/minimap.js";
+import type { MinimapPluginOptions } from "wavesurfer.js/dist/plugins/minimap.js";
 import { atom, useAtomValue } from "jotai";
-import OverlayPlugin, { OverlayPluginOptions } from "wavesurfer-overlay-plugin";
-import SelectPlugin, { SelectPluginOptions } from "wavesurfer-select-plugin";
+import type OverlayPlugin from "wavesurfer-overlay-plugin";
+import type { OverlayPluginOptions } from "wavesurfer-overlay-plugin";
+import type SelectPlugin from "wavesurfer-select-plugin";
+import type { SelectPluginOptions } from "wavesurfer-select-plugin";
 // import the wavesurfer atom
 import { waveSurferAtom } from "./wavesurfer";
 
@@ -65,11 +75,66 @@ export const DEFAULT_PLUGINS: WaveSurferPluginConfiguration[] = [
     },
 ];
 
+type PluginName = keyof PluginOptionsMap;
+
+type PluginClassMap = {
+    regions: typeof RegionsPlugin;
+    spectrogram: typeof SpectrogramPlugin;
+    timeline: typeof TimelinePlugin;
+    zoom: typeof ZoomPlugin;
+    hover: typeof HoverPlugin;
+    minimap: typeof MinimapPlugin;
+    overlay: typeof OverlayPlugin;
+    select: typeof SelectPlugin;
+};
+
+// Each entry becomes its own chunk in the build.
+const PLUGIN_MODULES: { [K in PluginName]: () => Promise<{ default: PluginClassMap[K] }> } = {
+    regions: () => import("wavesurfer.js/dist/plugins/regions.js"),
+    spectrogram: () => import("wavesurfer.js/dist/plugins/spectrogram.js"),
+    timeline: () => import("wavesurfer.js/dist/plugins/timeline.js"),
+    zoom: () => import("wavesurfer.js/dist/plugins/zoom.js"),
+    hover: () => import("wavesurfer.js/dist/plugins/hover.js"),
+    minimap: () => import("wavesurfer.js/dist/plugins/minimap.js"),
+    overlay: () => import("wavesurfer-overlay-plugin"),
+    select: () => import("wavesurfer-select-plugin"),
+};
+
+const pluginClasses: Partial<PluginClassMap> = {};
+const pluginLoads = new Map<PluginName, Promise<void>>();
+
+/** Fetches the chunk of plugin `name` once; later calls share the request. */
+export const loadPluginModule = (name: PluginName): Promise<void> => {
+    let load = pluginLoads.get(name);
+    if (!load) {
+        load = PLUGIN_MODULES[name]().then((module) => {
+            (pluginClasses as Record<PluginName, unknown>)[name] = module.default;
+        });
+        // Let a failed chunk request be retried.
+        load.catch(() => pluginLoads.delete(name));
+        pluginLoads.set(name, load);
+    }
+    return load;
+};
+
+export const isPluginLoaded = (name: PluginName) => name in pluginClasses;
+
+const pluginClass = <K extends PluginName>(name: K): PluginClassMap[K] => {
+    const pluginClass = pluginClasses[name];
+    if (!pluginClass) throw new Error(`Plugin ${name} is not loaded`);
+    return pluginClass as PluginClassMap[K];
+};
+
+/**
+ * Factories for loaded plugins; see `loadPluginModule`.
+ */
 export const PLUGINS_MAP: {
     [K in keyof PluginOptionsMap]: (options?: Partial<PluginOptionsMap[K]>) => any
 } = {
-    regions: (options) => RegionsPlugin.create(options && Object.keys(options).length > 0 ? options : undefined),
-    spectrogram: (options) => SpectrogramPlugin.create(options && Object.keys(options).length > 0 ? options : undefined),
+    regions: (options) => pluginClass("regions").create(options && Object.keys(options).length > 0 ? options : undefined),
+    // Spectrograms precomputed in Python arrive as `frequenciesDataUrl`, with
+    // `frequencyMax` set to the Nyquist frequency they were computed at.
+    spectrogram: (options) => pluginClass("spectrogram").create(options && Object.keys(options).length > 0 ? options : undefined),
     timeline: (options) => {
         // Only pass through safe options, let plugin use its own defaults for callbacks
         const safeOptions = options ? {
@@ -84,11 +149,11 @@ export const PLUGINS_MAP: {
         const filteredOptions = safeOptions
             ? Object.fromEntries(Object.entries(safeOptions).filter(([_, v]) => v !== undefined))
             : undefined;
-        return TimelinePlugin.create(filteredOptions && Object.keys(filteredOptions).length > 0 ? filteredOptions : undefined);
+        return pluginClass("timeline").create(filteredOptions && Object.keys(filteredOptions).length > 0 ? filteredOptions : undefined);
     },
-    zoom: (options) => ZoomPlugin.create(options && Object.keys(options).length > 0 ? options : undefined),
-    hover: (options) => HoverPlugin.create(options && Object.keys(options).length > 0 ? options : undefined),
-    minimap: (options) => MinimapPlugin.create(options || {}),
+    zoom: (options) => pluginClass("zoom").create(options && Object.keys(options).length > 0 ? options : undefined),
+    hover: (options) => pluginClass("hover").create(options && Object.keys(options).length > 0 ? options : undefined),
+    minimap: (options) => pluginClass("minimap").create(options || {}),
     overlay: (options) => {
         // OverlayPluginOptions requires imageUrl to be defined (string or string[])
         // Provide a default empty string if not set
@@ -96,9 +161,9 @@ export const PLUGINS_MAP: {
         if (typeof opts.imageUrl === 'undefined') {
             opts.imageUrl = '';
         }
-        return OverlayPlugin.create(opts);
+        return pluginClass("overlay").create(opts);
     },
-    select: (options) => SelectPlugin.create(options && Object.keys(options).length > 0 ? options : undefined),
+    select: (options) => pluginClass("select").create(options && Object.keys(options).length > 0 ? options : undefined),
 };
 
 
@@ -122,7 +187,7 @@ export const getPluginByNameAtom = atom(
         const plugins = get(pluginsAtom);
 
         const config = plugins.find((plugin) => plugin.name === name);
-        if (!config) return undefined;
+        if (!config || !isPluginLoaded(name)) return undefined;
         // Always pass undefined if options is empty
         const options =
             config.options && Object.keys(config.options).length > 0
@@ -133,11 +198,19 @@ export const getPluginByNameAtom = atom(
     }
 );
 
+/**
+ * Registers a plugin whose module is loaded. Otherwise its module starts
+ * loading and null is returned; `useWaveSurfer` registers it once loaded.
+ */
 export function registerPlugin(plugin: WaveSurferPluginConfiguration, wavesurfer: any) {
     const factory = PLUGINS_MAP[plugin.name as keyof PluginOptionsMap];
     if (!factory) {
         throw new Error(`Plugin ${plugin.name} not found`);
     }
+    if (!isPluginLoaded(plugin.name)) {
+        loadPluginModule(plugin.name);
+        return null;
+    }
     const options = plugin.options && Object.keys(plugin.options).length > 0 ? plugin.options : undefined;
     const pluginInstance = factory(options as any);
     // add the name to the plugin instance
@@ -151,7 +224,7 @@ export function registerPlugin(plugin: WaveSurferPluginConfiguration, wavesurfer
 export function unregisterPlugin(plugin: WaveSurferPluginConfiguration, wavesurfer: any) {
     console.log("unregistering plugin", plugin.name);
     const activePlugins = wavesurfer.getActivePlugins();
-    const pluginInstance = activePlugins.find((plugin: any) => plugin.name === plugin.name);
+    const pluginInstance = activePlugins.find((active: any) => active.name === plugin.name);
     if (pluginInstance) {
         pluginInstance.destroy();
     }
@@ -164,6 +237,32 @@ export function updatePluginOptions(plugin: WaveSurferPluginConfiguration, waves
     registerPlugin(plugin, wavesurfer);
 }
 
+// Plugins are swapped when their serialized options change.
+const pluginOptionsKey = (plugin: WaveSurferPluginConfiguration) => JSON.stringify(plugin.options ?? {});
+
+/**
+ * Hot-swaps plugins between two configurations: removed and changed plugins
+ * are destroyed, new and changed ones registered, and unchanged plugins keep
+ * their instance and state. Returns whether any plugin was swapped.
+ */
+export function syncPlugins(previous: WaveSurferPluginConfiguration[], next: WaveSurferPluginConfiguration[], wavesurfer: any): boolean {
+    if (previous === next) return false;
+    const previousKeys = new Map(previous.map((plugin) => [plugin.name, pluginOptionsKey(plugin)]));
+    const nextKeys = new Map(next.map((plugin) => [plugin.name, pluginOptionsKey(plugin)]));
+    let swapped = false;
+    previous.forEach((plugin) => {
+        if (nextKeys.get(plugin.name) === previousKeys.get(plugin.name)) return;
+        unregisterPlugin(plugin, wavesurfer);
+        swapped = true;
+    });
+    next.forEach((plugin) => {
+        if (previousKeys.get(plugin.name) === nextKeys.get(plugin.name)) return;
+        registerPlugin(plugin, wavesurfer);
+        swapped = true;
+    });
+    return swapped;
+}
+
 export function registerPlugins(plugins: WaveSurferPluginConfiguration[], wavesurfer: any) {
     if (!plugins || plugins.length === 0 || !plugins.length) return;
 
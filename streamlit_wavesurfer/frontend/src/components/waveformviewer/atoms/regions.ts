@@ -1,5 +1,5 @@
 import { atom } from 'jotai';
-import { Region } from '../types';
+import { Region, RegionPatch, regionsFromColumns } from '../types';
 import { buildRegionId, lightenColor } from '../utils';
 import colormap from 'colormap';
 import type { Region as RegionsPluginRegion } from 'wavesurfer.js/dist/plugins/regions';
@@ -25,8 +25,19 @@ export type AugmentedRegion<T extends RegionsPluginRegion> = T & {
 // Core Region State
 // ----------------------
 
-// Stores the full array of enriched (ID+color) region objects
-export const regionsAtom = atom<ProcessedRegion[]>([]);
+// Enriched (ID+color) regions keyed by id, in display order
+export const regionMapAtom = atom<Map<string, ProcessedRegion>>(new Map());
+
+// The regions as an array; writing replaces the whole map
+export const regionsAtom = atom(
+    (get) => Array.from(get(regionMapAtom).values()),
+    (_get, set, regions: ProcessedRegion[]) => {
+        set(regionMapAtom, new Map(regions.map((region) => [region.id, region])));
+    }
+);
+
+// Colours of the last full set of regions, reused for regions added by patches
+export const regionPaletteAtom = atom<string[]>([]);
 
 // Stores the ID of the currently active region
 export const activeRegionIdAtom = atom<string | null>(null);
@@ -68,6 +79,15 @@ function addColor<T extends Region>(region: T, color: string, lightening: number
     });
 }
 
+const isSameRegion = (a: ProcessedRegion, b: ProcessedRegion) =>
+    a.start === b.start &&
+    a.end === b.end &&
+    a.content === b.content &&
+    a.color === b.color &&
+    a.lightenedColor === b.lightenedColor &&
+    a.drag === b.drag &&
+    a.resize === b.resize;
+
 // ----------------------
 // State Derivation
 // ----------------------
@@ -86,24 +106,63 @@ export const activeRegionAtom = atom<Region | null>(null);
  */
 export const setRegionsAtom = atom(
     null,
-    (_get, set, { regions, colormapName, regionOpacity = 0.2, regionLightening = 50 }: { regions: Region[]; colormapName: string; regionOpacity?: number; regionLightening?: number }) => {
+    (get, set, { regions, colormapName, regionOpacity = 0.2, regionLightening = 50 }: { regions: Region[]; colormapName: string; regionOpacity?: number; regionLightening?: number }) => {
         const colors = getRegionColors(regions, colormapName, regionOpacity);
-        const processed = regions.map((region, index) => {
-            return addColor(addId(region), colors[index % colors.length], regionLightening);
+        // Keep the identity of unchanged regions so they are not redrawn; the
+        // first region with a given id wins.
+        const existing = get(regionMapAtom);
+        const next = new Map<string, ProcessedRegion>();
+        regions.forEach((region, index) => {
+            const processed = addColor(addId(region), colors[index % colors.length], regionLightening);
+            if (next.has(processed.id)) return;
+            const previous = existing.get(processed.id);
+            next.set(processed.id, previous && isSameRegion(previous, processed) ? previous : processed);
+        });
+        set(regionPaletteAtom, colors);
+        set(regionMapAtom, next);
+    }
+);
+
+/**
+ * Applies a patch from Python. Unchanged regions keep their object identity so
+ * the regions plugin only touches what the patch names.
+ */
+export const applyRegionPatchAtom = atom(
+    null,
+    (get, set, { patch, regionLightening = 50 }: { patch: RegionPatch; regionLightening?: number }) => {
+        const palette = get(regionPaletteAtom);
+        const next = new Map(get(regionMapAtom));
+        patch.removed.forEach((id) => next.delete(id));
+        // Changed regions keep their position and colour.
+        regionsFromColumns(patch.changed).forEach((update) => {
+            const withId = addId(update);
+            const region = next.get(withId.id);
+            if (region) next.set(region.id, addColor(withId, region.color, regionLightening));
+        });
+        regionsFromColumns(patch.added).forEach((region) => {
+            const withId = addId(region);
+            if (next.has(withId.id)) return;
+            const color = palette.length ? palette[next.size % palette.length] : getRegionColors([region], 'magma')[0];
+            next.set(withId.id, addColor(withId, color, regionLightening));
         });
-        console.log("[setRegionsAtom] processed", processed)
-        // make it unique
-        const uniqueProcessed = processed.filter((region, index, self) =>
-            index === self.findIndex((t) => t.id === region.id)
-        );
-        set(regionsAtom, uniqueProcessed);
+        set(regionMapAtom, next);
+    }
+);
+
+/**
+ * Re-applies the colormap to the current regions.
+ */
+export const recolorRegionsAtom = atom(
+    null,
+    (get, set, options: { colormapName: string; regionOpacity?: number; regionLightening?: number }) => {
+        set(setRegionsAtom, { regions: get(regionsAtom), ...options });
     }
 );
 
 export const clearRegionsAtom = atom(
     null,
     (_get, set) => {
-        set(regionsAtom, []);
+        set(regionMapAtom, new Map());
     }
 );
 
@@ -125,6 +184,11 @@ export const setLoopRegionAtom = atom(
  */
 export const instantRegionHighlightAtom = atom<boolean>(false);
 
+/**
+ * Mounts only the regions near the visible part of the waveform.
+ */
+export const virtualizeRegionsAtom = atom<boolean>(false);
+
 // ----------------------
 // Region Store Hook
 // ----------------------
@@ -1,17 +1,21 @@
 import { atom } from 'jotai';
 import WaveSurfer from 'wavesurfer.js';
-import { registerPlugins, DEFAULT_PLUGINS } from "./plugins";
+import { registerPlugins, syncPlugins, DEFAULT_PLUGINS, WaveSurferPluginConfiguration } from "./plugins";
 import type { WaveSurferUserOptions } from "@waveformviewer/types";
 
 // Atom to store a single WaveSurfer instance and its ready state
 export const waveSurferAtom = atom<{ instance: WaveSurfer | null, ready: boolean }>({ instance: null, ready: false });
 
+// Plugins registered on the current instance, for hot-swapping on update.
+const activePluginsAtom = atom<WaveSurferPluginConfiguration[]>([]);
+
 // Action types for managing the WaveSurfer instance
 export type WaveSurferAction =
     | { type: 'create'; container: HTMLDivElement; audioBlob: Blob; options: WaveSurferUserOptions; plugins?: any[]; onReady: () => void }
     | { type: 'destroy' }
     | { type: 'loadBlob'; audioBlob: Blob }
     | { type: 'setOptions'; options: WaveSurferUserOptions }
+    | { type: 'setPlugins'; plugins: WaveSurferPluginConfiguration[] }
     | { type: 'setReady'; ready: boolean };
 
 export const waveSurferManagerAtom = atom(
@@ -20,8 +24,22 @@ export const waveSurferManagerAtom = atom(
         switch (action.type) {
             case 'create': {
                 const { container, audioBlob, options, plugins, onReady } = action;
-                // Destroy any previous instance
+                const pluginConfigurations = plugins && plugins.length ? plugins : DEFAULT_PLUGINS;
+                // Reuse an instance already drawing into this container,
+                // only loading the new audio.
                 const prev = get(waveSurferAtom).instance;
+                if (prev && prev.options.container === container) {
+                    prev.setOptions(options);
+                    syncPlugins(get(activePluginsAtom), pluginConfigurations, prev);
+                    set(activePluginsAtom, pluginConfigurations);
+                    set(waveSurferAtom, { instance: prev, ready: false });
+                    prev.once("ready", () => {
+                        set(waveSurferAtom, { instance: prev, ready: true });
+                        onReady();
+                    });
+                    prev.loadBlob(audioBlob);
+                    return;
+                }
                 if (prev) prev.destroy();
                 const ws = WaveSurfer.create({
                     container,
@@ -30,7 +48,8 @@ export const waveSurferManagerAtom = atom(
                     ...options,
                 });
                 // Register plugins
-                registerPlugins(plugins && plugins.length ? plugins : DEFAULT_PLUGINS, ws);
+                registerPlugins(pluginConfigurations, ws);
+                set(activePluginsAtom, pluginConfigurations);
                 ws.on("ready", () => {
                     set(waveSurferAtom, { instance: ws, ready: true });
                     onReady();
@@ -49,6 +68,7 @@ export const waveSurferManagerAtom = atom(
             case 'destroy': {
                 const ws = get(waveSurferAtom).instance;
                 if (ws) ws.destroy();
+                set(activePluginsAtom, []);
                 set(waveSurferAtom, { instance: null, ready: false });
                 return;
             }
@@ -57,6 +77,15 @@ export const waveSurferManagerAtom = atom(
                 if (ws) ws.setOptions(action.options);
                 return;
             }
+            case 'setPlugins': {
+                const current = get(waveSurferAtom);
+                if (!current.instance) return;
+                const swapped = syncPlugins(get(activePluginsAtom), action.plugins, current.instance);
+                set(activePluginsAtom, action.plugins);
+                // Let plugin consumers pick up the new instances.
+                if (swapped) set(waveSurferAtom, { ...current });
+                return;
+            }
             case 'setReady': {
                 const ws = get(waveSurferAtom).instance;
                 set(waveSurferAtom, { instance: ws, ready: action.ready });
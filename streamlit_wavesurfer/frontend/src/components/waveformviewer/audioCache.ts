@@ -0,0 +1,96 @@
+import type { WorkerDecodedAudio } from "./workerAudio";
+
+/**
+ * IndexedDB cache of audio bytes and their peaks, keyed by the content hash
+ * Python sends with the audio. It outlives the iframe, so revisiting a clip
+ * skips both the transfer and the decode. Entries are evicted least recently
+ * used first once their total size exceeds MAX_CACHE_BYTES.
+ */
+
+const DB_NAME = "streamlit-wavesurfer";
+const STORE = "audio";
+const MAX_CACHE_BYTES = 512 * 1024 * 1024;
+
+interface CacheEntry extends WorkerDecodedAudio {
+    hash: string;
+    size: number;
+    lastUsed: number;
+}
+
+let database: Promise<IDBDatabase> | null = null;
+
+const openDatabase = () => {
+    database ??= new Promise<IDBDatabase>((resolve, reject) => {
+        const request = indexedDB.open(DB_NAME, 1);
+        request.onupgradeneeded = () => {
+            const store = request.result.createObjectStore(STORE, { keyPath: "hash" });
+            store.createIndex("lastUsed", "lastUsed");
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+    // Without IndexedDB (e.g. blocked storage) every lookup is a miss.
+    database.catch(() => { database = null; });
+    return database;
+};
+
+const done = (transaction: IDBTransaction) => new Promise<void>((resolve, reject) => {
+    transaction.oncomplete = () => resolve();
+    transaction.onerror = () => reject(transaction.error);
+    transaction.onabort = () => reject(transaction.error);
+});
+
+const entrySize = (audio: WorkerDecodedAudio) =>
+    audio.blob.size + audio.peaks.reduce((total, channel) => total + channel.byteLength, 0);
+
+/**
+ * Returns the cached audio for `hash` and marks it as recently used, or null.
+ */
+export const getCachedAudio = async (hash: string): Promise<WorkerDecodedAudio | null> => {
+    try {
+        const db = await openDatabase();
+        const transaction = db.transaction(STORE, "readwrite");
+        const store = transaction.objectStore(STORE);
+        const entry = await new Promise<CacheEntry | undefined>((resolve, reject) => {
+            const request = store.get(hash);
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+        if (!entry) return null;
+        store.put({ ...entry, lastUsed: Date.now() });
+        await done(transaction);
+        return { blob: entry.blob, peaks: entry.peaks, duration: entry.duration };
+    } catch {
+        return null;
+    }
+};
+
+/**
+ * Stores audio under `hash`, then evicts the least recently used entries
+ * until the cache fits. Resolves to whether the audio was stored.
+ */
+export const putCachedAudio = async (hash: string, audio: WorkerDecodedAudio): Promise<boolean> => {
+    const size = entrySize(audio);
+    if (size > MAX_CACHE_BYTES) return false;
+    try {
+        const db = await openDatabase();
+        const transaction = db.transaction(STORE, "readwrite");
+        const store = transaction.objectStore(STORE);
+        store.put({ ...audio, hash, size, lastUsed: Date.now() } satisfies CacheEntry);
+        // Walk from most to least recently used, deleting past the budget.
+        let total = 0;
+        const cursorRequest = store.index("lastUsed").openCursor(null, "prev");
+        cursorRequest.onsuccess = () => {
+            const cursor = cursorRequest.result;
+            if (!cursor) return;
+            const entry = cursor.value as CacheEntry;
+            total += entry.size;
+            if (total > MAX_CACHE_BYTES) cursor.delete();
+            cursor.continue();
+        };
+        await done(transaction);
+        return true;
+    } catch {
+        return false;
+    }
+};
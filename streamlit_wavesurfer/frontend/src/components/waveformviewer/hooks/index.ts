@@ -2,7 +2,6 @@ import { useCallback } from "react";
 
 export * from "./useRegions";
 export * from "./useWaveSurfer";
-export * from "./useWaveSurferHotkeys";
 
 export const useTimeFormatter = () => {
     return useCallback((seconds: number) => {
@@ -1,17 +1,56 @@
-import { useEffect, useState, useCallback } from "react";
+import { useEffect, useState, useCallback, useRef, useMemo } from "react";
 import { useAtom, useAtomValue } from "jotai";
-import { regionsAtom, activeRegionAtom, loopRegionsAtom, instantRegionHighlightAtom, AugmentedRegion } from "@waveformviewer/atoms/regions";
+import { regionsAtom, activeRegionAtom, loopRegionsAtom, instantRegionHighlightAtom, virtualizeRegionsAtom, ProcessedRegion } from "@waveformviewer/atoms/regions";
 import { waveSurferAtom } from "@waveformviewer/atoms/wavesurfer";
 import { getPluginInstanceByName } from "@waveformviewer/atoms/plugins";
+import { buildRegionTimeIndex, regionsInWindow } from "@waveformviewer/regionIndex";
+import { createRegionUpdateBatcher } from "@waveformviewer/utils";
+import { markEnd, markStart } from "@waveformviewer/metrics";
+import type WaveSurfer from "wavesurfer.js";
+
+// Regions are mounted this many view widths either side of the visible part.
+const VIRTUAL_MARGIN = 1;
+
+// Visible time range of the waveform, in seconds.
+const getVisibleWindow = (ws: WaveSurfer): [number, number] | null => {
+    const duration = ws.getDuration();
+    const totalWidth = ws.getWrapper().scrollWidth;
+    if (!duration || !totalWidth) return null;
+    const scroll = ws.getScroll();
+    return [
+        (scroll / totalWidth) * duration,
+        ((scroll + ws.getWidth()) / totalWidth) * duration,
+    ];
+};
+
+// The active region is highlighted, and marked while it loops.
+type Highlight = { id: string | null; looping: boolean };
+
+const regionStyle = (region: ProcessedRegion, highlight: Highlight) => {
+    const active = region.id === highlight.id;
+    return {
+        color: active ? region.lightenedColor : region.color,
+        content: active && highlight.looping ? `↻ ${region.content}` : region.content,
+    };
+};
 
 export const useRegions = () => {
     const [loopRegions, setLoopRegions] = useAtom(loopRegionsAtom);
     const [activeRegion, setActiveRegionState] = useAtom(activeRegionAtom);
     const instantHighlight = useAtomValue(instantRegionHighlightAtom);
-    const { ready: waveformReady } = useAtomValue(waveSurferAtom);
+    const virtualize = useAtomValue(virtualizeRegionsAtom);
+    const { instance: waveSurfer, ready: waveformReady } = useAtomValue(waveSurferAtom);
     const regionsPlugin = getPluginInstanceByName('regions');
     const [regions] = useAtom(regionsAtom);
     const [regionsReady, setRegionsReady] = useState(false);
+    // Time range whose regions are mounted when virtualizing.
+    const [mountedWindow, setMountedWindow] = useState<[number, number] | null>(null);
+    const timeIndex = useMemo(() => virtualize ? buildRegionTimeIndex(regions) : null, [virtualize, regions]);
+    const mountedRegions = useMemo(() => {
+        if (!timeIndex) return regions;
+        if (!mountedWindow) return [];
+        return regionsInWindow(timeIndex, mountedWindow[0], mountedWindow[1]);
+    }, [timeIndex, mountedWindow, regions]);
 
     useEffect(() => {
         if (regionsPlugin && waveformReady && regions.length) {
@@ -19,112 +58,172 @@ export const useRegions = () => {
         }
     }, [regionsPlugin, waveformReady, regions]);
 
-    const showLoopingIndicator = () => {
-        if (!activeRegion) return;
-        const pluginRegions = regionsPlugin?.getRegions();
-        if (!pluginRegions) return;
-        pluginRegions.forEach((region: AugmentedRegion<any>) => {
-            if (!region) return;
-            if (!region._originalContent) {
-                region._originalContent = region.content;
-                // if the content is a HTMLElement, get the text content
-                if (region.content instanceof HTMLElement) {
-                    region._originalContent = region.content.textContent;
-                }
-            }
-            const contentText = region._originalContent;
-            const displayContent = (loopRegions && region.id === activeRegion.id)
-                ? `↻ ${contentText}`
-                : contentText;
-            region.setOptions({ content: displayContent });
-        });
-    };
-    const updateActiveRegionColors = (activeReg: any) => {
-        if (!activeReg || !activeReg.id || !regions) return;
-        const regionId = activeReg.id;
-        const regionColor = regions.find(color => color.id === regionId);
-        const pluginRegions = regionsPlugin?.getRegions();
-        if (!pluginRegions) return;
-        pluginRegions.forEach((region: any) => {
-            if (!region) return;
-            // Apply instant transition if enabled
-            if (instantHighlight && region.element) {
-                region.element.style.transition = 'none';
-            }
-            if (region.id === regionId) {
-                region.setOptions({ color: regionColor?.lightenedColor });
-            } else {
-                const otherColorInfo = regions.find(color => color.id === region.id);
-                region.setOptions({ color: otherColorInfo?.color });
-            }
-        });
-    };
-
     const setActiveRegion = (region: any) => {
         if (!region || !region.id || !regions || loopRegions) return;
         setActiveRegionState(region);
     };
 
+    // Plugin regions by id, with the processed region each was last synced from.
+    const synced = useRef(new Map<string, { source: ProcessedRegion; region: any }>());
+    const syncedPlugin = useRef<typeof regionsPlugin>(null);
+    // Highlight currently drawn on the plugin regions.
+    const highlight = useRef<Highlight>({ id: null, looping: false });
+    const instantHighlightRef = useRef(instantHighlight);
+    instantHighlightRef.current = instantHighlight;
+    const styleUpdates = useMemo(() => createRegionUpdateBatcher((region, options) => {
+        if (instantHighlightRef.current && region.element) {
+            region.element.style.transition = 'none';
+        }
+        region.setOptions(options);
+    }), []);
+
+    // Remount when the view leaves the mounted window, so scrolling within it
+    // does not re-render.
+    useEffect(() => {
+        if (!virtualize || !waveSurfer || !waveformReady) {
+            setMountedWindow(null);
+            return;
+        }
+        const updateWindow = () => {
+            const visible = getVisibleWindow(waveSurfer);
+            if (!visible) return;
+            setMountedWindow((current) => {
+                if (current && current[0] <= visible[0] && visible[1] <= current[1]) return current;
+                const margin = (visible[1] - visible[0]) * VIRTUAL_MARGIN;
+                return [visible[0] - margin, visible[1] + margin];
+            });
+        };
+        // A zoom changes the window's width, so always recentre on it.
+        const handleZoom = () => {
+            setMountedWindow(null);
+            updateWindow();
+        };
+        updateWindow();
+        const unsubscribers = [
+            waveSurfer.on('scroll', updateWindow),
+            waveSurfer.on('redraw', updateWindow),
+            waveSurfer.on('zoom', handleZoom),
+        ];
+        return () => unsubscribers.forEach((unsubscribe) => unsubscribe());
+    }, [virtualize, waveSurfer, waveformReady]);
+
     useEffect(() => {
-        if (!regionsPlugin || !waveformReady || !regionsReady || !regions.length) return;
-        console.log("[useRegions] adding regions", regions)
-        // Update plugin only if regions changed
-        regionsPlugin.clearRegions();
-        regions.forEach((region) => {
-            regionsPlugin.addRegion({
+        if (!regionsPlugin || !waveformReady || !regionsReady) return;
+        markStart("regionMount");
+        if (syncedPlugin.current !== regionsPlugin) {
+            syncedPlugin.current = regionsPlugin;
+            synced.current = new Map();
+            regionsPlugin.clearRegions();
+        }
+        // Patch the plugin in place: patches keep unchanged regions identical,
+        // so only added, changed and removed regions touch the DOM.
+        const previous = synced.current;
+        const next = new Map<string, { source: ProcessedRegion; region: any }>();
+        mountedRegions.forEach((region) => {
+            const entry = previous.get(region.id);
+            const options = {
                 start: region.start,
                 end: region.end,
-                content: region.content,
-                id: region.id,
-                color: region.color,
                 drag: region.drag,
                 resize: region.resize,
-            });
+                ...regionStyle(region, highlight.current),
+            };
+            if (!entry) {
+                next.set(region.id, { source: region, region: regionsPlugin.addRegion({ id: region.id, ...options }) });
+                return;
+            }
+            if (entry.source !== region) {
+                entry.region.setOptions(options);
+            }
+            next.set(region.id, { source: region, region: entry.region });
         });
+        previous.forEach((entry, id) => {
+            if (!next.has(id)) entry.region.remove();
+        });
+        synced.current = next;
+        markEnd("regionMount");
+    }, [mountedRegions, waveformReady, regionsReady, regionsPlugin]);
 
-        const handleRegionIn = (region: any) => {
-            setActiveRegion(region);
-        };
+    useEffect(() => {
+        if (!regionsPlugin) return;
+        const handleRegionIn = (region: any) => setActiveRegion(region);
         const handleRegionClicked = (region: any) => setActiveRegion(region);
-
-        regionsPlugin.on('region-in', handleRegionIn);
+        // Virtualized regions get region-in from the time index instead, as
+        // the plugin only sees the mounted ones.
+        if (!virtualize) regionsPlugin.on('region-in', handleRegionIn);
         regionsPlugin.on('region-clicked', handleRegionClicked);
         return () => {
-            regionsPlugin.clearRegions();
-            regionsPlugin.unAll();
+            regionsPlugin.un('region-in', handleRegionIn);
+            regionsPlugin.un('region-clicked', handleRegionClicked);
         };
-    }, [regions, waveformReady, regionsReady]);
-
+    }, [regionsPlugin, regions, loopRegions, virtualize]);
 
+    useEffect(() => () => {
+        styleUpdates.cancel();
+        syncedPlugin.current?.clearRegions();
+        synced.current = new Map();
+    }, [styleUpdates]);
 
     const handleRegionOut = useCallback((region: any) => {
         if (!activeRegion || region.id !== activeRegion.id) {
             setLoopRegions(false);
             return;
         }
-        const pluginRegions = regionsPlugin?.getRegions();
-        if (loopRegions && pluginRegions && activeRegion) {
-            const pluginRegion = pluginRegions.find((r: any) => r.id === activeRegion.id);
+        if (loopRegions) {
+            const pluginRegion = synced.current.get(activeRegion.id!)?.region;
             if (pluginRegion && typeof pluginRegion.play === 'function') {
                 try { pluginRegion.play(); } catch { }
+            } else if (waveSurfer) {
+                // The active region may be unmounted when virtualizing.
+                waveSurfer.setTime(activeRegion.start);
+                waveSurfer.play();
             }
         }
-    }, [loopRegions, regionsPlugin, activeRegion, setLoopRegions]);
+    }, [loopRegions, activeRegion, setLoopRegions, waveSurfer]);
 
     useEffect(() => {
-        showLoopingIndicator();
-        if (!regionsPlugin) return;
+        if (!regionsPlugin || virtualize) return;
         regionsPlugin.on("region-out", handleRegionOut);
         return () => {
             regionsPlugin.un("region-out", handleRegionOut);
         };
-    }, [loopRegions, handleRegionOut, regionsPlugin]);
+    }, [loopRegions, handleRegionOut, regionsPlugin, virtualize]);
+
+    // Ids of the regions under the playhead, for virtualized region-in/out.
+    const playheadRegions = useRef(new Map<string, ProcessedRegion>());
+
+    useEffect(() => {
+        if (!timeIndex || !waveSurfer) return;
+        const handleTimeUpdate = (time: number) => {
+            const previous = playheadRegions.current;
+            const current = new Map(regionsInWindow(timeIndex, time, time).map((region) => [region.id, region]));
+            playheadRegions.current = current;
+            previous.forEach((region, id) => {
+                if (!current.has(id)) handleRegionOut(region);
+            });
+            current.forEach((region, id) => {
+                if (!previous.has(id)) setActiveRegion(region);
+            });
+        };
+        const unsubscribe = waveSurfer.on('timeupdate', handleTimeUpdate);
+        return () => unsubscribe();
+    }, [timeIndex, waveSurfer, handleRegionOut, regions, loopRegions]);
 
     useEffect(() => {
         if (!activeRegion) return;
         setLoopRegions(false);  // Disable looping if user interacts
-        updateActiveRegionColors(activeRegion);
     }, [activeRegion]);
+
+    // Only the previous and new active regions need restyling.
+    useEffect(() => {
+        const previous = highlight.current;
+        const next = { id: activeRegion?.id ?? null, looping: loopRegions };
+        highlight.current = next;
+        new Set([previous.id, next.id]).forEach((id) => {
+            const entry = id ? synced.current.get(id) : undefined;
+            if (entry) styleUpdates.schedule(entry.region, regionStyle(entry.source, next));
+        });
+    }, [activeRegion, loopRegions, styleUpdates]);
     return {
     }
 };
\ No newline at end of file
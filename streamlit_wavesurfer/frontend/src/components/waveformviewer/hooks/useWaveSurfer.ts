@@ -1,29 +1,63 @@
 import { useEffect, useState, useCallback, useRef, useMemo } from "react";
 import { useQuery } from "@tanstack/react-query";
 import WaveSurfer from "wavesurfer.js";
-import { WaveSurferUserOptions } from "@waveformviewer/types";
+import { WaveSurferUserOptions, Peaks, PeakPyramid, AudioSegments } from "@waveformviewer/types";
+import { fetchPyramidLevel, selectPyramidLevel } from "@waveformviewer/pyramid";
+import { decodeAudioBytes, loadAudioInWorker, WorkerDecodedAudio } from "@waveformviewer/workerAudio";
+import { getCachedAudio, putCachedAudio } from "@waveformviewer/audioCache";
+import { SegmentPlayer } from "@waveformviewer/segmentPlayer";
+import { markEnd, markStart } from "@waveformviewer/metrics";
 import { useAtom, useSetAtom, useAtomValue } from "jotai";
-import { pluginsAtom, unregisterPlugin, WaveSurferPluginConfiguration, registerPlugin } from "../atoms/plugins";
+import { pluginsAtom, WaveSurferPluginConfiguration, registerPlugins, syncPlugins, isPluginLoaded, loadPluginModule } from "../atoms/plugins";
 import { waveSurferAtom } from "../atoms/wavesurfer";
+import { loopRegionsAtom } from "../atoms/regions";
 
 import { keyAtom } from "../atoms/key";
-async function fetchAudioData(audioSrc: string): Promise<Blob> {
-    const response = await fetch(audioSrc);
-    if (!response.ok) throw new Error(`Failed to fetch audio: ${response.statusText}`);
-    return new Blob([await response.arrayBuffer()]);
-}
+// Media server URLs are streamed by the media element (with Range requests)
+// instead of being downloaded up front; only inlined data URIs are fetched.
+const isDataUri = (audioSrc: string | null) => Boolean(audioSrc?.startsWith("data:"));
+// Switches the media element to another file of the same audio, keeping the
+// playhead and play state; the drawn waveform is left as it is.
+const swapMediaSource = (media: HTMLMediaElement, src: string) => {
+    if (media.src === src) return;
+    const time = media.currentTime;
+    const playing = !media.paused;
+    media.src = src;
+    media.addEventListener("loadedmetadata", () => {
+        media.currentTime = time;
+        if (playing) media.play();
+    }, { once: true });
+};
 console.log("Hello from useWaveSurfer")
 export const useWaveSurfer = ({
     containerRef,
     audioSrc,
+    audioBytes,
+    audioMime,
+    audioHash,
+    fullAudioUrl,
+    peaks,
+    peakPyramid,
+    audioSegments,
     waveOptions,
     onReady,
+    onAudioCached,
+    onAudioMissing,
 }: {
     containerRef: React.RefObject<HTMLDivElement>;
-    audioSrc: string;
+    audioSrc: string | null;
+    audioBytes?: Uint8Array | null;
+    audioMime?: string | null;
+    audioHash?: string | null;
+    fullAudioUrl?: string | null;
+    peaks?: Peaks | null;
+    peakPyramid?: PeakPyramid | null;
+    audioSegments?: AudioSegments | null;
     waveOptions: WaveSurferUserOptions;
 
     onReady: () => void;
+    onAudioCached?: (hash: string) => void;
+    onAudioMissing?: (hash: string) => void;
 }) => {
 
     const key = useAtomValue(keyAtom);
@@ -33,48 +67,121 @@ export const useWaveSurfer = ({
     const [duration, setDuration] = useState(0);
     const [isPlaying, setIsPlaying] = useState(false);
     const [plugins] = useAtom(pluginsAtom);
-    const { data: audioBlob, isSuccess, isLoading } = useQuery({
-        queryKey: ['audioData', audioSrc],
-        queryFn: () => fetchAudioData(audioSrc),
+    // Plugin modules are fetched on demand. The waveform does not wait for
+    // them: each plugin is registered once its module has loaded.
+    const [pluginModulesLoaded, setPluginModulesLoaded] = useState(0);
+    useEffect(() => {
+        const missing = plugins.filter((plugin) => !isPluginLoaded(plugin.name));
+        if (!missing.length) return;
+        let cancelled = false;
+        Promise.allSettled(missing.map((plugin) => loadPluginModule(plugin.name))).then((results) => {
+            results.forEach((result) => {
+                if (result.status === "rejected") console.error("Failed to load plugin", result.reason);
+            });
+            if (!cancelled) setPluginModulesLoaded((count) => count + 1);
+        });
+        return () => {
+            cancelled = true;
+        };
+    }, [plugins]);
+    const loadedPlugins = useMemo(
+        () => plugins.filter((plugin) => isPluginLoaded(plugin.name)),
+        [plugins, pluginModulesLoaded],
+    );
+    // Fraction of the audio fetched, or null when the size is unknown.
+    const [loadProgress, setLoadProgress] = useState<number | null>(null);
+    // Time new audio until its waveform is drawn.
+    useEffect(() => {
+        markStart("firstPaint");
+    }, [audioHash ?? audioSrc, audioSegments?.url]);
+    // Fetching and peak extraction run in a worker; WaveSurfer only draws.
+    // Audio sent with a content hash is looked up in, and added to, the
+    // browser cache; Python leaves out audio it knows is cached there.
+    // Bytes arguments are already here and only need decoding.
+    const fetchAudio = () => audioBytes
+        ? decodeAudioBytes(audioBytes, audioMime)
+        : loadAudioInWorker(audioSrc!, setLoadProgress);
+    const loadAudio = async (): Promise<WorkerDecodedAudio | null> => {
+        if (!audioHash) return fetchAudio();
+        const cached = await getCachedAudio(audioHash);
+        if (cached) {
+            onAudioCached?.(audioHash);
+            return cached;
+        }
+        if (!audioSrc && !audioBytes) {
+            onAudioMissing?.(audioHash);
+            return null;
+        }
+        const loaded = await fetchAudio();
+        putCachedAudio(audioHash, loaded).then((stored) => {
+            if (stored) onAudioCached?.(audioHash);
+        });
+        return loaded;
+    };
+    const inlined = isDataUri(audioSrc) || Boolean(audioBytes);
+    const hashOnly = !audioSrc && !audioBytes && Boolean(audioHash);
+    const decodeInBrowser = (inlined || hashOnly) && !peaks && !peakPyramid;
+    const { data: audioData, isSuccess, isLoading, refetch } = useQuery({
+        // The hash (when sent) is a much cheaper key than the data URI, and
+        // stays the same whether or not Python included the audio.
+        queryKey: audioHash ? ['audioData', audioHash] : ['audioData', audioSrc],
+        queryFn: loadAudio,
         staleTime: Infinity,
+        // With precomputed peaks nothing needs decoding, so even a data URI can
+        // go straight to the media element.
+        enabled: decodeInBrowser,
     });
+    // Bytes drawn from precomputed peaks are played from a blob URL. The
+    // arguments arrive as a new array on every rerun, so the URL is made once
+    // per content hash instead.
+    const bytesUrl = useMemo(
+        () => audioBytes && !decodeInBrowser
+            ? URL.createObjectURL(new Blob([audioBytes], audioMime ? { type: audioMime } : undefined))
+            : null,
+        [audioHash, decodeInBrowser],
+    );
+    useEffect(() => () => {
+        if (bytesUrl) URL.revokeObjectURL(bytesUrl);
+    }, [bytesUrl]);
+    // Segmented recordings are played from slices rather than one URL.
+    const audioUrl = audioSegments?.url ?? (decodeInBrowser ? null : audioSrc ?? bytesUrl);
+    // Audio resent after a cache miss.
+    useEffect(() => {
+        if ((audioSrc || audioBytes) && audioData === null) refetch();
+    }, [audioSrc, audioBytes, audioData, refetch]);
     const setWaveSurfer = useSetAtom(waveSurferAtom);
-    const { instance: waveSurfer } = useAtomValue(waveSurferAtom);
+    const { instance: waveSurfer, ready } = useAtomValue(waveSurferAtom);
+    // Plugins and options the current instance was last given.
     const prevPluginsRef = useRef<WaveSurferPluginConfiguration[]>([]);
+    const appliedOptionsRef = useRef<WaveSurferUserOptions>(waveOptions);
 
     const createWavesurfer = useCallback(() => {
-        if (!containerRef.current || !audioBlob) return;
+        if (!containerRef.current || (!audioData && !audioUrl)) return;
+        const segmentPlayer = audioSegments && peakPyramid
+            ? new SegmentPlayer(audioSegments, peakPyramid.sampleRate, peakPyramid.duration)
+            : null;
         const ws = WaveSurfer.create({
             container: containerRef.current,
             normalize: true,
             minPxPerSec: 10,
             ...waveOptions,
+            ...(segmentPlayer ? { media: segmentPlayer as unknown as HTMLMediaElement } : {}),
         });
-
-        // Unregister plugins that are no longer present or whose options changed
-        prevPluginsRef.current.forEach(prevPlugin => {
-            const current = plugins.find(p => p.name === prevPlugin.name);
-            if (
-                !current ||
-                JSON.stringify(current.options) !== JSON.stringify(prevPlugin.options)
-            ) {
-                unregisterPlugin(prevPlugin, ws);
-            }
-        });
+        if (segmentPlayer) {
+            // Fetch the segments under the viewport before they are played.
+            ws.on("scroll", (visibleStartTime) => segmentPlayer.prefetch(visibleStartTime));
+            ws.on("destroy", () => segmentPlayer.destroy());
+        }
+        ws.once("redrawcomplete", () => markEnd("firstPaint"));
+        if (!audioData) {
+            // Loaded by the media element rather than the worker.
+            ws.once("load", () => markStart("load"));
+            ws.once("decode", () => markEnd("load"));
+        }
         setWaveSurfer({ instance: ws, ready: false });
-
-        // Register new or updated plugins
-        plugins.forEach(plugin => {
-            const prev = prevPluginsRef.current.find(p => p.name === plugin.name);
-            if (
-                !prev ||
-                JSON.stringify(prev.options) !== JSON.stringify(plugin.options)
-            ) {
-                registerPlugin(plugin, ws);
-            }
-        });
-        // Update the ref
-        prevPluginsRef.current = plugins;
+        registerPlugins(loadedPlugins, ws);
+        prevPluginsRef.current = loadedPlugins;
+        appliedOptionsRef.current = waveOptions;
 
 
         ws.on("ready", () => {
@@ -125,22 +232,84 @@ export const useWaveSurfer = ({
                 time: ws.getCurrentTime()
             });
         });
-        ws.loadBlob(audioBlob);
+        if (audioData) {
+            ws.loadBlob(audioData.blob, audioData.peaks, audioData.duration);
+        } else if (audioUrl && peakPyramid) {
+            // Draw from the pyramid level matching the zoom, and swap levels
+            // as the zoom plugin changes minPxPerSec.
+            let currentLevel = selectPyramidLevel(peakPyramid, waveOptions?.minPxPerSec ?? 10);
+            fetchPyramidLevel(peakPyramid, currentLevel).then((levelPeaks) => {
+                ws.load(audioUrl, levelPeaks, peakPyramid.duration);
+            });
+            ws.on("zoom", (minPxPerSec) => {
+                const level = selectPyramidLevel(peakPyramid, minPxPerSec);
+                if (level.url === currentLevel.url) return;
+                currentLevel = level;
+                fetchPyramidLevel(peakPyramid, level).then((levelPeaks) => {
+                    if (currentLevel !== level) return;
+                    ws.setOptions({ peaks: levelPeaks, duration: peakPyramid.duration });
+                });
+            });
+        } else if (audioUrl) {
+            ws.load(audioUrl, peaks?.data, peaks?.duration);
+        }
 
         if (import.meta.env.DEV) {
             syncChannel.onmessage = (event) => {
                 console.log("syncChannel message", event);
             };
         }
-    }, [audioBlob, containerRef, waveOptions, onReady, plugins, setWaveSurfer, waveSurfer]);
+    }, [audioData, audioUrl, peaks, peakPyramid, audioSegments, containerRef, waveOptions, onReady, loadedPlugins, setWaveSurfer, waveSurfer]);
 
+    // Only new audio recreates the instance; option and plugin changes below
+    // are applied to it in place and keep the decoded audio.
     useEffect(() => {
         waveSurfer?.destroy()
-        if (isSuccess) createWavesurfer();
+        if (isSuccess || audioUrl) createWavesurfer();
         return () => {
             waveSurfer?.destroy();
         };
-    }, [audioBlob, isSuccess]);
+    }, [audioData, audioUrl, isSuccess]);
+
+    useEffect(() => {
+        if (!waveSurfer) return;
+        const applied = appliedOptionsRef.current ?? {};
+        appliedOptionsRef.current = waveOptions;
+        const changed = Object.fromEntries(Object.entries(waveOptions ?? {}).filter(
+            ([name, value]) => JSON.stringify(applied[name as keyof WaveSurferUserOptions]) !== JSON.stringify(value)
+        ));
+        if (Object.keys(changed).length) waveSurfer.setOptions(changed);
+    }, [waveOptions, waveSurfer]);
+
+    useEffect(() => {
+        if (!waveSurfer) return;
+        const swapped = syncPlugins(prevPluginsRef.current, loadedPlugins, waveSurfer);
+        prevPluginsRef.current = loadedPlugins;
+        // Let plugin consumers pick up the new instances.
+        if (swapped) setWaveSurfer((current) => ({ ...current }));
+    }, [loadedPlugins, waveSurfer, setWaveSurfer]);
+
+    // Proxy mode plays the preview until full quality is switched on or a
+    // region is looped; only then is the original fetched.
+    const [fullQuality, setFullQuality] = useState(false);
+    const loopRegions = useAtomValue(loopRegionsAtom);
+    useEffect(() => {
+        setFullQuality(false);
+    }, [fullAudioUrl]);
+    useEffect(() => {
+        if (loopRegions && fullAudioUrl) setFullQuality(true);
+    }, [loopRegions, fullAudioUrl]);
+    // The preview each instance was loaded with, to switch back to.
+    const previewSrcRef = useRef<{ instance: WaveSurfer; src: string } | null>(null);
+    useEffect(() => {
+        // Swapped once the preview has loaded, so loading does not undo it.
+        if (!waveSurfer || !ready || !fullAudioUrl) return;
+        const media = waveSurfer.getMediaElement();
+        if (previewSrcRef.current?.instance !== waveSurfer) {
+            previewSrcRef.current = { instance: waveSurfer, src: media.src };
+        }
+        swapMediaSource(media, fullQuality ? fullAudioUrl : previewSrcRef.current.src);
+    }, [waveSurfer, ready, fullQuality, fullAudioUrl]);
 
     return {
         waveform: waveSurfer,
@@ -154,5 +323,8 @@ export const useWaveSurfer = ({
         seekTo: (position: number) => waveSurfer?.seekTo(position),
         setZoom: (level: number) => waveSurfer?.zoom(level),
         isLoading: Boolean(isLoading),
+        loadProgress,
+        fullQuality,
+        setFullQuality,
     };
 };
\ No newline at end of file
@@ -1,7 +1,7 @@
 import { useRef, useEffect, useState, useCallback } from "react";
 import { useHotkeys } from "react-hotkeys-hook";
 import { useAtomValue, useAtom } from "jotai";
-import { getPluginByNameAtom } from "@waveformviewer/atoms/plugins";
+import { getPluginInstanceByName } from "@waveformviewer/atoms/plugins";
 import { waveSurferAtom } from "@waveformviewer/atoms/wavesurfer";
 import { activeRegionAtom, loopRegionsAtom } from "@waveformviewer/atoms/regions";
 export const useWaveSurferHotkeys = (
@@ -9,8 +9,8 @@ export const useWaveSurferHotkeys = (
     // Use atoms for active region and loop region
     const [activeRegion, setActiveRegion] = useAtom(activeRegionAtom);
     const [loopRegion, setLoopRegion] = useAtom(loopRegionsAtom);
-    const getPluginByName = useAtomValue(getPluginByNameAtom);
-    const regionsPlugin = getPluginByName("regions");
+    // The registered instance, so navigation sees the displayed regions.
+    const regionsPlugin = getPluginInstanceByName("regions");
 
     const [hotkeysEnabled, setHotkeysEnabled] = useState(false);
     const editHistory = useRef<Array<{ region: any, prevStart: number, prevEnd: number }>>([]);
@@ -0,0 +1,59 @@
+/**
+ * Load and render timings recorded with `performance.mark`/`measure`, so they
+ * also show up in the browser's performance panel. Only the latest duration
+ * of each metric is kept; the component reports them to Python when
+ * `metrics=True`.
+ */
+
+export type MetricName =
+    // Audio fetched (and cached) by the worker.
+    | "fetch"
+    // decodeAudioData plus peak extraction in the worker.
+    | "decode"
+    // URL loads: the media element fetching the audio until it is drawable.
+    | "load"
+    // New audio until the waveform is drawn.
+    | "firstPaint"
+    // Adding, updating and removing regions on the regions plugin.
+    | "regionMount";
+
+const PREFIX = "wavesurfer:";
+// How long to wait for more measures before notifying, so one load reports once.
+const NOTIFY_DELAY_MS = 500;
+
+const durations: Partial<Record<MetricName, number>> = {};
+let listener: (() => void) | null = null;
+let notifyTimer: number | null = null;
+
+export const markStart = (name: MetricName) => {
+    performance.mark(`${PREFIX}${name}:start`);
+};
+
+/**
+ * Measures `name` from its latest start mark. Does nothing without one, e.g.
+ * when a load that was not timed finishes.
+ */
+export const markEnd = (name: MetricName) => {
+    const start = `${PREFIX}${name}:start`;
+    if (!performance.getEntriesByName(start, "mark").length) return;
+    const measure = performance.measure(`${PREFIX}${name}`, start);
+    performance.clearMarks(start);
+    performance.clearMeasures(`${PREFIX}${name}`);
+    durations[name] = Math.round(measure.duration * 10) / 10;
+    if (!listener || notifyTimer !== null) return;
+    notifyTimer = window.setTimeout(() => {
+        notifyTimer = null;
+        listener?.();
+    }, NOTIFY_DELAY_MS);
+};
+
+/** Latest duration of each metric, in milliseconds. */
+export const getMetrics = () => ({ ...durations });
+
+/** Calls `callback` (debounced) after new measures; returns an unsubscribe. */
+export const onMetrics = (callback: () => void) => {
+    listener = callback;
+    return () => {
+        if (listener === callback) listener = null;
+    };
+};
@@ -0,0 +1,89 @@
+/**
+ * Fetches audio and reduces decoded channels to min/max peaks off the main
+ * thread. Buffers move in and out as transferables, so nothing is copied.
+ *
+ * Messages in:
+ *   { type: "fetch", id, url }
+ *   { type: "reduce", id, channels: Float32Array[], samplesPerPeak }
+ * Messages out:
+ *   { type: "progress", id, loaded, total }   total is 0 when unknown
+ *   { type: "fetched", id, buffer }
+ *   { type: "peaks", id, peaks: Float32Array[] }
+ *   { type: "error", id, message }
+ */
+
+export type PeaksWorkerRequest =
+    | { type: "fetch"; id: number; url: string }
+    | { type: "reduce"; id: number; channels: Float32Array[]; samplesPerPeak: number };
+
+export type PeaksWorkerResponse =
+    | { type: "progress"; id: number; loaded: number; total: number }
+    | { type: "fetched"; id: number; buffer: ArrayBuffer }
+    | { type: "peaks"; id: number; peaks: Float32Array[] }
+    | { type: "error"; id: number; message: string };
+
+const post = (message: PeaksWorkerResponse, transfer: Transferable[] = []) => {
+    self.postMessage(message, { transfer });
+};
+
+const fetchAudio = async (id: number, url: string) => {
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch audio: ${response.statusText}`);
+    const total = Number(response.headers.get("Content-Length")) || 0;
+    if (!response.body) {
+        const buffer = await response.arrayBuffer();
+        post({ type: "fetched", id, buffer }, [buffer]);
+        return;
+    }
+    // Read into one buffer, sized up front when the length is known.
+    const reader = response.body.getReader();
+    let buffer = new Uint8Array(total || 1 << 20);
+    let loaded = 0;
+    for (; ;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        if (loaded + value.length > buffer.length) {
+            const grown = new Uint8Array(Math.max(buffer.length * 2, loaded + value.length));
+            grown.set(buffer.subarray(0, loaded));
+            buffer = grown;
+        }
+        buffer.set(value, loaded);
+        loaded += value.length;
+        post({ type: "progress", id, loaded, total });
+    }
+    const result = loaded === buffer.length ? buffer.buffer : buffer.slice(0, loaded).buffer;
+    post({ type: "fetched", id, buffer: result }, [result]);
+};
+
+// Interleaved [min, max] pairs per `samplesPerPeak` samples, as WaveSurfer draws.
+const reduceChannel = (samples: Float32Array, samplesPerPeak: number) => {
+    const buckets = Math.ceil(samples.length / samplesPerPeak);
+    const peaks = new Float32Array(buckets * 2);
+    for (let bucket = 0; bucket < buckets; bucket++) {
+        const end = Math.min(samples.length, (bucket + 1) * samplesPerPeak);
+        let min = Infinity;
+        let max = -Infinity;
+        for (let i = bucket * samplesPerPeak; i < end; i++) {
+            const sample = samples[i];
+            if (sample < min) min = sample;
+            if (sample > max) max = sample;
+        }
+        peaks[bucket * 2] = min;
+        peaks[bucket * 2 + 1] = max;
+    }
+    return peaks;
+};
+
+self.onmessage = async (event: MessageEvent<PeaksWorkerRequest>) => {
+    const request = event.data;
+    try {
+        if (request.type === "fetch") {
+            await fetchAudio(request.id, request.url);
+        } else {
+            const peaks = request.channels.map((channel) => reduceChannel(channel, request.samplesPerPeak));
+            post({ type: "peaks", id: request.id, peaks }, peaks.map((channel) => channel.buffer));
+        }
+    } catch (error) {
+        post({ type: "error", id: request.id, message: error instanceof Error ? error.message : String(error) });
+    }
+};
@@ -0,0 +1,53 @@
+import { PeakPyramid, PeakPyramidLevel } from "./types";
+
+/**
+ * Picks the coarsest pyramid level that still has at least one peak per
+ * device pixel at the given zoom, falling back to the finest level.
+ */
+export const selectPyramidLevel = (pyramid: PeakPyramid, minPxPerSec: number): PeakPyramidLevel => {
+    const levels = [...pyramid.levels].sort((a, b) => a.samplesPerPeak - b.samplesPerPeak);
+    const target = pyramid.sampleRate / Math.max(minPxPerSec * (window.devicePixelRatio || 1), 1e-9);
+    let selected = levels[0];
+    for (const level of levels) {
+        if (level.samplesPerPeak <= target) selected = level;
+    }
+    return selected;
+};
+
+// Levels already fetched, oldest first; re-zooming to a level is then free.
+const levelCache = new Map<string, Promise<Float32Array[]>>();
+const MAX_CACHED_LEVELS = 8;
+
+/**
+ * Fetches a level and splits its (buckets, channels, 2) float32 layout into
+ * one interleaved min/max array per channel, as WaveSurfer expects.
+ */
+export const fetchPyramidLevel = (pyramid: PeakPyramid, level: PeakPyramidLevel): Promise<Float32Array[]> => {
+    const cached = levelCache.get(level.url);
+    if (cached) return cached;
+    const request = fetch(level.url)
+        .then((response) => {
+            if (!response.ok) throw new Error(`Failed to fetch peaks: ${response.statusText}`);
+            return response.arrayBuffer();
+        })
+        .then((buffer) => {
+            const data = new Float32Array(buffer);
+            const { channels } = pyramid;
+            if (channels === 1) return [data];
+            return Array.from({ length: channels }, (_, channel) => {
+                const out = new Float32Array(level.length * 2);
+                for (let i = 0; i < level.length; i++) {
+                    const offset = (i * channels + channel) * 2;
+                    out[i * 2] = data[offset];
+                    out[i * 2 + 1] = data[offset + 1];
+                }
+                return out;
+            });
+        });
+    request.catch(() => levelCache.delete(level.url));
+    levelCache.set(level.url, request);
+    if (levelCache.size > MAX_CACHED_LEVELS) {
+        levelCache.delete(levelCache.keys().next().value as string);
+    }
+    return request;
+};
@@ -0,0 +1,49 @@
+import type { ProcessedRegion } from "./atoms/regions";
+
+/**
+ * Regions sorted by start, for finding the regions in a time window by binary
+ * search. `maxLength` bounds how long before a window a region can start and
+ * still reach into it.
+ */
+export interface RegionTimeIndex {
+    regions: ProcessedRegion[];
+    starts: Float64Array;
+    maxLength: number;
+}
+
+export const buildRegionTimeIndex = (regions: ProcessedRegion[]): RegionTimeIndex => {
+    const sorted = [...regions].sort((a, b) => a.start - b.start);
+    const starts = new Float64Array(sorted.length);
+    let maxLength = 0;
+    sorted.forEach((region, index) => {
+        starts[index] = region.start;
+        maxLength = Math.max(maxLength, region.end - region.start);
+    });
+    return { regions: sorted, starts, maxLength };
+};
+
+// Index of the first start greater than `time` (or >= with `inclusive` false).
+const bisect = (starts: Float64Array, time: number, inclusive: boolean) => {
+    let low = 0;
+    let high = starts.length;
+    while (low < high) {
+        const mid = (low + high) >>> 1;
+        if (starts[mid] < time || (inclusive && starts[mid] === time)) low = mid + 1;
+        else high = mid;
+    }
+    return low;
+};
+
+/**
+ * Regions intersecting the closed window [start, end], in start order. Only
+ * regions starting within `maxLength` before the window are scanned, so a
+ * single very long region makes this slower, never wrong.
+ */
+export const regionsInWindow = (index: RegionTimeIndex, start: number, end: number): ProcessedRegion[] => {
+    const result: ProcessedRegion[] = [];
+    const last = bisect(index.starts, end, true);
+    for (let i = bisect(index.starts, start - index.maxLength, false); i < last; i++) {
+        if (index.regions[i].end >= start) result.push(index.regions[i]);
+    }
+    return result;
+};
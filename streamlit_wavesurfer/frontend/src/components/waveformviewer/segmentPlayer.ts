@@ -0,0 +1,287 @@
+import type { AudioSegments } from "./types";
+
+// Decoded segments kept in memory, least recently used dropped first.
+const MAX_CACHED_SEGMENTS = 8;
+const TIMEUPDATE_INTERVAL_MS = 250;
+
+// A scheduled segment: media time `time` plays at context time `when`.
+interface Scheduled {
+    source: AudioBufferSourceNode;
+    when: number;
+    time: number;
+    end: number;
+}
+
+/**
+ * A media element stand-in for WaveSurfer's `media` option that plays a long
+ * file from short segments served by Python. Only the segment under the
+ * playhead and its neighbours are fetched and decoded; playback schedules
+ * consecutive segments back to back on an AudioContext.
+ */
+export class SegmentPlayer extends EventTarget {
+    src = "";
+    duration: number;
+    paused = true;
+    ended = false;
+    seeking = false;
+    preservesPitch = true;
+
+    private context = new AudioContext();
+    private gain = this.context.createGain();
+    private segments = new Map<number, Promise<AudioBuffer>>();
+    private scheduled: Scheduled[] = [];
+    // Bumped on every play/pause/seek so stale scheduling callbacks stop.
+    private generation = 0;
+    private position = 0;
+    private rate = 1;
+    private volumeValue = 1;
+    private mutedValue = false;
+    private timer: number | null = null;
+    // Fires when the next segment is due to be fetched and scheduled.
+    private lookahead: number | null = null;
+
+    constructor(private config: AudioSegments, private sampleRate: number, duration: number) {
+        super();
+        this.duration = duration;
+        this.gain.connect(this.context.destination);
+        queueMicrotask(() => {
+            this.emit("loadedmetadata");
+            this.emit("canplay");
+        });
+    }
+
+    get segmentFrames() {
+        return Math.max(1, Math.round(this.config.segmentDuration * this.sampleRate));
+    }
+
+    get segmentCount() {
+        return Math.ceil((this.duration * this.sampleRate) / this.segmentFrames);
+    }
+
+    get currentSrc() {
+        return this.src;
+    }
+
+    get currentTime() {
+        if (this.paused) return this.position;
+        const now = this.context.currentTime;
+        // The latest segment that has started; a late segment leaves a gap
+        // during which time stands still at the previous segment's end.
+        let playing: Scheduled | undefined;
+        for (const entry of this.scheduled) {
+            if (entry.when <= now) playing = entry;
+        }
+        if (!playing) return this.position;
+        return Math.min(playing.end, playing.time + (now - playing.when) * this.rate);
+    }
+
+    set currentTime(time: number) {
+        const wasPlaying = !this.paused;
+        this.stopSources();
+        this.position = Math.min(Math.max(time, 0), this.duration);
+        this.ended = false;
+        this.seeking = true;
+        this.emit("seeking");
+        this.prefetch(this.position);
+        const seeked = () => {
+            this.seeking = false;
+            this.emit("seeked");
+            this.emit("timeupdate");
+        };
+        this.segment(this.segmentAt(this.position)).then(seeked, seeked);
+        if (wasPlaying) this.startPlayback();
+    }
+
+    get playbackRate() {
+        return this.rate;
+    }
+
+    set playbackRate(rate: number) {
+        const time = this.currentTime;
+        this.rate = rate;
+        if (this.paused) return;
+        this.stopSources();
+        this.position = time;
+        this.startPlayback();
+        this.emit("ratechange");
+    }
+
+    get volume() {
+        return this.volumeValue;
+    }
+
+    set volume(volume: number) {
+        this.volumeValue = volume;
+        this.gain.gain.value = this.mutedValue ? 0 : volume;
+        this.emit("volumechange");
+    }
+
+    get muted() {
+        return this.mutedValue;
+    }
+
+    set muted(muted: boolean) {
+        this.mutedValue = muted;
+        this.volume = this.volumeValue;
+    }
+
+    async play() {
+        if (!this.paused) return;
+        if (this.ended) this.position = 0;
+        this.paused = false;
+        this.ended = false;
+        await this.context.resume();
+        this.startPlayback();
+        this.timer = window.setInterval(() => {
+            this.prefetch(this.currentTime);
+            this.emit("timeupdate");
+        }, TIMEUPDATE_INTERVAL_MS);
+        this.emit("play");
+        this.emit("playing");
+    }
+
+    pause() {
+        if (this.paused) return;
+        this.position = this.currentTime;
+        this.paused = true;
+        this.stopSources();
+        this.emit("pause");
+        this.emit("timeupdate");
+    }
+
+    canPlayType() {
+        return "";
+    }
+
+    load() { }
+
+    removeAttribute(name: string) {
+        if (name === "src") this.src = "";
+    }
+
+    remove() {
+        this.destroy();
+    }
+
+    destroy() {
+        this.stopSources();
+        this.segments.clear();
+        this.context.close();
+    }
+
+    /**
+     * Fetches the segment at `time` and its neighbours ahead of playback,
+     * e.g. for the start of the visible part of the waveform.
+     */
+    prefetch(time: number) {
+        const index = this.segmentAt(time);
+        [index, index + 1, index - 1].forEach((i) => {
+            if (i >= 0 && i < this.segmentCount) this.segment(i);
+        });
+    }
+
+    private emit(type: string) {
+        this.dispatchEvent(new Event(type));
+    }
+
+    private segmentAt(time: number) {
+        const frame = Math.floor(time * this.sampleRate);
+        return Math.min(Math.floor(frame / this.segmentFrames), Math.max(this.segmentCount - 1, 0));
+    }
+
+    private segment(index: number): Promise<AudioBuffer> {
+        const cached = this.segments.get(index);
+        if (cached) {
+            // Refresh its position in the LRU order.
+            this.segments.delete(index);
+            this.segments.set(index, cached);
+            return cached;
+        }
+        const frames = this.segmentFrames;
+        const url = `${this.config.url}?start=${index * frames}&frames=${frames}`;
+        const request = fetch(url)
+            .then((response) => {
+                if (!response.ok) throw new Error(`Failed to fetch segment: ${response.statusText}`);
+                return response.arrayBuffer();
+            })
+            .then((buffer) => this.context.decodeAudioData(buffer));
+        request.catch(() => this.segments.delete(index));
+        this.segments.set(index, request);
+        while (this.segments.size > MAX_CACHED_SEGMENTS) {
+            this.segments.delete(this.segments.keys().next().value as number);
+        }
+        return request;
+    }
+
+    private stopSources() {
+        this.generation++;
+        if (this.timer !== null && this.paused) {
+            window.clearInterval(this.timer);
+            this.timer = null;
+        }
+        if (this.lookahead !== null) {
+            window.clearTimeout(this.lookahead);
+            this.lookahead = null;
+        }
+        this.scheduled.forEach(({ source }) => {
+            source.onended = null;
+            try { source.stop(); } catch { }
+        });
+        this.scheduled = [];
+    }
+
+    private async startPlayback() {
+        const generation = this.generation;
+        const index = this.segmentAt(this.position);
+        let buffer: AudioBuffer;
+        try {
+            buffer = await this.segment(index);
+        } catch {
+            this.emit("error");
+            return;
+        }
+        if (generation !== this.generation || this.paused) return;
+        const segmentStart = (index * this.segmentFrames) / this.sampleRate;
+        this.schedule(index, buffer, this.context.currentTime, this.position - segmentStart, generation);
+    }
+
+    private schedule(index: number, buffer: AudioBuffer, when: number, offset: number, generation: number) {
+        const segmentStart = (index * this.segmentFrames) / this.sampleRate;
+        const source = this.context.createBufferSource();
+        source.buffer = buffer;
+        source.playbackRate.value = this.rate;
+        source.connect(this.gain);
+        source.start(when, Math.max(offset, 0));
+        const endsAt = when + (buffer.duration - offset) / this.rate;
+        const entry = { source, when, time: segmentStart + offset, end: segmentStart + buffer.duration };
+        // Every started source stays here until it ends, so it can be stopped.
+        this.scheduled.push(entry);
+        const last = index + 1 >= this.segmentCount;
+        source.onended = () => {
+            if (generation !== this.generation) return;
+            this.scheduled = this.scheduled.filter((scheduled) => scheduled !== entry);
+            // Where time stands if the next segment is late.
+            this.position = entry.end;
+            if (!last) return;
+            this.position = this.duration;
+            this.paused = true;
+            this.ended = true;
+            this.stopSources();
+            this.emit("timeupdate");
+            this.emit("pause");
+            this.emit("ended");
+        };
+        if (last) return;
+        // Fetch and queue the next segment about one segment before this one
+        // ends, so playback never runs further ahead than that.
+        const lead = this.config.segmentDuration / this.rate;
+        const delay = Math.max(0, (endsAt - lead - this.context.currentTime) * 1000);
+        this.lookahead = window.setTimeout(() => {
+            this.lookahead = null;
+            this.segment(index + 1).then((next) => {
+                if (generation !== this.generation) return;
+                this.schedule(index + 1, next, Math.max(endsAt, this.context.currentTime), 0, generation);
+            }, () => this.emit("error"));
+        }, delay);
+    }
+}
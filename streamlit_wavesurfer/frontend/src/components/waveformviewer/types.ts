@@ -22,11 +22,103 @@ export class Region implements IRegion {
     ) { }
 }
 
+// Regions sent column-wise from Python's RegionList.
+export interface RegionColumns {
+    start: number[];
+    end: number[];
+    content: string[];
+    color: (string | null)[];
+    drag: boolean[];
+    resize: boolean[];
+    id: string[];
+}
+
+export const regionsFromColumns = (columns: RegionColumns): Region[] =>
+    columns.id.map((id, i) => new Region(
+        id,
+        columns.start[i],
+        columns.end[i],
+        columns.content[i],
+        columns.color[i] ?? undefined,
+        columns.drag[i],
+        columns.resize[i],
+    ));
+
+export const regionsToColumns = (regions: IRegion[]): RegionColumns => ({
+    start: regions.map((region) => region.start),
+    end: regions.map((region) => region.end),
+    content: regions.map((region) => region.content),
+    color: regions.map((region) => region.color ?? null),
+    drag: regions.map((region) => region.drag ?? false),
+    resize: regions.map((region) => region.resize ?? false),
+    id: regions.map((region) => region.id ?? ''),
+});
+
+// Every region Python currently displays, unversioned without a component key.
+export interface RegionSnapshot {
+    version: number | null;
+    regions: RegionColumns;
+}
+
+// Regions added, changed and removed since `baseVersion`.
+export interface RegionPatch {
+    version: number;
+    baseVersion: number;
+    added: RegionColumns;
+    changed: RegionColumns;
+    removed: string[];
+}
+
+export type RegionsPayload = RegionSnapshot | RegionPatch;
+
+export const isRegionPatch = (payload: RegionsPayload): payload is RegionPatch => "baseVersion" in payload;
+
+// Min/max peaks computed in Python, one interleaved array per channel.
+export interface Peaks {
+    data: number[][];
+    duration: number;
+    sampleRate: number;
+    samplesPerPeak: number;
+}
+
+export interface PeakPyramidLevel {
+    samplesPerPeak: number;
+    // Number of min/max pairs per channel
+    length: number;
+    url: string;
+}
+
+// Multi-resolution peaks served by the Python media server.
+export interface PeakPyramid {
+    duration: number;
+    sampleRate: number;
+    channels: number;
+    levels: PeakPyramidLevel[];
+}
+
+// Windowed playback of a long file, fetched in `segmentDuration`-second
+// slices from `url?start=<frame>&frames=<count>`.
+export interface AudioSegments {
+    url: string;
+    segmentDuration: number;
+}
+
 export interface WavesurferViewerProps {
-    audioSrc: string;
+    audioSrc: string | null;
+    // Encoded audio sent as a binary argument instead of `audioSrc`.
+    audioBytes?: Uint8Array | null;
+    audioMime?: string | null;
+    audioHash?: string | null;
+    // Original of a preview proxy, played instead once full quality is on.
+    fullAudioUrl?: string | null;
+    peaks?: Peaks | null;
+    peakPyramid?: PeakPyramid | null;
+    audioSegments?: AudioSegments | null;
     regions?: Region[];
     waveOptions: WaveSurferUserOptions;
     onReady: () => void;
+    onAudioCached?: (hash: string) => void;
+    onAudioMissing?: (hash: string) => void;
     onRegionsChange?: (regions: Region[]) => void;
     regionColormap: string;
     showControls: boolean;
@@ -34,6 +126,15 @@ export interface WavesurferViewerProps {
 
 
 
+// One clip of a gallery, see wavesurfer_gallery() in Python.
+export interface GalleryClipData {
+    id: string;
+    label: string | null;
+    audioSrc: string;
+    peaks: Peaks | null;
+    regions: RegionColumns;
+}
+
 export interface WaveSurferUserOptions {
     waveColor?: string;
     progressColor?: string;
@@ -50,5 +151,6 @@ export interface WaveSurferUserOptions {
     regionOpacity?: number;
     regionLightening?: number;
     instantRegionHighlight?: boolean;
+    virtualizeRegions?: boolean;
 }
 
@@ -1,6 +1,18 @@
 import { Region } from "./types"
+// 32-bit FNV-1a hash of a string, as 8 hex digits.
+const fnv1a = (text: string) => {
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        hash ^= text.charCodeAt(i);
+        hash = Math.imul(hash, 0x01000193);
+    }
+    return (hash >>> 0).toString(16).padStart(8, '0');
+};
+
+// Start and end keep ids of distinct regions apart, so hashing only the
+// content is enough.
 export const buildRegionId = (region: Region) => {
-    return `region-${btoa(JSON.stringify({ content: region.content, start: region.start, end: region.end }))}`;
+    return `region-${region.start}-${region.end}-${fnv1a(String(region.content ?? ''))}`;
 };
 
 export const lightenColor = (color: string, amount: number = 50): string => {
@@ -40,4 +52,30 @@ export const lightenColor = (color: string, amount: number = 50): string => {
 
     // Return original if format not recognized
     return color;
+};
+
+/**
+ * Collects option updates for regions and applies them together in the next
+ * animation frame. A later update to a region merges over an earlier one.
+ */
+export const createRegionUpdateBatcher = (apply: (region: any, options: Record<string, unknown>) => void) => {
+    let pending = new Map<any, Record<string, unknown>>();
+    let frame: number | null = null;
+    const flush = () => {
+        frame = null;
+        const updates = pending;
+        pending = new Map();
+        updates.forEach((options, region) => apply(region, options));
+    };
+    return {
+        schedule(region: any, options: Record<string, unknown>) {
+            pending.set(region, { ...pending.get(region), ...options });
+            if (frame === null) frame = requestAnimationFrame(flush);
+        },
+        cancel() {
+            if (frame !== null) cancelAnimationFrame(frame);
+            frame = null;
+            pending = new Map();
+        },
+    };
 };
\ No newline at end of file
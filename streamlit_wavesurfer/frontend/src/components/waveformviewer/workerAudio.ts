@@ -0,0 +1,103 @@
+import type { PeaksWorkerRequest, PeaksWorkerResponse } from "./peaksWorker";
+import { markEnd, markStart } from "./metrics";
+
+// Finest peaks drawn from worker-decoded audio; the same as the Python
+// pyramid's base level. Longer files are capped at MAX_PEAKS per channel.
+const SAMPLES_PER_PEAK = 256;
+const MAX_PEAKS = 1 << 20;
+
+export interface WorkerDecodedAudio {
+    blob: Blob;
+    peaks: Float32Array[];
+    duration: number;
+}
+
+type Pending = {
+    resolve: (message: PeaksWorkerResponse) => void;
+    reject: (error: Error) => void;
+    onProgress?: (progress: number | null) => void;
+};
+
+// Requests without the id, which send() assigns.
+type WithoutId<T> = T extends unknown ? Omit<T, "id"> : never;
+
+let worker: Worker | null = null;
+let nextId = 0;
+const pending = new Map<number, Pending>();
+
+const getWorker = () => {
+    if (worker) return worker;
+    worker = new Worker(new URL("./peaksWorker.ts", import.meta.url), { type: "module" });
+    worker.onmessage = (event: MessageEvent<PeaksWorkerResponse>) => {
+        const message = event.data;
+        const request = pending.get(message.id);
+        if (!request) return;
+        if (message.type === "progress") {
+            request.onProgress?.(message.total ? message.loaded / message.total : null);
+            return;
+        }
+        pending.delete(message.id);
+        if (message.type === "error") request.reject(new Error(message.message));
+        else request.resolve(message);
+    };
+    return worker;
+};
+
+const send = (request: WithoutId<PeaksWorkerRequest>, transfer: Transferable[] = [], onProgress?: Pending["onProgress"]) =>
+    new Promise<PeaksWorkerResponse>((resolve, reject) => {
+        const id = nextId++;
+        pending.set(id, { resolve, reject, onProgress });
+        getWorker().postMessage({ ...request, id }, transfer);
+    });
+
+// One context decodes every clip, however many waveforms are on the page.
+let decodeContext: OfflineAudioContext | null = null;
+const getDecodeContext = () => decodeContext ??= new OfflineAudioContext(1, 1, 44100);
+
+/**
+ * Fetches audio in the worker and returns it with its peaks, so WaveSurfer
+ * only draws.
+ */
+export const loadAudioInWorker = async (
+    url: string,
+    onProgress?: (progress: number | null) => void,
+): Promise<WorkerDecodedAudio> => {
+    markStart("fetch");
+    const fetched = await send({ type: "fetch", url }, [], onProgress);
+    if (fetched.type !== "fetched") throw new Error("Unexpected worker response");
+    markEnd("fetch");
+    return decodeAudio(fetched.buffer);
+};
+
+/**
+ * Decodes audio sent by Python as a bytes argument. Streamlit hands those
+ * over as views into the message they arrived in, and decodeAudioData
+ * detaches its input, so only this range is copied out first.
+ */
+export const decodeAudioBytes = (bytes: Uint8Array, mimeType?: string | null) =>
+    decodeAudio(bytes.slice().buffer, mimeType);
+
+/**
+ * Browsers do not offer decodeAudioData in workers, so decoding is started
+ * here (it runs on the browser's own decoder threads); copying the channels
+ * out and reducing them to peaks happen in the worker.
+ */
+const decodeAudio = async (buffer: ArrayBuffer, mimeType?: string | null): Promise<WorkerDecodedAudio> => {
+    markStart("decode");
+    // decodeAudioData detaches its input, so the blob is made first.
+    const blob = new Blob([buffer], mimeType ? { type: mimeType } : undefined);
+    const audioBuffer = await getDecodeContext().decodeAudioData(buffer);
+    const channels = Array.from({ length: audioBuffer.numberOfChannels }, (_, channel) => {
+        const samples = new Float32Array(audioBuffer.length);
+        audioBuffer.copyFromChannel(samples, channel);
+        return samples;
+    });
+    const samplesPerPeak = Math.max(SAMPLES_PER_PEAK, Math.ceil(audioBuffer.length / MAX_PEAKS));
+    const reduced = await send(
+        { type: "reduce", channels, samplesPerPeak },
+        channels.map((channel) => channel.buffer),
+    );
+    if (reduced.type !== "peaks") throw new Error("Unexpected worker response");
+    markEnd("decode");
+    return { blob, peaks: reduced.peaks, duration: audioBuffer.duration };
+};
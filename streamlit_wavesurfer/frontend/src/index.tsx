@@ -1,5 +1,6 @@
-import React from "react"
+import React, { lazy, Suspense } from "react"
 import ReactDOM from "react-dom/client"
+import { withStreamlitConnection } from "streamlit-component-lib"
 import WavesurferComponent from "@/WavesurferComponent"
 import "@/index.css"
 import { Provider as JotaiProvider } from "jotai"
@@ -7,12 +8,21 @@ import { QueryClient, QueryClientProvider } from "@tanstack/react-query"
 const rootElement = document.getElementById("root");
 if (!rootElement) throw new Error('Failed to find the root element');
 const queryClient = new QueryClient()
+// Only gallery pages download the gallery view.
+const GalleryComponent = lazy(() => import("@/GalleryComponent"))
+// wavesurfer_gallery() and wavesurfer() share this build; gallery args pick
+// the gallery view.
+const Component = withStreamlitConnection(({ args }: { args: any }) =>
+  args.gallery
+    ? <Suspense fallback={null}><GalleryComponent args={args} /></Suspense>
+    : <WavesurferComponent args={args} />
+)
 const root = ReactDOM.createRoot(rootElement);
 root.render(
   <React.StrictMode>
     <QueryClientProvider client={queryClient}>
       <JotaiProvider>
-        <WavesurferComponent />
+        <Component />
       </JotaiProvider>
     </QueryClientProvider>
   </React.StrictMode>
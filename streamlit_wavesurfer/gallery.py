@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional
+
+from streamlit import url_util
+
+from streamlit_wavesurfer.media import MEDIA_SERVER_ENV, media_server_enabled
+from streamlit_wavesurfer.peaks import compute_peaks
+from streamlit_wavesurfer.region_store import as_region_list
+from streamlit_wavesurfer.regions import RegionList
+from streamlit_wavesurfer.utils import AudioData, AudioEncoding, audio_to_url
+
+# Peaks per clip; gallery waveforms are small, so a coarse overview is enough.
+GALLERY_MAX_PEAKS = 2000
+
+
+@dataclass
+class Clip:
+    """One clip of a `wavesurfer_gallery`.
+
+    `id` identifies the clip in the returned value and defaults to its
+    position in the list; `label` is shown above its waveform.
+    """
+
+    audio_src: AudioData
+    regions: Any = None
+    id: Optional[str] = None
+    label: Optional[str] = None
+    cache_key: Optional[Hashable] = None
+
+
+def as_clip(clip: Any) -> Clip:
+    """Accept a `Clip`, a dict of its fields, or a bare audio source."""
+    if isinstance(clip, Clip):
+        return clip
+    if isinstance(clip, dict):
+        return Clip(**clip)
+    return Clip(audio_src=clip)
+
+
+def gallery_payload(
+    clips: List[Clip],
+    peaks: bool = True,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+) -> List[Dict[str, Any]]:
+    """Describe every clip for the component.
+
+    Audio is served by URL from the media server, so the arguments only carry
+    short, content-addressed links. Peaks are precomputed so the browser draws
+    each waveform without decoding it. Both are cached across reruns.
+
+    Raises:
+    ------
+    ValueError
+        If a clip is not a URL and the media server is not enabled.
+    """
+    # Remote clips are streamed as they are; the browser draws those.
+    remote = [
+        isinstance(clip.audio_src, str)
+        and url_util.is_url(clip.audio_src, allowed_schemas=("http", "https", "data"))
+        for clip in clips
+    ]
+    if not all(remote) and not media_server_enabled():
+        # Inlining would resend every clip on every rerun.
+        raise ValueError(
+            f"The gallery needs the media server, set {MEDIA_SERVER_ENV}=1"
+        )
+    payload = []
+    for index, clip in enumerate(clips):
+        clip_peaks = None
+        if peaks and not remote[index]:
+            clip_peaks = compute_peaks(
+                clip.audio_src,
+                max_peaks=GALLERY_MAX_PEAKS,
+                sample_rate=sample_rate,
+                cache_key=clip.cache_key,
+            ).to_dict()
+        payload.append(
+            {
+                "id": clip.id if clip.id is not None else str(index),
+                "label": clip.label,
+                "audioSrc": audio_to_url(
+                    clip.audio_src,
+                    cache_key=clip.cache_key,
+                    sample_rate=sample_rate,
+                    encoding=encoding,
+                ),
+                "peaks": clip_peaks,
+                "regions": as_region_list(clip.regions).to_columns(),
+            }
+        )
+    return payload
+
+
+def gallery_value(clips: List[Clip], value: Any) -> Dict[str, Any]:
+    """Turn the component value into the selected clip id and the regions of
+    every clip, with the edits made in the browser applied."""
+    edits = value.get("edits", {}) if isinstance(value, dict) else {}
+    regions: Dict[str, RegionList] = {}
+    for index, clip in enumerate(clips):
+        clip_id = clip.id if clip.id is not None else str(index)
+        if clip_id in edits:
+            regions[clip_id] = RegionList.from_columns(**edits[clip_id])
+        else:
+            regions[clip_id] = as_region_list(clip.regions)
+    return {
+        "selected": value.get("selected") if isinstance(value, dict) else None,
+        "regions": regions,
+    }
@@ -0,0 +1,457 @@
+import base64
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+from streamlit_wavesurfer.cache import _env_bytes, audio_cache
+
+# The media server is opt-in: it listens on its own port, which browsers only
+# reach when the app is used on the same machine or the port is exposed. Set
+# WAVESURFER_MEDIA_SERVER=1 for the former and WAVESURFER_MEDIA_URL for the
+# latter; without either, content is sent inline instead.
+MEDIA_SERVER_ENV = "WAVESURFER_MEDIA_SERVER"
+# Public base URL of the media server as seen by the browser, e.g. when the
+# server sits behind a reverse proxy. Defaults to http://<host>:<port>.
+MEDIA_URL_ENV = "WAVESURFER_MEDIA_URL"
+MEDIA_HOST_ENV = "WAVESURFER_MEDIA_HOST"
+MEDIA_PORT_ENV = "WAVESURFER_MEDIA_PORT"
+# Memory held by registered in-memory buffers; the least recently served are
+# dropped first. Registered files only cost an entry each.
+MEDIA_MAX_BYTES_ENV = "WAVESURFER_MEDIA_MAX_BYTES"
+DEFAULT_MEDIA_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MEDIA_MAX_ENTRIES = 4096
+
+MEDIA_ROUTE = "/media/"
+# /segment/<hash>.wav?start=<frame>&frames=<count> serves a slice of a file.
+SEGMENT_ROUTE = "/segment/"
+# Ten minutes at 48 kHz, so one request cannot ask for a whole recording.
+MAX_SEGMENT_FRAMES = 48000 * 600
+CHUNK_SIZE = 64 * 1024
+EXTENSIONS = {
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/mpeg": ".mp3",
+    "audio/ogg": ".ogg",
+    "audio/mp4": ".m4a",
+    "audio/flac": ".flac",
+    "audio/webm": ".webm",
+    "application/json": ".json",
+    "application/octet-stream": ".bin",
+}
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@dataclass
+class MediaEntry:
+    """A piece of content registered with the media server.
+
+    Entries are either backed by a file on disk (streamed on request) or by an
+    in-memory buffer. Both are addressed by a hash of their content.
+    """
+
+    content_hash: str
+    mime_type: str
+    path: Optional[Path] = None
+    data: Optional[bytes] = None
+
+    @property
+    def size(self) -> int:
+        if self.data is not None:
+            return len(self.data)
+        return self.path.stat().st_size
+
+    @property
+    def name(self) -> str:
+        ext = EXTENSIONS.get(self.mime_type, "")
+        if self.path is not None and not ext:
+            ext = self.path.suffix.lower()
+        return f"{self.content_hash}{ext}"
+
+    def read(self, start: int, length: int):
+        """Yield `length` bytes starting at `start` in chunks."""
+        if self.data is not None:
+            view = memoryview(self.data)
+            for offset in range(start, start + length, CHUNK_SIZE):
+                yield view[offset : min(offset + CHUNK_SIZE, start + length)]
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+def hash_bytes(data: Union[bytes, bytearray, memoryview]) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_file(path: Union[str, Path]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def data_uri(data: Union[bytes, bytearray, memoryview], mime_type: str) -> str:
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` Range header into an inclusive (start, end) pair.
+
+    Returns None when the header is absent or malformed (serve the full body)
+    and raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+def read_segment(path: Union[str, Path], start: int, frames: int) -> bytes:
+    """Encode `frames` frames of `path` from frame `start` as 16-bit WAV.
+
+    Only the slice is read: soundfile seeks to the frame offset.
+    """
+    import soundfile as sf
+
+    with sf.SoundFile(str(path)) as f:
+        if start >= f.frames:
+            raise ValueError(start)
+        f.seek(start)
+        data = f.read(min(frames, f.frames - start), dtype="int16", always_2d=True)
+        rate = f.samplerate
+    buffer = io.BytesIO()
+    sf.write(buffer, data, samplerate=rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    server: "MediaServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        # The component iframe is served from the Streamlit origin.
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Headers", "Range, If-None-Match")
+        self.send_header(
+            "Access-Control-Expose-Headers",
+            "Content-Length, Content-Range, Accept-Ranges, ETag",
+        )
+        super().end_headers()
+
+    def do_OPTIONS(self):
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _error(self, status: HTTPStatus):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve(self, send_body: bool):
+        path, _, query = self.path.partition("?")
+        if path.startswith(SEGMENT_ROUTE):
+            return self._serve_segment(path[len(SEGMENT_ROUTE) :], query, send_body)
+        if not path.startswith(MEDIA_ROUTE):
+            return self._error(HTTPStatus.NOT_FOUND)
+        entry = self.server.lookup(path[len(MEDIA_ROUTE) :])
+        if entry is None:
+            return self._error(HTTPStatus.NOT_FOUND)
+
+        etag = f'"{entry.content_hash}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        size = entry.size
+        try:
+            byte_range = parse_range(self.headers.get("Range"), size)
+        except ValueError:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if byte_range is None:
+            start, end = 0, size - 1
+            self.send_response(HTTPStatus.OK)
+        else:
+            start, end = byte_range
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        length = max(end - start + 1, 0)
+        self.send_header("Content-Type", entry.mime_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        # Content is addressed by its hash so it never changes under a URL.
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.end_headers()
+        if not send_body:
+            return
+        try:
+            for chunk in entry.read(start, length):
+                self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # The browser aborts media requests freely while seeking.
+            pass
+
+    def _serve_segment(self, name: str, query: str, send_body: bool):
+        entry = self.server.lookup(name)
+        if entry is None or entry.path is None:
+            return self._error(HTTPStatus.NOT_FOUND)
+        params = parse_qs(query)
+        try:
+            start = int(params["start"][0])
+            frames = int(params["frames"][0])
+        except (KeyError, ValueError):
+            return self._error(HTTPStatus.BAD_REQUEST)
+        if start < 0 or not 0 < frames <= MAX_SEGMENT_FRAMES:
+            return self._error(HTTPStatus.BAD_REQUEST)
+
+        etag = f'"{entry.content_hash}-{start}-{frames}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        try:
+            body = read_segment(entry.path, start, frames)
+        except (ValueError, RuntimeError):
+            return self._error(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.end_headers()
+        if not send_body:
+            return
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MediaServer(ThreadingHTTPServer):
+    """Serves registered audio over HTTP with Range and caching support.
+
+    The registry is a least recently used cache: in-memory buffers are bounded
+    by `max_bytes` and all entries by `max_entries`. Callers register their
+    content again every time they hand out its URL, so content that is still
+    displayed stays registered.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_bytes: int = DEFAULT_MEDIA_MAX_BYTES,
+        max_entries: int = DEFAULT_MEDIA_MAX_ENTRIES,
+    ):
+        super().__init__((host, port), MediaRequestHandler)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self._entries: "OrderedDict[str, MediaEntry]" = OrderedDict()
+        # (path, mtime_ns, size) -> content hash, so files are hashed once.
+        self._file_hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        public_url = os.getenv(MEDIA_URL_ENV)
+        if public_url:
+            return public_url.rstrip("/")
+        host, port = self.server_address[:2]
+        if host in ("0.0.0.0", "::", ""):
+            host = "localhost"
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MediaServer":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.serve_forever, name="wavesurfer-media", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+
+    def lookup(self, name: str) -> Optional[MediaEntry]:
+        content_hash = name.split(".", 1)[0]
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is not None:
+                self._entries.move_to_end(content_hash)
+            return entry
+
+    def url_for(self, entry: MediaEntry) -> str:
+        return f"{self.base_url}{MEDIA_ROUTE}{entry.name}"
+
+    def segment_url_for(self, entry: MediaEntry) -> str:
+        return f"{self.base_url}{SEGMENT_ROUTE}{entry.name}"
+
+    def _add(self, entry: MediaEntry) -> MediaEntry:
+        with self._lock:
+            current = self._entries.get(entry.content_hash)
+            if current is None:
+                current = self._entries[entry.content_hash] = entry
+                if entry.data is not None:
+                    self.bytes += len(entry.data)
+            self._entries.move_to_end(entry.content_hash)
+            # The entry just registered is kept even if it alone is too big.
+            while len(self._entries) > 1 and (
+                self.bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                if evicted.data is not None:
+                    self.bytes -= len(evicted.data)
+            return current
+
+    def register(self, entry: MediaEntry) -> str:
+        """Register an entry, or mark it as recently used, and return its URL."""
+        return self.url_for(self._add(entry))
+
+    def file_entry(
+        self,
+        path: Union[str, Path],
+        mime_type: str,
+        content_hash: Optional[str] = None,
+    ) -> MediaEntry:
+        """Describe a file on disk, hashing it unless `content_hash` is given.
+        Hashes are remembered by path, mtime and size."""
+        path = Path(path).absolute()
+        if content_hash is not None:
+            return MediaEntry(content_hash, mime_type, path=path)
+        stat = path.stat()
+        file_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            content_hash = self._file_hashes.get(file_key)
+        if content_hash is None:
+            content_hash = hash_file(path)
+            with self._lock:
+                self._file_hashes[file_key] = content_hash
+                while len(self._file_hashes) > self.max_entries:
+                    self._file_hashes.popitem(last=False)
+        return MediaEntry(content_hash, mime_type, path=path)
+
+    def register_file(
+        self,
+        path: Union[str, Path],
+        mime_type: str,
+        content_hash: Optional[str] = None,
+    ) -> str:
+        """Register a file on disk and return its URL. The file is streamed from
+        disk on request rather than loaded into memory. Callers that already
+        know a stable key for the content can pass it as `content_hash` to skip
+        hashing the file."""
+        return self.register(self.file_entry(path, mime_type, content_hash))
+
+    def register_segments(self, path: Union[str, Path], content_hash: str) -> str:
+        """Register a file on disk to be served in slices and return the base
+        URL of its segments. `content_hash` must identify the file's content,
+        e.g. a hash of its path, mtime and size; the file itself is not read."""
+        path = Path(path).absolute()
+        entry = self._add(MediaEntry(content_hash, "audio/wav", path=path))
+        return self.segment_url_for(entry)
+
+    def register_bytes(
+        self, data: Union[bytes, bytearray, memoryview], mime_type: str
+    ) -> str:
+        """Register an in-memory buffer and return its URL."""
+        return self.register(bytes_entry(data, mime_type))
+
+
+def bytes_entry(data: Union[bytes, bytearray, memoryview], mime_type: str) -> MediaEntry:
+    """Describe an in-memory buffer, addressed by a hash of its content."""
+    data = bytes(data)
+    return MediaEntry(hash_bytes(data), mime_type, data=data)
+
+
+_server: Optional[MediaServer] = None
+_server_lock = threading.Lock()
+
+
+def get_media_server() -> MediaServer:
+    """Return the process-wide media server, starting it on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            host = os.getenv(MEDIA_HOST_ENV, "127.0.0.1")
+            port = int(os.getenv(MEDIA_PORT_ENV, "0"))
+            max_bytes = _env_bytes(MEDIA_MAX_BYTES_ENV, DEFAULT_MEDIA_MAX_BYTES)
+            _server = MediaServer(host, port, max_bytes=max_bytes).start()
+        return _server
+
+
+def media_server_enabled() -> bool:
+    """Whether content may be served by URL from the media server, see
+    `MEDIA_SERVER_ENV`."""
+    if os.getenv(MEDIA_URL_ENV):
+        return True
+    return os.getenv(MEDIA_SERVER_ENV, "").lower() in ("1", "true", "yes")
+
+
+def file_url(path: Union[str, Path], mime_type: str, content_hash: str) -> str:
+    """Return a URL the browser can fetch a file on disk from: the media
+    server when it is enabled, otherwise a data URI cached under
+    `content_hash`."""
+    if media_server_enabled():
+        return get_media_server().register_file(
+            path, mime_type, content_hash=content_hash
+        )
+    return audio_cache.get_or_compute(
+        ("inline", content_hash), lambda: data_uri(Path(path).read_bytes(), mime_type)
+    )
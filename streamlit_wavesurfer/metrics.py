@@ -0,0 +1,22 @@
+import json
+import time
+from typing import Any, Dict
+
+
+def elapsed_ms(started: float) -> float:
+    """Milliseconds since `started`, a `time.perf_counter()` reading."""
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def payload_bytes(args: Dict[str, Any]) -> int:
+    """Size of component arguments as Streamlit sends them: bytes arguments
+    as they are, everything else as JSON."""
+    binary = {
+        name: value
+        for name, value in args.items()
+        if isinstance(value, (bytes, bytearray))
+    }
+    json_args = {name: value for name, value in args.items() if name not in binary}
+    return sum(len(value) for value in binary.values()) + len(
+        json.dumps(json_args, default=str).encode()
+    )
@@ -0,0 +1,413 @@
+import base64
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import unquote_to_bytes
+
+import numpy as np
+from streamlit import url_util
+
+from streamlit_wavesurfer.cache import audio_cache, audio_cache_key, get_cache_dir
+from streamlit_wavesurfer.fetch import fetch_url
+from streamlit_wavesurfer.media import get_media_server, hash_bytes
+
+PeaksSource = Union[str, Path, bytes, io.BytesIO, np.ndarray]
+
+# Same as WaveSurfer's exportPeaks() default.
+DEFAULT_MAX_PEAKS = 8000
+BLOCK_FRAMES = 1 << 18
+# Peaks are normalised to [-1, 1], four decimals is below one pixel at any height.
+PEAK_DECIMALS = 4
+# Finest pyramid level; 256 frames per peak is ~172 px/s at 44.1 kHz.
+PYRAMID_BASE_SAMPLES_PER_PEAK = 256
+# Coarser levels are added until a level fits in this many peaks.
+PYRAMID_MIN_PEAKS = 4096
+# Buckets of the previous level reduced per step when building the pyramid.
+PYRAMID_CHUNK = 1 << 20
+PYRAMID_VERSION = 1
+
+
+@dataclass
+class Peaks:
+    """Precomputed min/max waveform peaks.
+
+    `data` holds one list per channel with interleaved [min, max] pairs, one pair
+    per `samples_per_peak` frames. This is the layout WaveSurfer draws from when
+    peaks are passed to `load()`, so the browser never has to decode the audio.
+    """
+
+    data: List[List[float]]
+    duration: float
+    sample_rate: int
+    samples_per_peak: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "data": self.data,
+            "duration": self.duration,
+            "sampleRate": self.sample_rate,
+            "samplesPerPeak": self.samples_per_peak,
+        }
+
+
+def reduce_min_max(block: np.ndarray, samples_per_peak: int) -> np.ndarray:
+    """Reduce a (frames, channels) block to (channels, buckets * 2) interleaved
+    min/max pairs. `frames` must be a multiple of `samples_per_peak` except for
+    a trailing partial bucket, which is reduced on its own."""
+    frames, channels = block.shape
+    whole = frames - frames % samples_per_peak
+    buckets = block[:whole].reshape(-1, samples_per_peak, channels)
+    mins = buckets.min(axis=1)
+    maxs = buckets.max(axis=1)
+    if whole < frames:
+        tail = block[whole:]
+        mins = np.concatenate([mins, tail.min(axis=0, keepdims=True)])
+        maxs = np.concatenate([maxs, tail.max(axis=0, keepdims=True)])
+    out = np.empty((channels, mins.shape[0] * 2), dtype=block.dtype)
+    out[:, 0::2] = mins.T
+    out[:, 1::2] = maxs.T
+    return out
+
+
+def open_soundfile(
+    source: PeaksSource, sample_rate: Optional[int] = None
+) -> "sf.SoundFile | _ArrayReader":
+    """Open a seekable, block-readable view of any supported audio source.
+    http(s) URLs are downloaded through the on-disk cache first."""
+    if isinstance(source, np.ndarray):
+        return _ArrayReader(source, sample_rate or 16000)
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif isinstance(source, io.BytesIO):
+        source.seek(0)
+    elif isinstance(source, Path):
+        source = str(source)
+    elif isinstance(source, str) and source.startswith("data:"):
+        source = io.BytesIO(decode_data_uri(source))
+    elif isinstance(source, str) and url_util.is_url(
+        source, allowed_schemas=("http", "https")
+    ):
+        source = str(fetch_url(source).path)
+    import soundfile as sf
+
+    return sf.SoundFile(source)
+
+
+def decode_data_uri(uri: str) -> bytes:
+    """Return the payload of a `data:` URI."""
+    header, _, payload = uri.partition(",")
+    if header.endswith(";base64"):
+        return base64.b64decode(payload)
+    return unquote_to_bytes(payload)
+
+
+class _ArrayReader:
+    """Minimal SoundFile-compatible reader over an in-memory array."""
+
+    def __init__(self, array: np.ndarray, sample_rate: int):
+        if array.ndim == 1:
+            array = array[:, None]
+        elif array.shape[0] < array.shape[1]:
+            # (channels, frames) layout, as produced by librosa.
+            array = array.T
+        self._array = array
+        self.samplerate = sample_rate
+        self.channels = array.shape[1]
+        self.frames = array.shape[0]
+        self._pos = 0
+
+    def seek(self, frame: int) -> int:
+        self._pos = frame
+        return frame
+
+    def read(self, frames: int = -1, dtype: str = "float32", always_2d: bool = True):
+        end = self.frames if frames < 0 else min(self._pos + frames, self.frames)
+        block = self._array[self._pos : end].astype(dtype, copy=False)
+        self._pos = end
+        return block
+
+    def blocks(self, blocksize: int, dtype: str = "float32", always_2d: bool = True):
+        for start in range(0, self.frames, blocksize):
+            yield self._array[start : start + blocksize].astype(dtype, copy=False)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_peak_blocks(
+    reader, samples_per_peak: int, block_frames: int = BLOCK_FRAMES
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Stream (frames read, (channels, 2 * buckets) min/max) pairs from a reader.
+
+    Blocks are read as a multiple of `samples_per_peak` so that only the final
+    block can end in a partial bucket, and memory stays bounded by the block size.
+    """
+    block_frames = max(samples_per_peak, block_frames - block_frames % samples_per_peak)
+    for block in reader.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+        if len(block):
+            yield len(block), reduce_min_max(block, samples_per_peak)
+
+
+def compute_peaks(
+    audio_data: PeaksSource,
+    samples_per_peak: Optional[int] = None,
+    max_peaks: int = DEFAULT_MAX_PEAKS,
+    sample_rate: Optional[int] = None,
+    cache_key: Optional[Hashable] = None,
+) -> Peaks:
+    """Compute min/max peaks per channel for the waveform overview.
+
+    Parameters:
+    ----------
+    audio_data : PeaksSource
+        File path, http(s) URL or data URI, raw encoded bytes/BytesIO, or a
+        numpy array of samples.
+    samples_per_peak : Optional[int]
+        Frames reduced into each min/max pair. Derived from `max_peaks` if None.
+    max_peaks : int
+        Upper bound on the number of min/max pairs per channel.
+    sample_rate : Optional[int]
+        Sample rate of a numpy array input. Ignored for encoded audio.
+    cache_key : Optional[Hashable]
+        Explicit identity of the audio, see `audio_cache_key`.
+
+    Returns:
+    -------
+    Peaks
+        The peaks and the exact duration of the audio.
+    """
+    key = (
+        "peaks",
+        audio_cache_key(audio_data, cache_key),
+        samples_per_peak,
+        max_peaks,
+        sample_rate,
+    )
+    return audio_cache.get_or_compute(
+        key,
+        lambda: _compute_peaks(audio_data, samples_per_peak, max_peaks, sample_rate),
+    )
+
+
+def _compute_peaks(
+    audio_data: PeaksSource,
+    samples_per_peak: Optional[int],
+    max_peaks: int,
+    sample_rate: Optional[int],
+) -> Peaks:
+    with open_soundfile(audio_data, sample_rate) as reader:
+        if samples_per_peak is None:
+            samples_per_peak = max(1, math.ceil(reader.frames / max_peaks))
+        blocks = []
+        # Some containers (e.g. VBR mp3) only report an estimate up front, so
+        # count the frames actually read.
+        total_frames = 0
+        for frames, block in iter_peak_blocks(reader, samples_per_peak):
+            total_frames += frames
+            blocks.append(block)
+        channels = reader.channels
+        rate = reader.samplerate
+    if blocks:
+        peaks = np.concatenate(blocks, axis=1)
+    else:
+        peaks = np.zeros((channels, 0), dtype=np.float32)
+    return Peaks(
+        data=np.round(peaks.astype(np.float64), PEAK_DECIMALS).tolist(),
+        duration=total_frames / rate,
+        sample_rate=rate,
+        samples_per_peak=samples_per_peak,
+    )
+
+
+def downsample_level(level: np.ndarray) -> np.ndarray:
+    """Halve the resolution of a (buckets, channels, 2) min/max level."""
+    if len(level) % 2:
+        level = np.concatenate([level, level[-1:]])
+    pairs = level.reshape(-1, 2, *level.shape[1:])
+    out = np.empty((pairs.shape[0], *level.shape[1:]), dtype=level.dtype)
+    out[..., 0] = pairs[..., 0].min(axis=1)
+    out[..., 1] = pairs[..., 1].max(axis=1)
+    return out
+
+
+@dataclass
+class PeakPyramid:
+    """Multi-resolution min/max peaks cached on disk.
+
+    Each level stores interleaved min/max pairs at a power-of-two number of
+    frames per peak, laid out as (buckets, channels, 2) little-endian float32 in
+    a raw file that is memory-mapped on access. Pyramids are keyed by the source
+    path, mtime and size, so re-opening an unchanged file only reads a small
+    metadata file.
+    """
+
+    directory: Path
+    key: str
+    sample_rate: int
+    channels: int
+    frames: int
+    # samples per peak -> number of buckets, finest level first
+    levels: Dict[int, int]
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    def level_path(self, samples_per_peak: int) -> Path:
+        return self.directory / f"level_{samples_per_peak}.f32"
+
+    def level(self, samples_per_peak: int) -> np.memmap:
+        """Memory-map a level as a (buckets, channels, 2) array."""
+        return np.memmap(
+            self.level_path(samples_per_peak),
+            dtype="<f4",
+            mode="r",
+            shape=(self.levels[samples_per_peak], self.channels, 2),
+        )
+
+    def select_level(self, px_per_sec: float) -> int:
+        """Return the coarsest level that still has a peak for every pixel."""
+        target = self.sample_rate / max(px_per_sec, 1e-9)
+        fitting = [spp for spp in self.levels if spp <= target]
+        return max(fitting) if fitting else min(self.levels)
+
+    def to_peaks(self, samples_per_peak: int) -> Peaks:
+        level = np.asarray(self.level(samples_per_peak), dtype=np.float64)
+        data = level.transpose(1, 0, 2).reshape(self.channels, -1)
+        return Peaks(
+            data=np.round(data, PEAK_DECIMALS).tolist(),
+            duration=self.duration,
+            sample_rate=self.sample_rate,
+            samples_per_peak=samples_per_peak,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the pyramid for the component, serving each level by URL
+        from the media server."""
+        server = get_media_server()
+        return {
+            "duration": self.duration,
+            "sampleRate": self.sample_rate,
+            "channels": self.channels,
+            "levels": [
+                {
+                    "samplesPerPeak": spp,
+                    "length": length,
+                    "url": server.register_file(
+                        self.level_path(spp),
+                        "application/octet-stream",
+                        content_hash=f"{self.key}-{spp}",
+                    ),
+                }
+                for spp, length in sorted(self.levels.items())
+            ],
+        }
+
+    @classmethod
+    def open(
+        cls,
+        path: Union[str, Path],
+        base_samples_per_peak: int = PYRAMID_BASE_SAMPLES_PER_PEAK,
+        min_peaks: int = PYRAMID_MIN_PEAKS,
+        cache_dir: Optional[Path] = None,
+    ) -> "PeakPyramid":
+        """Open the cached pyramid for `path`, building it on first use."""
+        path = Path(path).absolute()
+        stat = path.stat()
+        key = hash_bytes(
+            f"{path}:{stat.st_mtime_ns}:{stat.st_size}:"
+            f"{base_samples_per_peak}:{min_peaks}:{PYRAMID_VERSION}".encode()
+        )
+        directory = Path(cache_dir or get_cache_dir("peaks")) / key
+        if not (directory / "meta.json").exists():
+            build_peak_pyramid(path, directory, base_samples_per_peak, min_peaks)
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        return cls(
+            directory=directory,
+            key=key,
+            sample_rate=meta["sampleRate"],
+            channels=meta["channels"],
+            frames=meta["frames"],
+            levels={int(spp): length for spp, length in meta["levels"].items()},
+        )
+
+
+def build_peak_pyramid(
+    path: Union[str, Path],
+    directory: Path,
+    base_samples_per_peak: int = PYRAMID_BASE_SAMPLES_PER_PEAK,
+    min_peaks: int = PYRAMID_MIN_PEAKS,
+) -> None:
+    """Build a pyramid for `path` into `directory`.
+
+    The finest level is streamed from the file block by block and every coarser
+    level is reduced from the memory-mapped level below it in fixed-size chunks,
+    so memory use is independent of the length of the recording. The pyramid is
+    written to a temporary directory and moved into place once complete.
+    """
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    import soundfile as sf
+
+    tmp = Path(tempfile.mkdtemp(prefix=f"{directory.name}.", dir=directory.parent))
+    try:
+        levels = {}
+        spp = base_samples_per_peak
+        with sf.SoundFile(str(path)) as reader:
+            channels = reader.channels
+            sample_rate = reader.samplerate
+            frames = 0
+            length = 0
+            with open(tmp / f"level_{spp}.f32", "wb") as f:
+                for block_frames, block in iter_peak_blocks(reader, spp):
+                    frames += block_frames
+                    # (channels, 2 * buckets) -> (buckets, channels, 2)
+                    block = block.reshape(channels, -1, 2).transpose(1, 0, 2)
+                    np.ascontiguousarray(block, dtype="<f4").tofile(f)
+                    length += block.shape[0]
+        levels[spp] = length
+        while length > min_peaks:
+            previous = np.memmap(
+                tmp / f"level_{spp}.f32",
+                dtype="<f4",
+                mode="r",
+                shape=(length, channels, 2),
+            )
+            with open(tmp / f"level_{spp * 2}.f32", "wb") as f:
+                for start in range(0, length, PYRAMID_CHUNK):
+                    downsample_level(previous[start : start + PYRAMID_CHUNK]).tofile(f)
+            del previous
+            spp *= 2
+            length = (length + 1) // 2
+            levels[spp] = length
+        with open(tmp / "meta.json", "w") as f:
+            json.dump(
+                {
+                    "version": PYRAMID_VERSION,
+                    "sampleRate": sample_rate,
+                    "channels": channels,
+                    "frames": frames,
+                    "levels": levels,
+                },
+                f,
+            )
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # Another process finished building the same pyramid first.
+            if not (directory / "meta.json").exists():
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
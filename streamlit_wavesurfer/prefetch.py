@@ -0,0 +1,268 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Literal, Optional, Sequence
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from streamlit_wavesurfer.media import media_server_enabled
+from streamlit_wavesurfer.utils import (
+    AudioData,
+    AudioEncoding,
+    audio_content_hash,
+    audio_to_base64,
+    audio_to_bytes,
+    audio_to_url,
+)
+
+# Worker threads encoding clips ahead of time, override with
+# WAVESURFER_PREFETCH_WORKERS.
+PREFETCH_WORKERS_ENV = "WAVESURFER_PREFETCH_WORKERS"
+DEFAULT_WORKERS = 2
+# Clips each session may have waiting for a worker; later sources past this
+# limit are skipped.
+DEFAULT_MAX_PENDING = 16
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _session_id() -> Optional[str]:
+    """The Streamlit session calling, None outside a script run."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def prepare(
+    audio_src: AudioData,
+    transport: Literal["bytes", "base64", "url"] = "bytes",
+    peaks: Any = False,
+    cache_key: Optional[Hashable] = None,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+    proxy: bool = False,
+):
+    """Do the work `wavesurfer()` does for `audio_src` with the same arguments,
+    leaving the results in the caches it reads."""
+    from streamlit_wavesurfer.peaks import PeakPyramid, compute_peaks
+    from streamlit_wavesurfer.proxy import audio_to_proxy, proxy_cache_key
+
+    serve_by_url = media_server_enabled()
+    if transport == "url" and not serve_by_url:
+        transport = "bytes"
+    sent_src, sent_key = audio_src, cache_key
+    if proxy:
+        sent_src = audio_to_proxy(audio_src, sample_rate=sample_rate, cache_key=cache_key)
+        sent_key = proxy_cache_key(audio_src, cache_key)
+        if serve_by_url:
+            audio_to_url(
+                audio_src, cache_key=cache_key, sample_rate=sample_rate, encoding=encoding
+            )
+    if transport == "url":
+        audio_to_url(
+            sent_src, cache_key=sent_key, sample_rate=sample_rate, encoding=encoding
+        )
+    elif transport == "bytes":
+        audio_bytes = sent_src if proxy else audio_to_bytes(
+            sent_src, cache_key=sent_key, sample_rate=sample_rate, encoding=encoding
+        )
+        if audio_bytes is not None:
+            audio_content_hash(
+                sent_src,
+                audio_bytes,
+                cache_key=sent_key,
+                sample_rate=sample_rate,
+                encoding=encoding,
+            )
+    else:
+        data_uri = audio_to_base64(
+            sent_src, cache_key=sent_key, sample_rate=sample_rate, encoding=encoding
+        )
+        # Mirrors `wavesurfer()`: only inlined audio without peaks is hashed.
+        inlined = isinstance(data_uri, str) and data_uri.startswith("data:")
+        if inlined and peaks is False:
+            audio_content_hash(
+                sent_src,
+                data_uri,
+                cache_key=sent_key,
+                sample_rate=sample_rate,
+                encoding=encoding,
+            )
+    if peaks == "pyramid":
+        PeakPyramid.open(audio_src)
+    elif peaks is True:
+        compute_peaks(audio_src, sample_rate=sample_rate, cache_key=cache_key)
+
+
+class Prefetcher:
+    """Prepares upcoming clips on a bounded thread pool.
+
+    At most `max_workers` clips are encoded at once, shared by every session,
+    and at most `max_pending` clips per session wait for a worker. A clip
+    `wavesurfer()` asks for while it is being prefetched is not encoded twice:
+    the script waits for the prefetch.
+    """
+
+    def __init__(
+        self, max_workers: int = DEFAULT_WORKERS, max_pending: int = DEFAULT_MAX_PENDING
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="wavesurfer-prefetch"
+        )
+        # Session id -> its queued or running clips.
+        self._futures: Dict[Optional[str], List[Future]] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        sources: Sequence[AudioData],
+        cache_keys: Optional[Sequence[Hashable]] = None,
+        replace: bool = True,
+        session: Optional[str] = None,
+        **options,
+    ) -> List[Future]:
+        """Queue `sources` for `session`, most urgent first, passing `options`
+        to `prepare`. With `replace`, clips the session queued earlier that
+        have not started yet are cancelled; other sessions are unaffected."""
+        sources = list(sources)
+        keys = list(cache_keys) if cache_keys is not None else [None] * len(sources)
+        if len(keys) != len(sources):
+            raise ValueError("cache_keys must have one entry per source")
+        with self._lock:
+            # Forget sessions whose clips are all done, e.g. closed ones.
+            for done in [
+                other
+                for other, futures in self._futures.items()
+                if all(future.done() for future in futures)
+            ]:
+                del self._futures[done]
+            if replace:
+                self._cancel(session)
+            own = [
+                future for future in self._futures.get(session, []) if not future.done()
+            ]
+            queued = [future for future in own if not future.running()]
+            room = max(self.max_pending - len(queued), 0)
+            if len(sources) > room:
+                _LOGGER.info(
+                    "Skipping %d of %d clips to prefetch, %d are already queued",
+                    len(sources) - room,
+                    len(sources),
+                    len(queued),
+                )
+            futures = [
+                self._executor.submit(prepare, source, cache_key=key, **options)
+                for source, key in zip(sources[:room], keys[:room])
+            ]
+            own.extend(futures)
+            if own:
+                self._futures[session] = own
+            else:
+                self._futures.pop(session, None)
+        return futures
+
+    def _cancel(self, session: Optional[str]) -> int:
+        own = self._futures.get(session, [])
+        cancelled = sum(future.cancel() for future in own)
+        own = [future for future in own if not future.cancelled()]
+        if own:
+            self._futures[session] = own
+        else:
+            self._futures.pop(session, None)
+        return cancelled
+
+    def cancel(self, session: Optional[str] = None) -> int:
+        """Cancel the clips `session` still has waiting for a worker and return
+        how many were cancelled. Clips already being encoded run to completion."""
+        with self._lock:
+            return self._cancel(session)
+
+    def shutdown(self):
+        with self._lock:
+            for session in list(self._futures):
+                self._cancel(session)
+        self._executor.shutdown(wait=False)
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Return the process-wide prefetcher, shared by every session."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            workers = int(os.getenv(PREFETCH_WORKERS_ENV) or DEFAULT_WORKERS)
+            _prefetcher = Prefetcher(max_workers=workers)
+        return _prefetcher
+
+
+def configure_prefetch(
+    max_workers: Optional[int] = None, max_pending: Optional[int] = None
+):
+    """Replace the process-wide prefetcher with one using these limits.
+    Queued clips are cancelled; clips being encoded finish in the background."""
+    global _prefetcher
+    with _prefetcher_lock:
+        previous = _prefetcher
+        _prefetcher = Prefetcher(
+            max_workers=max_workers
+            or (previous.max_workers if previous else DEFAULT_WORKERS),
+            max_pending=max_pending
+            or (previous.max_pending if previous else DEFAULT_MAX_PENDING),
+        )
+    if previous is not None:
+        previous.shutdown()
+
+
+def prefetch(
+    sources: Sequence[AudioData],
+    transport: Literal["bytes", "base64", "url"] = "bytes",
+    peaks: Any = False,
+    cache_keys: Optional[Sequence[Hashable]] = None,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+    proxy: bool = False,
+    replace: bool = True,
+) -> List[Future]:
+    """Encode upcoming clips in the background so `wavesurfer()` finds them
+    in its cache.
+
+    Pass the same `transport`, `peaks`, `sample_rate`, `encoding` and `proxy`
+    the clips will be shown with, as those are part of the cache keys.
+
+    Parameters:
+    ----------
+    sources : Sequence[AudioData]
+        The upcoming clips, most urgent first.
+    cache_keys : Optional[Sequence[Hashable]]
+        The `cache_key` each clip will be shown with, if any.
+    replace : bool
+        Cancel clips this session queued in earlier calls that have not
+        started, e.g. once the user has moved past them.
+
+    Returns:
+    -------
+    List[Future]
+        One future per queued clip; clips past the session's pending limit
+        are skipped and logged.
+    """
+    return get_prefetcher().submit(
+        sources,
+        cache_keys=cache_keys,
+        replace=replace,
+        session=_session_id(),
+        transport=transport,
+        peaks=peaks,
+        sample_rate=sample_rate,
+        encoding=encoding,
+        proxy=proxy,
+    )
+
+
+def cancel_prefetch() -> int:
+    """Cancel this session's queued prefetches; see `Prefetcher.cancel`."""
+    return get_prefetcher().cancel(_session_id())
@@ -0,0 +1,132 @@
+import math
+from typing import Hashable, Iterable, Iterator, Optional
+
+import numpy as np
+from streamlit import url_util
+
+from streamlit_wavesurfer.cache import audio_cache, audio_cache_key
+from streamlit_wavesurfer.fetch import fetch_url
+from streamlit_wavesurfer.peaks import BLOCK_FRAMES, PeaksSource, open_soundfile
+
+# Previews are mono Opus at 16 kHz: enough to see the waveform and follow
+# speech or music while scrubbing, at a small fraction of the source size.
+PROXY_SAMPLE_RATE = 16000
+PROXY_ENCODING = "opus"
+
+
+def downmix_blocks(reader, block_frames: int = BLOCK_FRAMES) -> Iterator[np.ndarray]:
+    """Stream a reader as mono float32 blocks, averaging its channels."""
+    for block in reader.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+        if len(block):
+            yield block.mean(axis=1, dtype=np.float32)
+
+
+def resample_blocks(
+    blocks: Iterable[np.ndarray], sample_rate: int, target_rate: int
+) -> np.ndarray:
+    """Resample a stream of mono blocks to `target_rate`.
+
+    Each block is smoothed with a moving average as wide as the rate ratio
+    (an anti-aliasing low-pass that is good enough for previews) and then
+    linearly interpolated at the output sample times. The few samples the
+    next block's window still needs are carried over, so memory stays bounded
+    by the block size and the output matches resampling the whole signal.
+    """
+    ratio = sample_rate / target_rate
+    width = max(1, round(ratio))
+    out = []
+    carry = np.zeros(0, dtype=np.float32)
+    # Input frame at carry[0], and the index of the next output sample.
+    offset = 0
+    produced = 0
+    for block in blocks:
+        data = np.concatenate([carry, block]) if len(carry) else block
+        if len(data) < width:
+            carry = data
+            continue
+        cumulative = np.concatenate([[0.0], np.cumsum(data, dtype=np.float64)])
+        smoothed = (cumulative[width:] - cumulative[:-width]) / width
+        stop = math.floor((offset + len(smoothed) - 1) / ratio) + 1
+        positions = np.arange(produced, stop) * ratio - offset
+        out.append(
+            np.interp(positions, np.arange(len(smoothed)), smoothed).astype(np.float32)
+        )
+        produced = stop
+        keep = min(math.floor(produced * ratio) - offset, len(data))
+        carry = data[keep:]
+        offset += keep
+    if not out:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(out)
+
+
+def audio_to_proxy(
+    audio_data: PeaksSource,
+    sample_rate: Optional[int] = None,
+    cache_key: Optional[Hashable] = None,
+    proxy_rate: int = PROXY_SAMPLE_RATE,
+    encoding: str = PROXY_ENCODING,
+) -> bytes:
+    """Return a low-bitrate mono preview of `audio_data` as an encoded file.
+
+    The source is read block by block, downmixed, resampled to `proxy_rate`
+    and encoded; the result is cached like other encodings.
+
+    Parameters:
+    ----------
+    audio_data : PeaksSource
+        File path or http(s) URL, raw encoded bytes/BytesIO, or a numpy array
+        of samples.
+    sample_rate : Optional[int]
+        Sample rate of a numpy array input. Ignored for encoded audio.
+    cache_key : Optional[Hashable]
+        Explicit identity of the audio, see `audio_cache_key`.
+    proxy_rate : int
+        Sample rate of the preview. Opus supports 8, 12, 16, 24 and 48 kHz.
+    encoding : str
+        Encoding of the preview, see `encode_array`.
+
+    Returns:
+    -------
+    bytes
+        The encoded preview.
+    """
+    key = proxy_cache_key(audio_data, cache_key, proxy_rate, encoding)
+    return audio_cache.get_or_compute(
+        key, lambda: _audio_to_proxy(audio_data, sample_rate, proxy_rate, encoding)
+    )
+
+
+def proxy_cache_key(
+    audio_data: PeaksSource,
+    cache_key: Optional[Hashable] = None,
+    proxy_rate: int = PROXY_SAMPLE_RATE,
+    encoding: str = PROXY_ENCODING,
+) -> Hashable:
+    """Identity of the preview of `audio_data`, to pass as the `cache_key` of
+    its encoded bytes."""
+    return ("proxy", audio_cache_key(audio_data, cache_key), proxy_rate, encoding)
+
+
+def _audio_to_proxy(
+    audio_data: PeaksSource,
+    sample_rate: Optional[int],
+    proxy_rate: int,
+    encoding: str,
+) -> bytes:
+    from streamlit_wavesurfer.utils import encode_array
+
+    if isinstance(audio_data, str) and url_util.is_url(
+        audio_data, allowed_schemas=("http", "https")
+    ):
+        # Downloaded once into the on-disk cache, then read like a local file.
+        audio_data = str(fetch_url(audio_data).path)
+    with open_soundfile(audio_data, sample_rate) as reader:
+        rate = reader.samplerate
+        samples = resample_blocks(downmix_blocks(reader), rate, proxy_rate)
+    if isinstance(audio_data, np.ndarray) and np.issubdtype(audio_data.dtype, np.integer):
+        # Integer arrays are read as raw values; resampling is linear, so
+        # scaling the much shorter output instead is equivalent.
+        samples /= np.iinfo(audio_data.dtype).max
+    buffer, _ = encode_array(samples, proxy_rate, encoding)
+    return buffer.getvalue()
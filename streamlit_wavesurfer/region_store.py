@@ -0,0 +1,157 @@
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import streamlit as st
+
+from streamlit_wavesurfer.regions import REGION_COLUMNS, Region, RegionList
+
+# Session state key prefix of the per-component region stores.
+STORE_PREFIX = "_wavesurfer_regions_"
+
+RegionsInput = Optional[RegionList | List[Region] | List[dict]]
+
+
+def as_region_list(regions: Any) -> RegionList:
+    """Convert any accepted regions input (including pandas DataFrames and
+    pyarrow Tables) into a `RegionList`."""
+    if isinstance(regions, RegionList):
+        return regions
+    if regions is None:
+        return RegionList()
+    if hasattr(regions, "iloc"):
+        return RegionList.from_dataframe(regions)
+    if hasattr(regions, "schema") and hasattr(regions, "column_names"):
+        return RegionList.from_arrow(regions)
+    return RegionList(regions)
+
+
+def _unique(regions: RegionList) -> RegionList:
+    """Drop rows whose id repeats an earlier one."""
+    ids = regions.ids.tolist()
+    if len(set(ids)) == len(ids):
+        return regions
+    # Built backwards, so the first row of each id is written last and kept.
+    first = dict(zip(reversed(ids), range(len(ids) - 1, -1, -1)))
+    keep = np.zeros(len(ids), dtype=bool)
+    keep[list(first.values())] = True
+    return regions.take(keep)
+
+
+def _positions(previous_ids: np.ndarray, current_ids: np.ndarray) -> np.ndarray:
+    """Row of each current id among the previous ids, -1 when it is new; ids
+    are unique on both sides."""
+    rows = dict(zip(previous_ids.tolist(), range(len(previous_ids))))
+    return np.fromiter(
+        (rows.get(id_, -1) for id_ in current_ids.tolist()),
+        dtype=np.int64,
+        count=len(current_ids),
+    )
+
+
+@dataclass
+class RegionStore:
+    """The regions last sent to one component instance.
+
+    Every change bumps `version`. `update` returns either a full snapshot
+    `{"version", "regions"}` or, when the component already holds the previous
+    version, a patch `{"version", "baseVersion", "added", "changed", "removed"}`
+    that the frontend applies in place. Regions travel column-wise.
+    """
+
+    version: int = 0
+    regions: RegionList = field(default_factory=RegionList)
+    payload: Optional[Dict[str, Any]] = None
+    # The list (and its revision) the payload was computed from.
+    _source: Optional[weakref.ref] = None
+    _source_revision: int = -1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"version": self.version, "regions": self.regions.to_columns()}
+
+    def update(self, regions: RegionList, resync: bool = False) -> Dict[str, Any]:
+        """Record `regions` as the current state and return the payload to send.
+
+        Parameters:
+        ----------
+        regions : RegionList
+            The regions to display.
+        resync : bool
+            Send a full snapshot, e.g. because the component could not apply the
+            last patch.
+        """
+        unchanged = (
+            self._source is not None
+            and self._source() is regions
+            and self._source_revision == regions.revision
+        )
+        if unchanged and not resync:
+            return self.payload
+        self._source = weakref.ref(regions)
+        self._source_revision = regions.revision
+
+        current = _unique(regions)
+        previous = self.regions
+        current_ids, previous_ids = current.ids, previous.ids
+        if len(current) == len(previous) and np.array_equal(current_ids, previous_ids):
+            positions = np.arange(len(current))
+        else:
+            positions = _positions(previous_ids, current_ids)
+        present = positions >= 0
+        matched = positions[present]
+        changed = np.zeros(len(current), dtype=bool)
+        for name in REGION_COLUMNS:
+            if name != "id":
+                changed[present] |= (
+                    current.column(name)[present] != previous.column(name)[matched]
+                )
+        kept = np.zeros(len(previous), dtype=bool)
+        kept[matched] = True
+        added = ~present
+        modified = bool(added.any() or changed.any() or not kept.all())
+        if modified:
+            self.version += 1
+            self.regions = current.copy()
+
+        # When nearly everything changed a snapshot is no larger than a patch.
+        rewritten = modified and added.sum() + changed.sum() >= len(current)
+        if self.payload is None or resync or rewritten:
+            self.payload = self.snapshot()
+        elif modified:
+            self.payload = {
+                "version": self.version,
+                "baseVersion": self.version - 1,
+                "added": current.take(added).to_columns(),
+                "changed": current.take(changed).to_columns(),
+                "removed": previous_ids[~kept].tolist(),
+            }
+        return self.payload
+
+
+def sync_regions(key: Optional[str], regions: RegionsInput) -> Dict[str, Any]:
+    """Diff `regions` against what the keyed component last received and return
+    the payload to send it. Without a key there is nowhere to keep the previous
+    state, so an unversioned snapshot is sent every time."""
+    regions = as_region_list(regions)
+    if key is None:
+        return {"version": None, "regions": _unique(regions).to_columns()}
+    store_key = f"{STORE_PREFIX}{key}"
+    store = st.session_state.get(store_key)
+    if store is None:
+        store = st.session_state[store_key] = RegionStore()
+    # The component asks for a snapshot when it misses a patch, e.g. after it
+    # was remounted while the session kept its store.
+    value = st.session_state.get(key)
+    resync = (
+        isinstance(value, dict)
+        and value.get("regionsResync", False)
+        and value.get("regionsVersion") != store.version
+    )
+    return store.update(regions, resync=resync)
+
+
+def current_regions(key: Optional[str]) -> Optional[RegionList]:
+    """Regions the keyed component currently displays."""
+    store = st.session_state.get(f"{STORE_PREFIX}{key}") if key else None
+    return store.regions if store is not None else None
@@ -0,0 +1,505 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+# column -> dtype; regions are stored as one array per column.
+REGION_COLUMNS = {
+    "start": np.float64,
+    "end": np.float64,
+    "content": object,
+    "color": object,
+    "drag": np.bool_,
+    "resize": np.bool_,
+    "id": object,
+}
+REGION_DEFAULTS = {"content": "", "color": None, "drag": False, "resize": False}
+
+
+@dataclass
+class Region:
+    start: float
+    end: float
+    content: str = ""
+    color: Optional[str] = None
+    drag: bool = False
+    resize: bool = False
+    # Stable identity used to patch regions in place, derived when omitted.
+    id: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        region = {
+            "start": self.start,
+            "end": self.end,
+            "content": self.content,
+            "color": self.color,
+        }
+        if self.id is not None:
+            region["id"] = self.id
+        return region
+
+
+def region_id(start: float, end: float, content: Any) -> str:
+    """Derive a stable id from a region's start, end and content."""
+    identity = f"{start}:{end}:{content}".encode()
+    return f"region-{hashlib.blake2b(identity, digest_size=16).hexdigest()}"
+
+
+def _column_property(name: str):
+    def fget(self: "RegionView"):
+        value = self._regions._columns[name][self._index]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def fset(self: "RegionView", value):
+        self._regions._set(self._index, name, value)
+
+    return property(fget, fset)
+
+
+class RegionView:
+    """A row of a `RegionList`. Attributes read from and write through to the
+    list's columns, so views are cheap to create and stay in sync."""
+
+    __slots__ = ("_regions", "_index")
+
+    start = _column_property("start")
+    end = _column_property("end")
+    content = _column_property("content")
+    color = _column_property("color")
+    drag = _column_property("drag")
+    resize = _column_property("resize")
+    id = _column_property("id")
+
+    def __init__(self, regions: "RegionList", index: int):
+        self._regions = regions
+        self._index = index
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in REGION_COLUMNS}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in REGION_COLUMNS)
+        return f"RegionView({fields})"
+
+
+RegionLike = Union[Region, RegionView, Dict[str, Any]]
+
+
+def _row(region: RegionLike) -> Dict[str, Any]:
+    if isinstance(region, dict):
+        return region
+    return {name: getattr(region, name) for name in REGION_COLUMNS}
+
+
+# Leaves of subtrees at or below this level are scanned linearly.
+_SCAN_LEVEL = 3
+# Rebuild the index once this many rows (or 1/16 of the list) are pending.
+_MAX_PENDING = 1024
+
+
+class _IntervalIndex:
+    """An implicit interval tree over rows sorted by start, as in cgranges.
+
+    Sorted starts double as an in-order binary tree: node `i` at level `k` has
+    children `i -/+ 2**(k-1)`, and `max_ends[i]` holds the largest end in its
+    subtree, so overlap queries prune whole subtrees in O(log n + k). Rows
+    appended or moved after the build are kept in a small pending set that is
+    scanned with NumPy, and the rows they replace are tombstoned, until enough
+    accumulate to rebuild.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        self.size = len(starts)
+        self.order = np.lexsort((np.arange(self.size), starts))
+        self.starts = starts[self.order]
+        self.ends = ends[self.order]
+        self.max_ends, self.root_level = self._augment(self.ends)
+        # Position of the largest end among the first i + 1 sorted rows.
+        prefix_max = np.maximum.accumulate(self.ends) if self.size else self.ends
+        positions = np.arange(self.size)
+        self.prefix_argmax = np.maximum.accumulate(
+            np.where(self.ends == prefix_max, positions, 0)
+        )
+        self.stale = np.zeros(self.size, dtype=bool)
+        self.moved: set = set()
+
+    @staticmethod
+    def _augment(ends: np.ndarray):
+        n = len(ends)
+        max_ends = ends.copy()
+        if n == 0:
+            return max_ends, -1
+        # Rightmost node of the tree and its max, for right children past n.
+        last_i = (n - 1) & ~1
+        last = max_ends[last_i]
+        level = 1
+        while 1 << level <= n:
+            half = 1 << (level - 1)
+            nodes = np.arange((half << 1) - 1, n, half << 2)
+            right = nodes + half
+            right_max = np.where(right < n, max_ends[np.minimum(right, n - 1)], last)
+            max_ends[nodes] = np.maximum(
+                np.maximum(ends[nodes], max_ends[nodes - half]), right_max
+            )
+            if not (last_i >> level) & 1:
+                last_i -= half
+            if last_i < n and max_ends[last_i] > last:
+                last = max_ends[last_i]
+            level += 1
+        return max_ends, level - 1
+
+    def mark(self, row: int):
+        """Record that `row`'s start or end changed."""
+        if row < self.size:
+            self.stale[row] = True
+        self.moved.add(row)
+
+    def pending(self, size: int) -> np.ndarray:
+        """Rows not covered by the tree: appended or moved since the build."""
+        appended = np.arange(self.size, size)
+        if not self.moved:
+            return appended
+        moved = np.fromiter(self.moved, dtype=np.int64, count=len(self.moved))
+        return np.union1d(moved[moved < self.size], appended)
+
+    def needs_rebuild(self, size: int) -> bool:
+        return size - self.size + len(self.moved) > max(_MAX_PENDING, size // 16)
+
+    def query(self, low: float, high: float) -> np.ndarray:
+        """Rows of the tree with start <= high and end >= low."""
+        starts, ends, max_ends = self.starts, self.ends, self.max_ends
+        n = self.size
+        found = []
+        stack = [(self.root_level, (1 << self.root_level) - 1, False)] if n else []
+        while stack:
+            level, node, left_done = stack.pop()
+            if level <= _SCAN_LEVEL:
+                first = node >> level << level
+                last = min(first + (1 << (level + 1)) - 1, n)
+                for i in range(first, last):
+                    if starts[i] > high:
+                        break
+                    if ends[i] >= low:
+                        found.append(i)
+            elif not left_done:
+                child = node - (1 << (level - 1))
+                stack.append((level, node, True))
+                if child >= n or max_ends[child] >= low:
+                    stack.append((level - 1, child, False))
+            elif node < n and starts[node] <= high:
+                if ends[node] >= low:
+                    found.append(node)
+                stack.append((level - 1, node + (1 << (level - 1)), False))
+        rows = self.order[np.asarray(found, dtype=np.int64)]
+        return rows[~self.stale[rows]]
+
+
+class RegionList:
+    """Regions stored column-wise: starts and ends in float64 arrays, the other
+    fields in one array each.
+
+    A million regions take tens of MB instead of the hundreds a list of
+    `Region` objects needs, and serializing them is a handful of vectorized
+    `tolist()` calls. Iterating and indexing yield `RegionView` rows. Every
+    mutation bumps `revision`, which lets consumers skip unchanged lists.
+    """
+
+    def __init__(self, regions: Optional[Iterable[RegionLike]] = None):
+        self._size = 0
+        self._revision = 0
+        # Revision at which every id was last known to be set.
+        self._ids_revision = -1
+        # Built on the first time query.
+        self._interval_index: Optional[_IntervalIndex] = None
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=dtype) for name, dtype in REGION_COLUMNS.items()
+        }
+        if isinstance(regions, RegionList):
+            self._append_columns(regions.columns())
+        elif regions is not None:
+            self.extend(regions)
+
+    @classmethod
+    def from_columns(
+        cls,
+        start: Any,
+        end: Any,
+        content: Any = None,
+        color: Any = None,
+        drag: Any = None,
+        resize: Any = None,
+        id: Any = None,
+    ) -> "RegionList":
+        """Build a list from column arrays, missing columns take their defaults."""
+        regions = cls()
+        regions._append_columns(
+            {
+                "start": start,
+                "end": end,
+                "content": content,
+                "color": color,
+                "drag": drag,
+                "resize": resize,
+                "id": id,
+            }
+        )
+        return regions
+
+    @classmethod
+    def from_dataframe(cls, df) -> "RegionList":
+        """Build a list from a pandas DataFrame with `start` and `end` columns and
+        any of `content`, `color`, `drag`, `resize` and `id`."""
+        return cls.from_columns(
+            **{name: df[name].to_numpy() for name in REGION_COLUMNS if name in df}
+        )
+
+    @classmethod
+    def from_arrow(cls, table) -> "RegionList":
+        """Build a list from a pyarrow Table with the same columns as
+        `from_dataframe`."""
+        names = set(table.column_names)
+        return cls.from_columns(
+            **{
+                name: table.column(name).to_numpy()
+                for name in REGION_COLUMNS
+                if name in names
+            }
+        )
+
+    @property
+    def revision(self) -> int:
+        return self._revision
+
+    @property
+    def regions(self) -> List[RegionView]:
+        return list(self)
+
+    def column(self, name: str) -> np.ndarray:
+        """A read-only view of one column."""
+        view = self._columns[name][: self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self.column("start")
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self.column("end")
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Region ids, deriving (once) those that were not given."""
+        if self._ids_revision != self._revision:
+            ids = self._columns["id"][: self._size]
+            missing = np.flatnonzero(np.equal(ids, None))
+            if len(missing):
+                starts, ends = self._columns["start"], self._columns["end"]
+                contents = self._columns["content"]
+                ids[missing] = [
+                    region_id(starts[i], ends[i], contents[i]) for i in missing.tolist()
+                ]
+            self._ids_revision = self._revision
+        return self.column("id")
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Copies of every column, with ids resolved."""
+        self.ids
+        return {name: self.column(name).copy() for name in REGION_COLUMNS}
+
+    def take(self, indices: Any) -> "RegionList":
+        """A new list holding the rows at `indices` (an index array or mask)."""
+        self.ids
+        return RegionList.from_columns(
+            **{name: self.column(name)[indices] for name in REGION_COLUMNS}
+        )
+
+    def copy(self) -> "RegionList":
+        return RegionList(self)
+
+    def _reserve(self, capacity: int):
+        if capacity <= len(self._columns["start"]):
+            return
+        capacity = max(capacity, 2 * len(self._columns["start"]), 16)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            self._columns[name] = grown
+
+    def _append_columns(self, columns: Dict[str, Any]):
+        starts = np.asarray(columns["start"], dtype=np.float64).ravel()
+        count = len(starts)
+        self._reserve(self._size + count)
+        rows = slice(self._size, self._size + count)
+        for name, dtype in REGION_COLUMNS.items():
+            values = columns.get(name)
+            if values is None:
+                values = REGION_DEFAULTS.get(name)
+            elif dtype is object:
+                values = np.asarray(values, dtype=object).ravel()
+            self._columns[name][rows] = values
+        self._size += count
+        self._revision += 1
+
+    def _set(self, index: int, name: str, value: Any):
+        self._columns[name][index] = value
+        if name in ("start", "end") and self._interval_index is not None:
+            self._interval_index.mark(index)
+        self._revision += 1
+
+    def append(self, region: RegionLike):
+        self.extend([region])
+
+    def extend(self, regions: Iterable[RegionLike]):
+        rows = [_row(region) for region in regions]
+        self._append_columns(
+            {
+                name: [row.get(name, REGION_DEFAULTS.get(name)) for row in rows]
+                for name in REGION_COLUMNS
+            }
+        )
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("region index out of range")
+        return index
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[RegionView]:
+        for index in range(self._size):
+            yield RegionView(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(index)
+        return RegionView(self, self._index(index))
+
+    def __setitem__(self, index: int, region: RegionLike):
+        index = self._index(index)
+        row = _row(region)
+        for name in REGION_COLUMNS:
+            self._columns[name][index] = row.get(name, REGION_DEFAULTS.get(name))
+        if self._interval_index is not None:
+            self._interval_index.mark(index)
+        self._revision += 1
+
+    def __delitem__(self, index: int):
+        index = self._index(index)
+        for name, column in self._columns.items():
+            column[index : self._size - 1] = column[index + 1 : self._size]
+            if column.dtype == object:
+                column[self._size - 1] = None
+        self._size -= 1
+        # Rows after `index` shift down, the index is rebuilt on the next query.
+        self._interval_index = None
+        self._revision += 1
+
+    def __repr__(self) -> str:
+        return f"RegionList({len(self)} regions)"
+
+    def _intervals(self) -> _IntervalIndex:
+        index = self._interval_index
+        if index is None or index.needs_rebuild(self._size):
+            index = self._interval_index = _IntervalIndex(
+                self._columns["start"][: self._size].copy(),
+                self._columns["end"][: self._size].copy(),
+            )
+        return index
+
+    def _overlap_rows(self, low: float, high: float) -> np.ndarray:
+        """Rows with start <= high and end >= low, in no particular order."""
+        index = self._intervals()
+        rows = index.query(low, high)
+        pending = index.pending(self._size)
+        if len(pending):
+            starts = self._columns["start"][pending]
+            ends = self._columns["end"][pending]
+            rows = np.concatenate([rows, pending[(starts <= high) & (ends >= low)]])
+        return rows
+
+    def _views(self, rows: np.ndarray) -> List[RegionView]:
+        rows = rows[np.lexsort((rows, self._columns["start"][rows]))]
+        return [RegionView(self, row) for row in rows.tolist()]
+
+    def overlapping(self, start: float, end: float) -> List[RegionView]:
+        """Regions overlapping the window `[start, end)`, ordered by start.
+
+        Backed by an interval index built on first use and kept up to date as
+        regions are appended or edited, so queries take O(log n + k).
+
+        Parameters:
+        ----------
+        start : float
+            Window start in seconds.
+        end : float
+            Window end in seconds.
+
+        Returns:
+        -------
+        List[RegionView]
+            The overlapping regions.
+        """
+        rows = self._overlap_rows(start, end)
+        starts, ends = self._columns["start"][rows], self._columns["end"][rows]
+        return self._views(rows[(starts < end) & (ends > start)])
+
+    def at(self, time: float) -> List[RegionView]:
+        """Regions containing `time` (start <= time < end), ordered by start."""
+        rows = self._overlap_rows(time, time)
+        return self._views(rows[self._columns["end"][rows] > time])
+
+    def nearest(self, time: float) -> Optional[RegionView]:
+        """The region closest to `time`: one containing it if any, otherwise the
+        one with the smallest gap, preferring the earlier region on ties."""
+        if self._size == 0:
+            return None
+        index = self._intervals()
+        candidates = [index.pending(self._size)]
+        # Among regions starting at or before `time`, the one ending last.
+        last = np.searchsorted(index.starts, time, side="right") - 1
+        if last >= 0:
+            position = index.prefix_argmax[last]
+            if index.stale[index.order[position]]:
+                live = np.flatnonzero(~index.stale[index.order[: last + 1]])
+                position = live[np.argmax(index.ends[live])] if len(live) else -1
+            if position >= 0:
+                candidates.append(index.order[position : position + 1])
+        # The first region starting after `time`.
+        following = last + 1
+        while following < index.size and index.stale[index.order[following]]:
+            following += 1
+        if following < index.size:
+            candidates.append(index.order[following : following + 1])
+        rows = np.concatenate(candidates)
+        if len(rows) == 0:
+            return None
+        starts, ends = self._columns["start"][rows], self._columns["end"][rows]
+        distance = np.maximum(np.maximum(starts - time, time - ends), 0)
+        best = rows[np.lexsort((rows, starts, distance))[0]]
+        return RegionView(self, int(best))
+
+    def to_columns(self) -> Dict[str, list]:
+        """Every column as a plain list, ready for JSON serialization."""
+        self.ids
+        return {name: self.column(name).tolist() for name in REGION_COLUMNS}
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        columns = self.to_columns()
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.columns())
+
+    def to_arrow(self):
+        import pyarrow as pa
+
+        return pa.table(self.columns())
@@ -0,0 +1,282 @@
+import json
+import math
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from streamlit_wavesurfer.cache import (
+    audio_cache,
+    audio_cache_key,
+    get_cache_dir,
+    is_cacheable,
+)
+from streamlit_wavesurfer.fetch import fetch_url
+from streamlit_wavesurfer.media import file_url, hash_bytes
+from streamlit_wavesurfer.peaks import PeaksSource, open_soundfile
+
+# Defaults of the wavesurfer.js spectrogram plugin.
+DEFAULT_OPTIONS = {
+    "fftSamples": 512,
+    "windowFunc": "hann",
+    "alpha": None,
+    "scale": "mel",
+    "gainDB": 20,
+    "rangeDB": 80,
+    "splitChannels": False,
+    "noverlap": None,
+}
+# With no noverlap the plugin derives the overlap from the canvas width; without
+# a canvas, overlap windows until there are about this many columns.
+MAX_COLUMNS = 8000
+# Columns transformed per step, bounding memory for long recordings.
+COLUMNS_PER_CHUNK = 2048
+SPECTROGRAM_VERSION = 1
+
+
+def _window(name: str, size: int, alpha: Optional[float]) -> np.ndarray:
+    """Window functions, matching the plugin's FFT implementation."""
+    i = np.arange(size, dtype=np.float64)
+    n = size - 1
+    if name == "bartlett":
+        return 2 / n * (n / 2 - np.abs(i - n / 2))
+    if name == "bartlettHann":
+        return 0.62 - 0.48 * np.abs(i / n - 0.5) - 0.38 * np.cos(2 * np.pi * i / n)
+    if name == "blackman":
+        alpha = 0.16 if alpha is None else alpha
+        return (
+            (1 - alpha) / 2
+            - 0.5 * np.cos(2 * np.pi * i / n)
+            + alpha / 2 * np.cos(4 * np.pi * i / n)
+        )
+    if name == "cosine":
+        return np.cos(np.pi * i / n - np.pi / 2)
+    if name == "gauss":
+        alpha = 0.25 if alpha is None else alpha
+        return np.exp(-0.5 * ((i - n / 2) / (alpha * n / 2)) ** 2)
+    if name == "hamming":
+        return 0.54 - 0.46 * np.cos(2 * np.pi * i / n)
+    if name in ("hann", None):
+        return 0.5 * (1 - np.cos(2 * np.pi * i / n))
+    if name == "lanczoz":
+        return np.sinc(2 * i / n - 1)
+    if name == "rectangular":
+        return np.ones(size)
+    if name == "triangular":
+        return 2 / size * (size / 2 - np.abs(i - n / 2))
+    raise ValueError(f"Unknown window function: {name}")
+
+
+def _hz_to_bark(hz):
+    bark = 26.81 * hz / (1960 + hz) - 0.53
+    bark = np.where(bark < 2, bark + 0.15 * (2 - bark), bark)
+    return np.where(bark > 20.1, bark + 0.22 * (bark - 20.1), bark)
+
+
+def _bark_to_hz(bark):
+    bark = np.where(bark < 2, (bark - 0.3) / 0.85, bark)
+    bark = np.where(bark > 20.1, (bark + 4.422) / 1.22, bark)
+    return 1960 * ((bark + 0.53) / (26.28 - bark))
+
+
+_ERB_FACTOR = 1000 / (24.7 * 4.37)
+
+# scale -> (hz to scale, scale to hz)
+SCALES: Dict[str, Tuple[Callable, Callable]] = {
+    "mel": (
+        lambda hz: 2595 * np.log10(1 + hz / 700),
+        lambda mel: 700 * (10 ** (mel / 2595) - 1),
+    ),
+    "logarithmic": (lambda hz: np.log10(np.maximum(1, hz)), lambda log: 10**log),
+    "bark": (_hz_to_bark, _bark_to_hz),
+    "erb": (
+        lambda hz: _ERB_FACTOR * np.log10(1 + 0.00437 * hz),
+        lambda erb: (10 ** (erb / _ERB_FACTOR) - 1) / 0.00437,
+    ),
+}
+
+
+def filter_bank(scale: str, fft_samples: int, sample_rate: int) -> Optional[np.ndarray]:
+    """Return the (fft_samples / 2, filters) matrix mapping linear FFT bins onto
+    `scale`, or None for the linear scale.
+
+    As in the plugin, each filter linearly interpolates between the two FFT bins
+    around its centre frequency, and there are fft_samples / 2 filters.
+    """
+    if scale in (None, "linear"):
+        return None
+    hz_to_scale, scale_to_hz = SCALES[scale]
+    bins = fft_samples // 2
+    low, high = hz_to_scale(0.0), hz_to_scale(sample_rate / 2)
+    hz = scale_to_hz(low + np.arange(bins) / bins * (high - low))
+    resolution = sample_rate / fft_samples
+    j = np.floor(hz / resolution).astype(np.int64)
+    r = hz / resolution - j
+    bank = np.zeros((bins + 1, bins))
+    filters = np.arange(bins)
+    bank[j, filters] = 1 - r
+    bank[np.minimum(j + 1, bins), filters] = r
+    # The plugin only sums over the first fft_samples / 2 bins.
+    return bank[:bins]
+
+
+def _options_dict(options: Any) -> Dict[str, Any]:
+    if options is None:
+        return {}
+    if is_dataclass(options):
+        options = asdict(options)
+    return {key: value for key, value in dict(options).items() if value is not None}
+
+
+def _read_windows(
+    reader, first: int, count: int, hop: int, fft_samples: int
+) -> np.ndarray:
+    """Read `count` analysis windows from column `first` as a (count,
+    fft_samples, channels) array. Overlapping windows are viewed into one
+    contiguous block; windows further apart than their length are read one
+    by one, so the gaps between them are never loaded."""
+    if hop <= fft_samples:
+        reader.seek(first * hop)
+        block = reader.read(
+            (count - 1) * hop + fft_samples, dtype="float32", always_2d=True
+        )
+        return np.lib.stride_tricks.sliding_window_view(
+            block, fft_samples, axis=0
+        )[::hop][:count].transpose(0, 2, 1)
+    windows = np.empty((count, fft_samples, reader.channels), dtype=np.float32)
+    for index in range(count):
+        reader.seek((first + index) * hop)
+        windows[index] = reader.read(fft_samples, dtype="float32", always_2d=True)
+    return windows
+
+
+def compute_spectrogram(
+    audio_data: PeaksSource,
+    options: Any = None,
+    sample_rate: Optional[int] = None,
+) -> Tuple[np.ndarray, int]:
+    """Compute the plugin's Uint8 frequency data with a vectorised STFT.
+
+    Honors `fftSamples`, `noverlap`, `windowFunc`, `alpha`, `scale`, `gainDB`,
+    `rangeDB` and `splitChannels` the same way the spectrogram plugin does in
+    the browser. `frequencyMin`/`frequencyMax` are applied by the plugin when
+    drawing, so the full band is computed.
+
+    Parameters:
+    ----------
+    audio_data : PeaksSource
+        File path, raw encoded bytes/BytesIO, or a numpy array of samples.
+    options : SpectrogramPluginOptions | dict | None
+        Spectrogram plugin options.
+    sample_rate : Optional[int]
+        Sample rate of a numpy array input.
+
+    Returns:
+    -------
+    Tuple[np.ndarray, int]
+        (channels, columns, fftSamples / 2) uint8 data and the sample rate.
+    """
+    opts = {**DEFAULT_OPTIONS, **_options_dict(options)}
+    fft_samples = int(opts["fftSamples"])
+    if fft_samples & (fft_samples - 1):
+        raise ValueError(f"fftSamples must be a power of 2, got {fft_samples}")
+    bins = fft_samples // 2
+    gain_db, range_db = float(opts["gainDB"]), float(opts["rangeDB"])
+    window = _window(opts["windowFunc"], fft_samples, opts["alpha"])
+
+    with open_soundfile(audio_data, sample_rate) as reader:
+        rate = reader.samplerate
+        frames = reader.frames
+        channels = reader.channels if opts["splitChannels"] else 1
+        noverlap = opts["noverlap"]
+        if noverlap is None:
+            noverlap = max(0, fft_samples - math.ceil(frames / MAX_COLUMNS))
+        hop = fft_samples - int(noverlap)
+        if hop <= 0:
+            raise ValueError("noverlap must be smaller than fftSamples")
+        bank = filter_bank(opts["scale"], fft_samples, rate)
+        # Same framing as the plugin: only whole windows, starting at 0.
+        columns = max(0, (frames - fft_samples - 1) // hop + 1)
+        out = np.zeros((channels, columns, bins), dtype=np.uint8)
+        for first in range(0, columns, COLUMNS_PER_CHUNK):
+            count = min(COLUMNS_PER_CHUNK, columns - first)
+            windows = _read_windows(reader, first, count, hop, fft_samples)
+            for channel in range(channels):
+                segments = windows[:, :, channel]
+                spectrum = np.abs(np.fft.rfft(segments * window, axis=1))[:, :bins]
+                spectrum *= 2 / fft_samples
+                if bank is not None:
+                    spectrum = spectrum @ bank
+                db = 20 * np.log10(np.maximum(spectrum, 1e-12))
+                scaled = np.floor((db + gain_db) / range_db * 255 + 256)
+                scaled[db < -gain_db - range_db] = 0
+                scaled[db > -gain_db] = 255
+                out[channel, first : first + count] = np.clip(scaled, 0, 255)
+    return out, rate
+
+
+def spectrogram_data_url(
+    audio_data: PeaksSource,
+    options: Any = None,
+    sample_rate: Optional[int] = None,
+    cache_key: Optional[Hashable] = None,
+) -> Tuple[str, int]:
+    """Compute (or load from the on-disk cache) the spectrogram of `audio_data`
+    and return a URL (see `file_url`) for the plugin's `frequenciesDataUrl`, along
+    with the sample rate the frequencies were computed at."""
+    audio_key = audio_cache_key(audio_data, cache_key)
+    opts = {**DEFAULT_OPTIONS, **_options_dict(options)}
+    relevant = {key: opts.get(key) for key in DEFAULT_OPTIONS}
+    key = hash_bytes(
+        repr(
+            (audio_key, sorted(relevant.items()), sample_rate, SPECTROGRAM_VERSION)
+        ).encode()
+    )
+
+    def compute() -> Tuple[Path, int]:
+        path = get_cache_dir("spectrograms") / f"{key}.json"
+        meta_path = path.with_suffix(".rate")
+        if not (path.exists() and meta_path.exists()):
+            data, rate = compute_spectrogram(audio_data, options, sample_rate)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(data.tolist(), f, separators=(",", ":"))
+            tmp.replace(path)
+            meta_path.write_text(str(rate))
+        return path, int(meta_path.read_text())
+
+    path, rate = audio_cache.get_or_compute(("spectrogram", key), compute)
+    # Registered on every call so spectrograms still on screen stay served.
+    return file_url(path, "application/json", key), rate
+
+
+def spectrogram_plugin_options(
+    audio_data: Any,
+    options: Any = None,
+    sample_rate: Optional[int] = None,
+    cache_key: Optional[Hashable] = None,
+) -> Dict[str, Any]:
+    """Return spectrogram plugin options pointing `frequenciesDataUrl` at a
+    spectrogram computed in Python, so the browser skips its own FFT.
+
+    Options that already set `frequenciesDataUrl`, sources that cannot be read
+    here (data URIs) and sources without a stable identity to cache the result
+    under are returned unchanged.
+    """
+    opts = _options_dict(options)
+    if opts.get("frequenciesDataUrl"):
+        return opts
+    if isinstance(audio_data, str) and audio_data.startswith("data:"):
+        return opts
+    if not is_cacheable(audio_cache_key(audio_data, cache_key)):
+        return opts
+    if isinstance(audio_data, str) and audio_data.startswith(("http://", "https://")):
+        audio_data = fetch_url(audio_data).path
+    url, rate = spectrogram_data_url(audio_data, opts, sample_rate, cache_key)
+    return {
+        "frequencyMin": 0,
+        "frequencyMax": rate // 2,
+        **opts,
+        "frequenciesDataUrl": url,
+    }
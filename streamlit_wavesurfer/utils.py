@@ -1,18 +1,51 @@
 import base64
 import io
+import warnings
 from dataclasses import dataclass
 from mimetypes import guess_type
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Literal, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import numpy as np
-import requests
-import soundfile as sf
 import streamlit as st
 from dataclasses_json import dataclass_json
 from streamlit import url_util
 
+from streamlit_wavesurfer.cache import audio_cache, audio_cache_key, image_cache
+from streamlit_wavesurfer.fetch import fetch_url
+from streamlit_wavesurfer.media import (
+    MEDIA_SERVER_ENV,
+    MediaEntry,
+    bytes_entry,
+    get_media_server,
+    hash_bytes,
+    media_server_enabled,
+)
+from streamlit_wavesurfer.regions import Region, RegionList  # noqa: F401
+
 AudioData = str | bytes | io.BytesIO | np.ndarray | io.FileIO
+AudioEncoding = Literal["pcm16", "float32", "flac", "ogg", "opus"]
+# encoding -> (soundfile format, soundfile subtype, mime type)
+AUDIO_ENCODINGS = {
+    "pcm16": ("WAV", "PCM_16", "audio/wav"),
+    "float32": ("WAV", "FLOAT", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+    "ogg": ("OGG", "VORBIS", "audio/ogg"),
+    "opus": ("OGG", "OPUS", "audio/ogg"),
+}
+# Sample rate assumed for numpy arrays when none is given.
+DEFAULT_SAMPLE_RATE = 16000
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
 ImageData = str | Path | bytes | io.BytesIO
 PLUGIN_NAMES = [
     "regions",
@@ -460,6 +493,36 @@ def get_image_mime_type(image_data: ImageData) -> str:
         st.error(f"Unsupported image data type: {type(image_data)}")
 
 
+# Leading bytes of the containers `encode_array` and common sources produce.
+AUDIO_SIGNATURES = {
+    b"RIFF": "audio/wav",
+    b"OggS": "audio/ogg",
+    b"fLaC": "audio/flac",
+    b"ID3": "audio/mpeg",
+    b"\x1aE\xdf\xa3": "audio/webm",
+}
+
+
+def sniff_mime_type(data: Union[bytes, bytearray, memoryview]) -> str:
+    """Mime type of an encoded audio buffer from its signature, WAV if unknown."""
+    head = bytes(data[:4])
+    for signature, mime_type in AUDIO_SIGNATURES.items():
+        if head.startswith(signature):
+            return mime_type
+    return "audio/wav"
+
+
+def is_local_file(audio_data: str) -> bool:
+    """Whether a string source names an existing file. Data URIs are often
+    longer than a path may be, which makes the check itself fail."""
+    if audio_data.startswith("data:"):
+        return False
+    try:
+        return Path(audio_data).exists()
+    except (OSError, ValueError):
+        return False
+
+
 def get_mime_type(audio_data: AudioData) -> str:
     mime_types = {
         "wav": "audio/wav",
@@ -475,15 +538,101 @@ def get_mime_type(audio_data: AudioData) -> str:
     elif isinstance(audio_data, np.ndarray):
         return "audio/wav"
     elif isinstance(audio_data, (bytes, bytearray)):
-        return "audio/wav"
+        return sniff_mime_type(audio_data)
     elif isinstance(audio_data, io.BytesIO):
-        return "audio/wav"
+        return sniff_mime_type(audio_data.getbuffer())
 
 
-@st.cache_data
-def audio_to_base64(audio_data: Optional[AudioData]) -> Optional[str]:
+def as_frames(array: np.ndarray) -> np.ndarray:
+    """Return `array` in the (frames, channels) layout soundfile expects.
+
+    Channel-first arrays, as produced by librosa or torchaudio, are transposed.
+    The result is C-contiguous so soundfile writes it without another copy;
+    only channel-first or strided inputs are copied, once.
+    """
+    if array.ndim == 2 and array.shape[0] < array.shape[1]:
+        array = array.T
+    if array.dtype not in (np.float32, np.float64, np.int16, np.int32):
+        array = array.astype(np.float32)
+    return np.ascontiguousarray(array)
+
+
+def encode_array(
+    array: np.ndarray,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+) -> Tuple[io.BytesIO, str]:
+    """Encode a numpy array of samples into an in-memory audio file.
+
+    Parameters:
+    ----------
+    array : np.ndarray
+        Samples, shaped (frames,), (frames, channels) or (channels, frames).
+    sample_rate : Optional[int]
+        Sample rate of the array, defaults to 16000.
+    encoding : AudioEncoding
+        "pcm16" or "float32" WAV, "flac", or Ogg "ogg" (Vorbis) / "opus".
+        Compressed encodings ship 3-10x smaller than float WAV. 16-bit
+        encodings ("pcm16", "flac") cannot hold float samples outside [-1, 1],
+        so such arrays are scaled down to fit, with a warning; "float32"
+        keeps them as they are.
+
+    Returns:
+    -------
+    Tuple[io.BytesIO, str]
+        The encoded audio and its mime type.
+
+    Raises:
+    ------
+    ValueError
+        If the encoding is unknown or the sample rate is not supported by Opus.
+    """
+    if encoding not in AUDIO_ENCODINGS:
+        raise ValueError(
+            f"Unknown encoding: {encoding}. Valid encodings are: "
+            f"{', '.join(AUDIO_ENCODINGS)}"
+        )
+    sample_rate = sample_rate or DEFAULT_SAMPLE_RATE
+    if encoding == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+        raise ValueError(
+            f"Opus does not support a sample rate of {sample_rate} Hz. "
+            f"Supported rates are: {', '.join(map(str, OPUS_SAMPLE_RATES))}"
+        )
+    import soundfile as sf
+
+    file_format, subtype, mime_type = AUDIO_ENCODINGS[encoding]
+    frames = as_frames(array)
+    if subtype == "PCM_16" and np.issubdtype(frames.dtype, np.floating) and frames.size:
+        peak = float(max(frames.max(), -frames.min()))
+        if peak > 1.0:
+            warnings.warn(
+                f"Samples reach {peak:.3g}, outside [-1, 1]; they are scaled "
+                f"down to fit {encoding}. Pass encoding='float32' to keep them.",
+                stacklevel=2,
+            )
+            frames = frames / peak
+    buffer = io.BytesIO()
+    sf.write(
+        buffer,
+        frames,
+        samplerate=sample_rate,
+        format=file_format,
+        subtype=subtype,
+    )
+    return buffer, mime_type
+
+
+def audio_to_base64(
+    audio_data: Optional[AudioData],
+    cache_key: Optional[Hashable] = None,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+) -> Optional[str]:
     """Convert different types of audio data to base64 string.
 
+    Results are cached under a cheap key (see `audio_cache_key`) instead of a
+    hash of the full audio, so a cache hit costs the same for any audio size.
+
     Parameters:
     ----------
     audio_data : Optional[MediaData]
@@ -493,6 +642,13 @@ def audio_to_base64(audio_data: Optional[AudioData]) -> Optional[str]:
         - Raw audio data (bytes, BytesIO)
         - Numpy array (numpy.ndarray)
         - File object
+    cache_key : Optional[Hashable]
+        Explicit identity of the audio, e.g. a dataset row id. Recommended for
+        arrays and buffers that may be modified in place.
+    sample_rate : Optional[int]
+        Sample rate of a numpy array input, defaults to 16000.
+    encoding : AudioEncoding
+        How a numpy array input is encoded, see `encode_array`.
 
     Returns:
     -------
@@ -506,38 +662,58 @@ def audio_to_base64(audio_data: Optional[AudioData]) -> Optional[str]:
     """
     if audio_data is None:
         raise ValueError("Audio data cannot be None")
+    key = ("base64", audio_cache_key(audio_data, cache_key), sample_rate, encoding)
+    return audio_cache.get_or_compute(
+        key, lambda: _audio_to_base64(audio_data, sample_rate, encoding)
+    )
+
+
+def audio_content_hash(
+    audio_data: AudioData,
+    payload: Union[str, bytes],
+    cache_key: Optional[Hashable] = None,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+) -> str:
+    """Content hash of the data URI `audio_to_base64` or the bytes
+    `audio_to_bytes` returned for `audio_data`.
+
+    The browser caches audio and its peaks under this hash. It is computed once
+    per encoding and then cached under the same cheap key as the payload.
+    """
+    text = isinstance(payload, str)
+    key = ("hash", text, audio_cache_key(audio_data, cache_key), sample_rate, encoding)
+    return audio_cache.get_or_compute(
+        key, lambda: hash_bytes(payload.encode() if text else payload)
+    )
+
+
+def _audio_to_base64(
+    audio_data: AudioData, sample_rate: Optional[int], encoding: AudioEncoding
+) -> Optional[str]:
     if isinstance(audio_data, (str, Path)):
         # If it's a file path.
         audio_data = str(audio_data)
-        if Path(audio_data).exists():
+        if is_local_file(audio_data):
             with open(audio_data, "rb") as f:
                 audio_bytes = f.read()
             audio_base64 = base64.b64encode(audio_bytes).decode()
             mime_type = get_mime_type(audio_data)
             return f"data:{mime_type};base64,{audio_base64}"
-        elif url_util.is_url(audio_data, allowed_schemas=("http", "https", "data")):
-            # Try to download the audio from the URL.
-            audio_url = audio_data
-            response = requests.get(audio_url)
-
-            # Check if the response is a valid audio file.
-            if response.status_code != 200:
-                raise requests.HTTPError(
-                    f"Failed to download audio from URL: {audio_data}"
-                )
+        elif url_util.is_url(audio_data, allowed_schemas=("http", "https")):
+            # Download (or revalidate) the audio through the on-disk cache.
+            download = fetch_url(audio_data)
             mime_type = get_mime_type(audio_data)
-            audio_bytes = response.content
-            audio_base64 = base64.b64encode(audio_bytes).decode()
+            if download.content_type and download.content_type.startswith("audio/"):
+                mime_type = download.content_type.split(";", 1)[0]
+            audio_base64 = base64.b64encode(download.read_bytes()).decode()
             return f"data:{mime_type};base64,{audio_base64}"
         # If the audio already is a base64 string, return it as is.
         return audio_data
     elif isinstance(audio_data, np.ndarray):
-        # If it's a numpy array, convert it to WAV format.
-        buffer = io.BytesIO()
-        sf.write(buffer, audio_data, samplerate=16000, format="WAV")
-        buffer.seek(0)
-        audio_base64 = base64.b64encode(buffer.read()).decode()
-        mime_type = get_mime_type(audio_data)
+        # If it's a numpy array, encode it as an audio file.
+        buffer, mime_type = encode_array(audio_data, sample_rate, encoding)
+        audio_base64 = base64.b64encode(buffer.getbuffer()).decode()
         return f"data:{mime_type};base64,{audio_base64}"
     elif isinstance(audio_data, (bytes, bytearray)):
         # If it's a bytes or bytearray object.
@@ -560,10 +736,201 @@ def audio_to_base64(audio_data: Optional[AudioData]) -> Optional[str]:
         return None
 
 
-@st.cache_data
+def audio_to_bytes(
+    audio_data: Optional[AudioData],
+    cache_key: Optional[Hashable] = None,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+) -> Optional[bytes]:
+    """Return the encoded audio file for `audio_data` as raw bytes.
+
+    Streamlit sends bytes arguments to the component as binary rather than
+    inside the JSON arguments, so unlike `audio_to_base64` nothing is inflated
+    or copied into a string. Bytes inputs are passed through without a copy.
+
+    Parameters:
+    ----------
+    audio_data : Optional[AudioData]
+        Audio data, accepts the same inputs as `audio_to_base64`. Remote URLs
+        are downloaded and data URIs decoded.
+    cache_key : Optional[Hashable]
+        Explicit identity of the audio, see `audio_to_base64`.
+    sample_rate : Optional[int]
+        Sample rate of a numpy array input, defaults to 16000.
+    encoding : AudioEncoding
+        How a numpy array input is encoded, see `encode_array`.
+
+    Returns:
+    -------
+    Optional[bytes]
+        The encoded audio or None if the type is unsupported.
+
+    Raises:
+    ------
+    ValueError
+        If audio data is None.
+    """
+    if audio_data is None:
+        raise ValueError("Audio data cannot be None")
+    key = ("bytes", audio_cache_key(audio_data, cache_key), sample_rate, encoding)
+    return audio_cache.get_or_compute(
+        key, lambda: _audio_to_bytes(audio_data, sample_rate, encoding)
+    )
+
+
+def _audio_to_bytes(
+    audio_data: AudioData, sample_rate: Optional[int], encoding: AudioEncoding
+) -> Optional[bytes]:
+    if isinstance(audio_data, (str, Path)):
+        audio_data = str(audio_data)
+        if is_local_file(audio_data):
+            with open(audio_data, "rb") as f:
+                return f.read()
+        elif url_util.is_url(audio_data, allowed_schemas=("http", "https")):
+            return fetch_url(audio_data).read_bytes()
+        elif audio_data.startswith("data:") and ";base64," in audio_data:
+            return base64.b64decode(audio_data.split(";base64,", 1)[1])
+        st.error(f"Audio file not found: {audio_data}")
+        return None
+    elif isinstance(audio_data, np.ndarray):
+        buffer, _ = encode_array(audio_data, sample_rate, encoding)
+        # The buffer is dropped right away, so this does not copy it.
+        return buffer.getvalue()
+    elif isinstance(audio_data, bytes):
+        return audio_data
+    elif isinstance(audio_data, bytearray):
+        return bytes(audio_data)
+    elif isinstance(audio_data, io.BytesIO):
+        return audio_data.getvalue()
+    elif isinstance(audio_data, (io.RawIOBase, io.BufferedReader)):
+        return audio_data.read()
+    else:
+        st.error(f"Unsupported audio data type: {type(audio_data)}")
+        return None
+
+
+def audio_mime_type(audio_data: AudioData, encoding: AudioEncoding = "pcm16") -> str:
+    """Mime type of the file `audio_to_bytes` returns for `audio_data`."""
+    if isinstance(audio_data, np.ndarray):
+        return AUDIO_ENCODINGS[encoding][2]
+    if isinstance(audio_data, str) and audio_data.startswith("data:"):
+        return audio_data[5:].split(";", 1)[0] or "audio/wav"
+    return get_mime_type(audio_data) or "audio/wav"
+
+
+def audio_to_url(
+    audio_data: Optional[AudioData],
+    cache_key: Optional[Hashable] = None,
+    sample_rate: Optional[int] = None,
+    encoding: AudioEncoding = "pcm16",
+) -> Optional[str]:
+    """Register audio with the local media server and return a short URL.
+
+    Unlike `audio_to_base64`, the audio is not inlined into the component
+    arguments. The browser fetches it from the media server, which supports
+    Range requests and content-hash based HTTP caching. Callers check
+    `media_server_enabled()` first: the browser may not reach the server.
+
+    Parameters:
+    ----------
+    audio_data : Optional[AudioData]
+        Audio data, accepts the same inputs as `audio_to_base64`. Remote
+        (http, https and data) URLs are passed through unchanged.
+    cache_key : Optional[Hashable]
+        Explicit identity of the audio, see `audio_to_base64`.
+    sample_rate : Optional[int]
+        Sample rate of a numpy array input, defaults to 16000.
+    encoding : AudioEncoding
+        How a numpy array input is encoded, see `encode_array`.
+
+    Returns:
+    -------
+    Optional[str]
+        URL of the audio or None if the type is unsupported.
+
+    Raises:
+    ------
+    ValueError
+        If audio data is None.
+    """
+    if audio_data is None:
+        raise ValueError("Audio data cannot be None")
+    key = ("url", audio_cache_key(audio_data, cache_key), sample_rate, encoding)
+    source = audio_cache.get_or_compute(
+        key, lambda: _audio_to_media(audio_data, sample_rate, encoding)
+    )
+    if isinstance(source, MediaEntry):
+        # Registered on every call so audio still on screen stays served.
+        return get_media_server().register(source)
+    return source
+
+
+def _audio_to_media(
+    audio_data: AudioData, sample_rate: Optional[int], encoding: AudioEncoding
+) -> Union[MediaEntry, str, None]:
+    if isinstance(audio_data, (str, Path)):
+        audio_data = str(audio_data)
+        if is_local_file(audio_data):
+            return get_media_server().file_entry(audio_data, get_mime_type(audio_data))
+        return audio_data
+    elif isinstance(audio_data, np.ndarray):
+        buffer, mime_type = encode_array(audio_data, sample_rate, encoding)
+        return bytes_entry(buffer.getbuffer(), mime_type)
+    elif isinstance(audio_data, (bytes, bytearray)):
+        return bytes_entry(audio_data, get_mime_type(audio_data))
+    elif isinstance(audio_data, io.BytesIO):
+        return bytes_entry(audio_data.getbuffer(), get_mime_type(audio_data))
+    elif isinstance(audio_data, (io.RawIOBase, io.BufferedReader)):
+        mime_type = get_mime_type(str(getattr(audio_data, "name", "")))
+        return bytes_entry(audio_data.read(), mime_type)
+    else:
+        st.error(f"Unsupported audio data type: {type(audio_data)}")
+        return None
+
+
+def audio_to_segments(
+    audio_data: AudioData, segment_duration: float
+) -> Dict[str, Any]:
+    """Describe a local audio file for windowed playback.
+
+    The browser fetches `segment_duration`-second slices from the media server
+    around the playhead instead of loading the whole file; the slices are cut
+    with soundfile frame offsets. Only file paths are supported.
+
+    Raises:
+    ------
+    ValueError
+        If `audio_data` is not an existing file, `segment_duration` is not
+        positive or the media server is not enabled.
+    """
+    if not media_server_enabled():
+        raise ValueError(
+            f"Segmented loading needs the media server, set {MEDIA_SERVER_ENV}=1"
+        )
+    if not isinstance(audio_data, (str, Path)) or not Path(audio_data).is_file():
+        raise ValueError("Segmented loading needs the path of a local audio file")
+    if segment_duration <= 0:
+        raise ValueError("segment_duration must be positive")
+    path = Path(audio_data).absolute()
+    stat = path.stat()
+    content_hash = hash_bytes(f"{path}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return {
+        "url": get_media_server().register_segments(path, content_hash),
+        "segmentDuration": segment_duration,
+    }
+
+
 def image_to_base64(image_data: Optional[ImageData]) -> Optional[str]:
+    """Convert an image to a base64 data URI, cached like audio (see
+    `audio_to_base64`) in the byte-bounded `image_cache`."""
     if image_data is None:
         return None
+    return image_cache.get_or_compute(
+        ("image", audio_cache_key(image_data)), lambda: _image_to_base64(image_data)
+    )
+
+
+def _image_to_base64(image_data: ImageData) -> Optional[str]:
     if isinstance(image_data, (str, Path)):
         with open(image_data, "rb") as f:
             image_bytes = f.read()
@@ -584,44 +951,6 @@ def image_to_base64(image_data: Optional[ImageData]) -> Optional[str]:
         return None
 
 
-@dataclass
-class Region:
-    start: float
-    end: float
-    content: str = ""
-    color: Optional[str] = None
-    drag: bool = False
-    resize: bool = False
-
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            "start": self.start,
-            "end": self.end,
-            "content": self.content,
-            "color": self.color,
-        }
-
-
-@dataclass
-class RegionList:
-    regions: List[Region]
-
-    def to_dict(self):
-        return [region for region in self.regions]
-
-    def __next__(self):
-        return next(self.regions)
-
-    def __iter__(self):
-        return iter(self.regions)
-
-    def __len__(self):
-        return len(self.regions)
-
-    def __getitem__(self, index):
-        return self.regions[index]
-
-
 @dataclass
 class WaveSurferOptions:
     waveColor: str = "violet"
@@ -645,6 +974,8 @@ class WaveSurferOptions:
     regionOpacity: float = 0.2
     regionLightening: int = 50
     instantRegionHighlight: bool = False
+    # Only draw the regions near the visible part of the waveform.
+    virtualizeRegions: bool = False
 
     def to_dict(self) -> Dict[str, Any]:
         return self.__dict__
@@ -0,0 +1,88 @@
+"""Shared fixtures: short generated recordings and a stand-in for the
+component, whose arguments are captured instead of rendered."""
+
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import streamlit_wavesurfer
+from streamlit_wavesurfer.cache import CACHE_DIR_ENV, audio_cache
+from streamlit_wavesurfer.media import MEDIA_SERVER_ENV, MEDIA_URL_ENV
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds: float, channels: int = 1) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    samples = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    return samples if channels == 1 else np.stack([samples] * channels, axis=1)
+
+
+@pytest.fixture
+def mono_wav(tmp_path):
+    path = tmp_path / "mono.wav"
+    sf.write(path, tone(2), SAMPLE_RATE, subtype="PCM_16")
+    return str(path)
+
+
+@pytest.fixture
+def stereo_wav(tmp_path):
+    path = tmp_path / "stereo.wav"
+    sf.write(path, tone(2, channels=2), SAMPLE_RATE, subtype="PCM_16")
+    return str(path)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def wav_url(mono_wav, tmp_path, monkeypatch):
+    """`mono_wav` served over http, downloaded into a temporary cache."""
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    path = Path(mono_wav)
+    handler = functools.partial(QuietHandler, directory=str(path.parent))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/{path.name}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def component_args(monkeypatch):
+    """Arguments of the last component call."""
+    captured = {}
+
+    def component_func(**kwargs):
+        captured.clear()
+        captured.update(kwargs)
+        return kwargs.get("default")
+
+    monkeypatch.setattr(streamlit_wavesurfer, "_component_func", component_func)
+    return captured
+
+
+@pytest.fixture(autouse=True)
+def no_media_server(monkeypatch):
+    """Tests opt in to the media server like apps do."""
+    monkeypatch.delenv(MEDIA_SERVER_ENV, raising=False)
+    monkeypatch.delenv(MEDIA_URL_ENV, raising=False)
+
+
+@pytest.fixture
+def media_server(monkeypatch):
+    monkeypatch.setenv(MEDIA_SERVER_ENV, "1")
+
+
+@pytest.fixture(autouse=True)
+def cold_audio_cache():
+    audio_cache.clear()
+    yield
+    audio_cache.clear()
@@ -0,0 +1,71 @@
+import io
+
+from streamlit_wavesurfer.cache import (
+    FINGERPRINT_CHUNK,
+    FINGERPRINT_SAMPLES,
+    UNKEYED,
+    MemoryCache,
+    audio_cache_key,
+    fingerprint_buffer,
+    is_cacheable,
+)
+
+
+class Stream:
+    """A reader that cannot seek, like a pipe."""
+
+    def read(self, size=-1):
+        return b""
+
+
+class Reader(io.RawIOBase):
+    """A seekable reader without a path or a buffer to fingerprint directly."""
+
+    def __init__(self, data):
+        self._buffer = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        return self._buffer.readinto(target)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._buffer.seek(offset, whence)
+
+    def tell(self):
+        return self._buffer.tell()
+
+
+def test_readers_are_keyed_by_content():
+    reader = Reader(b"one")
+    assert audio_cache_key(reader) == audio_cache_key(Reader(b"one"))
+    assert audio_cache_key(reader) != audio_cache_key(Reader(b"two"))
+    assert reader.tell() == 0
+
+
+def test_large_readers_are_sampled():
+    data = bytes(range(256)) * 4096
+    reader = Reader(data)
+    reader.seek(10)
+    reads = []
+    readinto = reader.readinto
+    reader.readinto = lambda target: reads.append(len(target)) or readinto(target)
+    assert audio_cache_key(reader) == ("stream", fingerprint_buffer(data[10:]))
+    assert reader.tell() == 10
+    assert sum(reads) <= FINGERPRINT_SAMPLES * FINGERPRINT_CHUNK
+
+
+def test_streams_without_a_stable_key_are_not_cached():
+    key = ("bytes", audio_cache_key(Stream()), None)
+    assert not is_cacheable(key)
+    cache = MemoryCache()
+    calls = []
+    for _ in range(2):
+        cache.get_or_compute(key, lambda: calls.append(1))
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0
+    assert UNKEYED in key
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from streamlit_wavesurfer.utils import encode_array
+
+
+def decode(buffer):
+    buffer.seek(0)
+    return sf.read(buffer, dtype="float32")[0]
+
+
+def test_loud_floats_are_scaled_to_fit_pcm16():
+    samples = np.array([0.5, -2.0, 1.0, 0.0], dtype=np.float32)
+    with pytest.warns(UserWarning, match="scaled"):
+        buffer, _ = encode_array(samples, 16000, "pcm16")
+    np.testing.assert_allclose(decode(buffer), samples / 2, atol=1e-4)
+
+
+def test_float32_keeps_loud_floats():
+    samples = np.array([0.5, -2.0, 1.0, 0.0], dtype=np.float32)
+    buffer, _ = encode_array(samples, 16000, "float32")
+    np.testing.assert_array_equal(decode(buffer), samples)
+
+
+def test_floats_in_range_are_not_scaled(recwarn):
+    samples = np.array([0.5, -1.0, 0.25], dtype=np.float32)
+    buffer, _ = encode_array(samples, 16000, "pcm16")
+    assert not recwarn.list
+    np.testing.assert_allclose(decode(buffer), samples, atol=1e-4)
@@ -0,0 +1,32 @@
+import os
+from pathlib import Path
+
+from streamlit_wavesurfer.fetch import fetch_url, sweep_downloads
+
+
+def test_download_is_cached_with_its_metadata(wav_url, mono_wav):
+    download = fetch_url(wav_url)
+    assert download.path.read_bytes() == Path(mono_wav).read_bytes()
+    assert download.path.with_suffix(".json").exists()
+    assert not list(download.path.parent.glob("*.part"))
+
+
+def test_unreadable_metadata_is_downloaded_again(wav_url):
+    download = fetch_url(wav_url)
+    download.path.with_suffix(".json").write_text("{")
+    assert fetch_url(wav_url).downloaded
+
+
+def test_sweep_removes_least_recently_used_downloads(tmp_path):
+    for age, name in enumerate(["new", "old", "oldest"]):
+        body = tmp_path / name
+        body.write_bytes(b"x" * 10)
+        body.with_suffix(".json").write_text("{}")
+        os.utime(body, (1000 - age, 1000 - age))
+    sweep_downloads(tmp_path, max_bytes=20, keep=tmp_path / "oldest")
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "new",
+        "new.json",
+        "oldest",
+        "oldest.json",
+    ]
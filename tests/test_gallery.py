@@ -0,0 +1,24 @@
+import pytest
+
+from streamlit_wavesurfer import Clip, wavesurfer_gallery
+
+
+def test_gallery_needs_the_media_server(component_args, mono_wav):
+    with pytest.raises(ValueError, match="media server"):
+        wavesurfer_gallery([mono_wav])
+    assert not component_args
+
+
+def test_gallery_passes_urls_through(component_args):
+    url = "https://example.com/clip.wav"
+    wavesurfer_gallery([url])
+    assert component_args["gallery"][0]["audioSrc"] == url
+
+
+def test_gallery_serves_clips_by_url(component_args, mono_wav, media_server):
+    state = wavesurfer_gallery([Clip(mono_wav, id="a")])
+    clip = component_args["gallery"][0]
+    assert clip["audioSrc"].startswith("http")
+    assert clip["peaks"]
+    assert state["selected"] is None
+    assert list(state["regions"]) == ["a"]
@@ -0,0 +1,37 @@
+import urllib.request
+
+import pytest
+
+from streamlit_wavesurfer.media import MediaServer, bytes_entry
+
+
+@pytest.fixture
+def server():
+    server = MediaServer(max_bytes=100, max_entries=3).start()
+    yield server
+    server.stop()
+
+
+def fetch(url):
+    with urllib.request.urlopen(url) as response:
+        return response.read()
+
+
+def test_least_recently_served_buffers_are_dropped(server):
+    first = server.register_bytes(b"a" * 60, "audio/wav")
+    second = server.register_bytes(b"b" * 60, "audio/wav")
+    assert server.bytes == 60
+    assert fetch(second) == b"b" * 60
+    with pytest.raises(urllib.error.HTTPError):
+        fetch(first)
+
+
+def test_registering_again_keeps_an_entry(server):
+    kept = bytes_entry(b"kept", "audio/wav")
+    url = server.register(kept)
+    for data in (b"one", b"two"):
+        server.register_bytes(data, "audio/wav")
+        server.register(kept)
+    server.register_bytes(b"three", "audio/wav")
+    assert len(server._entries) == 3
+    assert fetch(url) == b"kept"
@@ -0,0 +1,63 @@
+import base64
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from streamlit_wavesurfer import wavesurfer
+
+
+def zoom_options(component_args):
+    plugins = component_args["plugin_configurations"]["plugins"]
+    return next(plugin["options"] for plugin in plugins if plugin["name"] == "zoom")
+
+
+def test_pyramid_sets_the_zoom_limit(component_args, mono_wav, media_server):
+    wavesurfer(mono_wav, peaks="pyramid", plugins=["regions", "zoom"])
+    assert component_args["peak_pyramid"]
+    assert zoom_options(component_args)["maxZoom"] > 0
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["https://example.com/audio.wav", "data:audio/wav;base64,AAAA", b"RIFF", np.zeros(16)],
+)
+def test_pyramid_needs_a_local_file(component_args, media_server, source):
+    with pytest.raises(ValueError, match="local audio file"):
+        wavesurfer(source, peaks="pyramid")
+
+
+def test_pyramid_needs_the_media_server(component_args, mono_wav):
+    with pytest.raises(ValueError, match="media server"):
+        wavesurfer(mono_wav, peaks="pyramid")
+
+
+def test_pyramid_levels_are_served_by_the_media_server(
+    component_args, mono_wav, media_server
+):
+    wavesurfer(mono_wav, peaks="pyramid")
+    levels = component_args["peak_pyramid"]["levels"]
+    assert all(level["url"].startswith("http") for level in levels)
+
+
+def test_segment_mode_needs_the_media_server(component_args, mono_wav):
+    with pytest.raises(ValueError):
+        wavesurfer(mono_wav, segment_duration=1)
+
+
+def test_segment_mode_with_plugins(component_args, mono_wav, media_server):
+    wavesurfer(mono_wav, segment_duration=1, plugins=["regions", "zoom", "timeline"])
+    assert component_args["audio_segments"]["segmentDuration"] == 1
+    assert component_args["peak_pyramid"]
+    assert zoom_options(component_args)["maxZoom"] > 0
+
+
+def test_peaks_of_a_url(component_args, wav_url):
+    wavesurfer(wav_url, transport="base64", peaks=True)
+    assert component_args["peaks"]["duration"] == pytest.approx(2)
+
+
+def test_peaks_of_a_data_uri(component_args, mono_wav):
+    data = base64.b64encode(Path(mono_wav).read_bytes()).decode()
+    wavesurfer(f"data:audio/wav;base64,{data}", transport="base64", peaks=True)
+    assert component_args["peaks"]["duration"] == pytest.approx(2)
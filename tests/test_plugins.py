@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from streamlit_wavesurfer import wavesurfer
+from streamlit_wavesurfer.spectrogram import _read_windows
+
+
+def plugin_options(component_args, name):
+    plugins = component_args["plugin_configurations"]["plugins"]
+    return next(plugin["options"] for plugin in plugins if plugin["name"] == name)
+
+
+def test_spectrogram_is_computed_for_a_mono_file(component_args, mono_wav):
+    wavesurfer(mono_wav, plugins=["regions", "spectrogram"])
+    options = plugin_options(component_args, "spectrogram")
+    assert options["frequenciesDataUrl"]
+    assert options["frequencyMax"] == 8000
+
+
+def test_spectrogram_is_computed_for_a_stereo_file(component_args, stereo_wav):
+    wavesurfer(stereo_wav, plugins=["spectrogram"])
+    assert plugin_options(component_args, "spectrogram")["frequenciesDataUrl"]
+
+
+@pytest.mark.parametrize("hop", [128, 512, 1500])
+def test_spectrogram_windows_match_the_samples(stereo_wav, hop):
+    samples, _ = sf.read(stereo_wav, dtype="float32", always_2d=True)
+    with sf.SoundFile(stereo_wav) as reader:
+        windows = _read_windows(reader, 3, 5, hop, 512)
+    expected = np.stack([samples[(3 + i) * hop : (3 + i) * hop + 512] for i in range(5)])
+    np.testing.assert_array_equal(windows, expected)
@@ -0,0 +1,39 @@
+import importlib
+import logging
+import threading
+
+import pytest
+
+from streamlit_wavesurfer.prefetch import Prefetcher
+
+prefetch_module = importlib.import_module("streamlit_wavesurfer.prefetch")
+
+
+@pytest.fixture
+def blocked(monkeypatch):
+    """Make `prepare` wait until the event is set, so clips stay queued."""
+    release = threading.Event()
+    monkeypatch.setattr(prefetch_module, "prepare", lambda *args, **kwargs: release.wait())
+    yield release
+    release.set()
+
+
+def test_replace_only_cancels_the_callers_clips(blocked):
+    prefetcher = Prefetcher(max_workers=1)
+    prefetcher.submit(["running"], session="a")
+    theirs = prefetcher.submit(["a1", "a2"], session="a")
+    prefetcher.submit(["b1"], session="b")
+    assert not any(future.cancelled() for future in theirs)
+    prefetcher.submit(["a3"], session="a", replace=True)
+    assert all(future.cancelled() for future in theirs)
+    prefetcher.shutdown()
+
+
+def test_pending_limit_is_per_session(blocked, caplog):
+    caplog.set_level(logging.INFO)
+    prefetcher = Prefetcher(max_workers=1, max_pending=2)
+    prefetcher.submit(["running"], session="a")
+    assert len(prefetcher.submit(["a1", "a2", "a3"], session="a", replace=False)) == 2
+    assert "Skipping 1 of 3" in caplog.text
+    assert len(prefetcher.submit(["b1", "b2"], session="b")) == 2
+    prefetcher.shutdown()
@@ -0,0 +1,22 @@
+from streamlit_wavesurfer.region_store import RegionStore, _unique
+from streamlit_wavesurfer.regions import RegionList
+
+
+def regions(*rows):
+    return RegionList([{"id": id_, "start": start, "end": start + 1} for id_, start in rows])
+
+
+def test_repeated_ids_keep_the_first_row():
+    unique = _unique(regions(("a", 0), ("b", 1), ("a", 2)))
+    assert unique.ids.tolist() == ["a", "b"]
+    assert unique.column("start").tolist() == [0, 1]
+
+
+def test_update_sends_a_patch():
+    store = RegionStore()
+    store.update(regions(("a", 0), ("b", 1), ("c", 2), ("d", 3)))
+    patch = store.update(regions(("d", 3), ("b", 5), ("a", 0), ("e", 4)))
+    assert patch["baseVersion"] == 1
+    assert patch["added"]["id"] == ["e"]
+    assert patch["changed"]["id"] == ["b"]
+    assert patch["removed"] == ["c"]
@@ -0,0 +1,19 @@
+from streamlit_wavesurfer import wavesurfer
+
+
+def test_url_transport_falls_back_to_bytes(component_args, mono_wav):
+    wavesurfer(mono_wav, transport="url")
+    assert component_args["audio_src"] is None
+    assert component_args["audio_bytes"]
+
+
+def test_url_transport_with_the_media_server(component_args, mono_wav, media_server):
+    wavesurfer(mono_wav, transport="url")
+    assert component_args["audio_src"].startswith("http")
+    assert component_args["audio_bytes"] is None
+
+
+def test_proxy_without_the_media_server_has_no_full_quality(component_args, mono_wav):
+    wavesurfer(mono_wav, proxy=True)
+    assert component_args["audio_bytes"]
+    assert component_args["full_audio_url"] is None